@@ -0,0 +1,79 @@
+"""
+Estimate latency of lab models by input and output lengths from their configs.
+"""
+# pylint: disable=import-error, duplicate-code
+from transformers import AutoConfig, AutoModelForSeq2SeqLM, AutoModelForSequenceClassification
+
+from admin_utils.get_model_analytics import save_reference
+from config.constants import PROJECT_ROOT
+from config.lab_settings import LabSettings
+from core_utils.llm.cost_model import CostModel, HostProfile
+
+
+def estimate_latency(model_name: str, model_class: type, host: HostProfile,
+                     input_lengths: tuple[int, ...], output_lengths: tuple[int, ...],
+                     batch_size: int) -> dict:
+    """
+    Estimate latency of a model on a grid of input and output lengths.
+
+    Only the config of the model is downloaded: calibration runs on a model
+    with random weights created from the config.
+
+    Args:
+        model_name (str): The name of the model
+        model_class (type): Auto class of transformers models creating the model
+        host (HostProfile): Measured speed of the host
+        input_lengths (tuple[int, ...]): The numbers of input tokens
+        output_lengths (tuple[int, ...]): The numbers of generated tokens
+        batch_size (int): The number of sequences in a batch
+
+    Returns:
+        dict: Calibrated overheads and estimates by input and output lengths
+    """
+    config = AutoConfig.from_pretrained(model_name)
+    cost_model = CostModel(config)
+    cost_model.calibrate(model_class.from_config(config).eval(), host)
+
+    estimates = {
+        f'{input_length}x{output_length}': cost_model.estimate(
+            host, input_length, output_length, batch_size
+        )
+        for input_length in input_lengths
+        for output_length in output_lengths
+    }
+    return {
+        'batch_size': batch_size,
+        'overheads': {
+            'encode_seconds': round(cost_model.encode_overhead, 5),
+            'step_seconds': round(cost_model.step_overhead, 5),
+            'sequence_seconds': round(cost_model.sequence_overhead, 5),
+        },
+        'estimates': estimates,
+    }
+
+
+def main() -> None:
+    """
+    Measure the host and store latency estimates of lab_7_llm and lab_8_sft models.
+    """
+    host = HostProfile.measure()
+    print(host.as_dict())
+
+    labs = {
+        'lab_7_llm': (AutoModelForSeq2SeqLM, (32, 128, 512), (1, 20, 120), 1),
+        'lab_8_sft': (AutoModelForSequenceClassification, (32, 120), (0, ), 64),
+    }
+    for lab_name, (model_class, input_lengths, output_lengths, batch_size) in labs.items():
+        settings = LabSettings(PROJECT_ROOT / lab_name / 'settings.json')
+        report = estimate_latency(settings.parameters.model, model_class, host,
+                                  input_lengths, output_lengths, batch_size)
+        report['host'] = host.as_dict()
+        print(lab_name, report['overheads'])
+
+        dest = PROJECT_ROOT / lab_name / 'dist' / 'latency_estimates.json'
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        save_reference(dest, report)
+
+
+if __name__ == '__main__':
+    main()
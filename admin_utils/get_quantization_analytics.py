@@ -0,0 +1,91 @@
+"""
+Compare latency, memory and quality of full precision and quantized inference.
+"""
+# pylint: disable=import-error, duplicate-code, too-many-locals
+import time
+from types import ModuleType
+
+from admin_utils.get_model_analytics import save_reference
+from config.constants import PROJECT_ROOT
+from config.lab_settings import LabSettings
+from core_utils.llm.quantization import get_model_size, QuantizationMode
+
+import lab_7_llm.main as lab_7  # isort:skip
+import lab_8_sft.main as lab_8  # isort:skip
+
+
+def get_quantization_report(lab: ModuleType, lab_name: str, num_samples: int) -> dict:
+    """
+    Infer a lab model in full precision and in every quantization mode.
+
+    Args:
+        lab (ModuleType): Module of a laboratory work
+        lab_name (str): Name of the laboratory work directory
+        num_samples (int): The number of samples to infer
+
+    Returns:
+        dict: Latency, model size and metrics per mode with deltas to full precision
+    """
+    batch_size = 8
+    max_length = 120
+    device = "cpu"
+
+    lab_path = PROJECT_ROOT / lab_name
+    settings = LabSettings(lab_path / "settings.json")
+    importer = lab.RawDataImporter(settings.parameters.dataset)
+    importer.obtain()
+    preprocessor = lab.RawDataPreprocessor(importer.raw_data)
+    preprocessor.transform()
+    dataset = lab.TaskDataset(preprocessor.data.head(num_samples))
+
+    report = {}
+    for mode in (None, *QuantizationMode):
+        pipeline = lab.LLMPipeline(
+            settings.parameters.model,
+            dataset,
+            max_length,
+            batch_size,
+            device,
+            quantization=mode,
+        )
+
+        start = time.perf_counter()
+        predictions = pipeline.infer_dataset(sort_by_length=True)
+        latency = (time.perf_counter() - start) / num_samples
+
+        predictions_path = lab_path / "dist" / f"predictions_{mode or 'fp32'}.csv"
+        predictions_path.parent.mkdir(parents=True, exist_ok=True)
+        predictions.to_csv(predictions_path)
+        metrics = lab.TaskEvaluator(predictions_path, settings.parameters.metrics).run()
+
+        report[str(mode or "fp32")] = {
+            "latency_per_sample": round(latency, 4),
+            "model_size": get_model_size(pipeline._model),  # pylint: disable=protected-access
+            "metrics": metrics,
+        }
+
+    baseline = report["fp32"]
+    for stats in report.values():
+        stats["speedup"] = round(baseline["latency_per_sample"] / stats["latency_per_sample"], 3)
+        stats["size_ratio"] = round(stats["model_size"] / baseline["model_size"], 3)
+        stats["metrics_delta"] = {
+            name: round(value - baseline["metrics"][name], 4)
+            for name, value in stats["metrics"].items()
+        }
+    return report
+
+
+def main() -> None:
+    """
+    Collect and store quantization reports for both laboratory works.
+    """
+    num_samples = 100
+    for lab, lab_name in ((lab_7, "lab_7_llm"), (lab_8, "lab_8_sft")):
+        report = get_quantization_report(lab, lab_name, num_samples)
+        for mode, stats in report.items():
+            print(lab_name, mode, stats)
+        save_reference(PROJECT_ROOT / lab_name / "dist" / "quantization_report.json", report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Collect throughput of data-parallel inference for different numbers of processes.
+"""
+# pylint: disable=import-error, duplicate-code
+import os
+
+from admin_utils.get_model_analytics import save_reference
+from config.constants import PROJECT_ROOT
+from config.lab_settings import LabSettings
+from core_utils.llm.parallel import measure_scaling
+
+from lab_7_llm.main import (  # isort:skip
+    LLMPipeline,
+    RawDataImporter,
+    RawDataPreprocessor,
+    TaskDataset,
+)
+
+
+def get_process_counts(max_processes: int) -> list[int]:
+    """
+    Get numbers of processes to try: powers of two up to the limit and the limit itself.
+
+    Args:
+        max_processes (int): The maximum number of processes
+
+    Returns:
+        list[int]: Numbers of processes
+    """
+    counts = [1]
+    while counts[-1] * 2 <= max_processes:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_processes:
+        counts.append(max_processes)
+    return counts
+
+
+def main() -> None:
+    """
+    Measure and store scaling report of lab_7_llm inference.
+
+    Durations of multi-process runs include start of processes and model loading.
+    """
+    num_samples = 64
+    batch_size = 8
+    max_length = 120
+    device = "cpu"
+
+    settings = LabSettings(PROJECT_ROOT / "lab_7_llm" / "settings.json")
+    importer = RawDataImporter(settings.parameters.dataset)
+    importer.obtain()
+    preprocessor = RawDataPreprocessor(importer.raw_data)
+    preprocessor.transform()
+
+    dataset = TaskDataset(preprocessor.data.head(num_samples))
+    pipeline = LLMPipeline(settings.parameters.model, dataset, max_length, batch_size, device)
+
+    report = measure_scaling(
+        lambda num_processes: pipeline.infer_dataset(
+            sort_by_length=True, num_workers=num_processes
+        ),
+        get_process_counts(os.cpu_count() or 1),
+        num_samples,
+    )
+    for num_processes, stats in report.items():
+        print(num_processes, stats)
+
+    dest = PROJECT_ROOT / "lab_7_llm" / "dist" / "scaling_report.json"
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    save_reference(dest, {str(num_processes): stats for num_processes, stats in report.items()})
+
+
+if __name__ == "__main__":
+    main()
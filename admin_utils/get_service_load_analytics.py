@@ -0,0 +1,91 @@
+"""
+Load test of lab_7_llm service: throughput and latency for different numbers of concurrent users.
+"""
+# pylint: disable=import-error, duplicate-code
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from admin_utils.get_model_analytics import save_reference
+from config.constants import PROJECT_ROOT
+from config.lab_settings import LabSettings
+from core_utils.llm.raw_data_preprocessor import ColumnNames
+
+from lab_7_llm.main import RawDataImporter, RawDataPreprocessor  # isort:skip
+from lab_7_llm.service import app, served_model  # isort:skip
+
+
+async def run_load(texts: list[str], concurrency: int) -> dict:
+    """
+    Send texts to the service with the given number of concurrent clients.
+
+    Args:
+        texts (list[str]): Texts to summarize
+        concurrency (int): The number of requests in flight
+
+    Returns:
+        dict: Throughput, latency percentiles, peak batch occupancy and queue depth
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for text in texts:
+        queue.put_nowait(text)
+    latencies = []
+    occupancy = []
+    queue_depth = []
+
+    async def client(http: httpx.AsyncClient) -> None:
+        while not queue.empty():
+            text = queue.get_nowait()
+            start = time.perf_counter()
+            response = await http.post('/infer', json={'question': text}, timeout=None)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+            stats = served_model.get()[1].stats()
+            occupancy.append(stats.get('occupancy', 0.0))
+            queue_depth.append(stats['queue_depth'])
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://service') as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        duration = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests_per_second': round(len(texts) / duration, 3),
+        'latency_p50': round(statistics.median(latencies), 4),
+        'latency_p95': round(latencies[int(0.95 * (len(latencies) - 1))], 4),
+        'max_occupancy': max(occupancy),
+        'max_queue_depth': max(queue_depth),
+    }
+
+
+def main() -> None:
+    """
+    Measure and store load report of lab_7_llm service.
+    """
+    requests_per_client = 4
+    concurrency_levels = (1, 2, 4, 8, 16)
+
+    settings = LabSettings(PROJECT_ROOT / 'lab_7_llm' / 'settings.json')
+    importer = RawDataImporter(settings.parameters.dataset)
+    importer.obtain()
+    preprocessor = RawDataPreprocessor(importer.raw_data)
+    preprocessor.transform()
+    sources = preprocessor.data[ColumnNames.SOURCE.name].tolist()
+
+    report = {}
+    for concurrency in concurrency_levels:
+        texts = sources[:concurrency * requests_per_client]
+        report[str(concurrency)] = asyncio.run(run_load(texts, concurrency))
+        print(concurrency, report[str(concurrency)])
+
+    dest = PROJECT_ROOT / 'lab_7_llm' / 'dist' / 'service_load_report.json'
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    save_reference(dest, report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Collect startup cost of lab pipelines: imports, weight loading and the first inference.
+"""
+# pylint: disable=import-error, duplicate-code
+import json
+import statistics
+import subprocess
+import sys
+
+from admin_utils.get_model_analytics import save_reference
+from config.constants import PROJECT_ROOT
+from config.lab_settings import LabSettings
+
+# Every measurement starts a new interpreter, so that imports and weights are not cached
+MEASURE_STARTUP = '''
+import json
+import sys
+import time
+
+start = time.perf_counter()
+import torch
+torch_imported = time.perf_counter()
+import pandas as pd
+from importlib import import_module
+main = import_module(sys.argv[1] + '.main')
+lab_imported = time.perf_counter()
+
+pipeline = main.LLMPipeline(sys.argv[2], main.TaskDataset(pd.DataFrame()), 120, 1, 'cpu')
+loaded = time.perf_counter()
+from core_utils.llm.weight_mapping import get_weights_mapping
+mapping = get_weights_mapping(pipeline._model)
+pipeline.infer_samples([(sys.argv[3], )])
+first_inferred = time.perf_counter()
+pipeline.infer_samples([(sys.argv[3], )])
+second_inferred = time.perf_counter()
+
+print(json.dumps({
+    'import_torch': torch_imported - start,
+    'import_lab': lab_imported - torch_imported,
+    'load_weights': loaded - lab_imported,
+    'first_inference': first_inferred - loaded,
+    'next_inference': second_inferred - first_inferred,
+    'mapped_weights_mb': mapping['mapped_bytes'] / 2 ** 20,
+    'private_weights_mb': mapping['private_bytes'] / 2 ** 20,
+}))
+'''
+
+
+def measure_startup(lab_name: str, model_name: str, text: str, repeats: int) -> dict:
+    """
+    Measure stages of startup of a lab pipeline in fresh processes.
+
+    Weights mapped from checkpoint files are shared by processes loading the same model,
+    private weights are loaded into memory of every process.
+
+    Args:
+        lab_name (str): Name of the lab package
+        model_name (str): The name of the model to load
+        text (str): Text to infer
+        repeats (int): The number of processes to take the median of
+
+    Returns:
+        dict: Median time of every stage and of the whole startup in seconds,
+            sizes of mapped and private weights in megabytes
+    """
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, '-c', MEASURE_STARTUP, lab_name, model_name, text],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    report = {stage: round(statistics.median(run[stage] for run in runs), 3)
+              for stage in runs[0]}
+    report['first_inference_overhead'] = round(
+        report['first_inference'] - report['next_inference'], 3
+    )
+    report['time_to_first_result'] = round(
+        sum(report[stage] for stage in ('import_torch', 'import_lab', 'load_weights',
+                                        'first_inference')), 3
+    )
+    return report
+
+
+def main() -> None:
+    """
+    Measure and store startup reports of lab_7_llm and lab_8_sft pipelines.
+    """
+    repeats = 3
+    texts = {
+        'lab_7_llm': 'Москва является столицей и крупнейшим городом России.',
+        'lab_8_sft': 'i feel so happy today',
+    }
+
+    for lab_name, text in texts.items():
+        settings = LabSettings(PROJECT_ROOT / lab_name / 'settings.json')
+        report = measure_startup(lab_name, settings.parameters.model, text, repeats)
+        print(lab_name, report)
+
+        dest = PROJECT_ROOT / lab_name / 'dist' / 'startup_report.json'
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        save_reference(dest, report)
+
+
+if __name__ == '__main__':
+    main()
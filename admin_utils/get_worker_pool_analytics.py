@@ -0,0 +1,107 @@
+"""
+Collect throughput and memory of lab_8_sft serving with forked worker processes.
+"""
+# pylint: disable=import-error, duplicate-code, too-many-locals
+import os
+import time
+from concurrent.futures import wait
+from pathlib import Path
+
+import pandas as pd
+
+from admin_utils.get_model_analytics import save_reference
+from config.constants import PROJECT_ROOT
+from config.lab_settings import LabSettings
+from core_utils.llm.raw_data_preprocessor import ColumnNames
+from core_utils.llm.worker_pool import WorkerPool
+
+from lab_8_sft.main import (  # isort:skip
+    LLMPipeline,
+    RawDataImporter,
+    RawDataPreprocessor,
+    TaskDataset,
+)
+
+
+def get_proportional_memory(pid: int) -> int:
+    """
+    Get proportional set size of a process: private pages plus its share of shared pages.
+
+    Args:
+        pid (int): Process id
+
+    Returns:
+        int: Memory in bytes
+    """
+    for line in Path(f'/proc/{pid}/smaps_rollup').read_text(encoding='utf-8').splitlines():
+        if line.startswith('Pss:'):
+            return int(line.split()[1]) * 1024
+    return 0
+
+
+def measure_pool(model_names: dict[str, str], texts: list[str], num_workers: int) -> dict:
+    """
+    Infer texts with both models in a pool of forked workers.
+
+    Args:
+        model_names (dict[str, str]): Models by handler names
+        texts (list[str]): Texts to classify
+        num_workers (int): The number of worker processes
+
+    Returns:
+        dict: Throughput and total proportional memory of the parent and workers
+    """
+    batch_size = 8
+    empty = TaskDataset(pd.DataFrame())
+    pipelines = {
+        name: LLMPipeline(model_name, empty, max_length=120, batch_size=batch_size, device='cpu')
+        for name, model_name in model_names.items()
+    }
+    pool = WorkerPool({name: pipeline.infer_samples for name, pipeline in pipelines.items()},
+                      num_workers)
+
+    batches = [[(text, ) for text in texts[start:start + batch_size]]
+               for start in range(0, len(texts), batch_size)]
+    start = time.perf_counter()
+    futures = [pool.submit(name, batch) for batch in batches for name in pipelines]
+    wait(futures)
+    duration = time.perf_counter() - start
+
+    pids = [os.getpid()] + [worker['pid'] for worker in pool.stats()['workers']]
+    memory = sum(get_proportional_memory(pid) for pid in pids)
+    pool.close()
+    return {
+        'samples_per_second': round(len(texts) * len(pipelines) / duration, 3),
+        'total_memory_mb': round(memory / 2 ** 20, 1),
+    }
+
+
+def main() -> None:
+    """
+    Measure and store worker pool report of lab_8_sft serving.
+    """
+    num_samples = 256
+
+    settings = LabSettings(PROJECT_ROOT / 'lab_8_sft' / 'settings.json')
+    importer = RawDataImporter(settings.parameters.dataset)
+    importer.obtain()
+    preprocessor = RawDataPreprocessor(importer.raw_data)
+    preprocessor.transform()
+    texts = preprocessor.data[str(ColumnNames.SOURCE)].head(num_samples).tolist()
+
+    model_names = {
+        'base': settings.parameters.model,
+        'fine_tuned': str(PROJECT_ROOT / 'lab_8_sft' / 'dist' / settings.parameters.model),
+    }
+    report = {}
+    for num_workers in (1, 2, 4):
+        report[str(num_workers)] = measure_pool(model_names, texts, num_workers)
+        print(num_workers, report[str(num_workers)])
+
+    dest = PROJECT_ROOT / 'lab_8_sft' / 'dist' / 'worker_pool_report.json'
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    save_reference(dest, report)
+
+
+if __name__ == '__main__':
+    main()
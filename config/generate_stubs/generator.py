@@ -123,10 +123,10 @@ def cleanup_code(source_code_path: Path) -> str:
 
         if source_code_path.name == "service.py" and isinstance(decl, ast.Assign):
             if source_code_path.parent.name == "lab_7_llm":
-                decl = ast.parse("app, pipeline = None, None")  # type: ignore
+                decl = ast.parse("app, served_model = None, None")  # type: ignore
             elif source_code_path.parent.name == "lab_8_sft":
                 decl = ast.parse(  # type: ignore
-                    "app, pre_trained_pipeline, fine_tuned_pipeline = None, None, None"
+                    "app, served_models, fine_tuning_job = None, None, None"
                 )
 
         if isinstance(decl, (ast.Import, ast.ImportFrom)):
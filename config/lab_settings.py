@@ -19,6 +19,7 @@ class ParametersModel:
     model: str
     dataset: str
     metrics: list[Metrics]
+    draft_model: str | None = None
 
 
 @dataclass
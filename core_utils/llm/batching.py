@@ -0,0 +1,139 @@
+"""
+Module with helpers for planning inference batches.
+"""
+
+# pylint: disable=duplicate-code
+from dataclasses import dataclass
+from typing import Sequence
+
+
+@dataclass
+class PaddingStats:
+    """
+    Statistics of padding overhead for a set of batches.
+    """
+
+    #: Number of batches
+    num_batches: int
+
+    #: Number of real (non-padding) tokens
+    real_tokens: int
+
+    #: Number of tokens after padding every batch to its longest sample
+    padded_tokens: int
+
+    @property
+    def efficiency(self) -> float:
+        """
+        Share of real tokens among all processed tokens.
+
+        Returns:
+            float: Padding efficiency in range [0, 1]
+        """
+        if not self.padded_tokens:
+            return 1.0
+        return self.real_tokens / self.padded_tokens
+
+    def __add__(self, other: 'PaddingStats') -> 'PaddingStats':
+        """
+        Combine statistics of two sets of batches.
+
+        Args:
+            other (PaddingStats): Statistics to add
+
+        Returns:
+            PaddingStats: Combined statistics
+        """
+        return PaddingStats(
+            num_batches=self.num_batches + other.num_batches,
+            real_tokens=self.real_tokens + other.real_tokens,
+            padded_tokens=self.padded_tokens + other.padded_tokens,
+        )
+
+    def as_dict(self) -> dict:
+        """
+        Represent statistics as a dictionary.
+
+        Returns:
+            dict: Statistics with computed efficiency
+        """
+        return {
+            'num_batches': self.num_batches,
+            'real_tokens': self.real_tokens,
+            'padded_tokens': self.padded_tokens,
+            'padding_efficiency': round(self.efficiency, 4),
+        }
+
+
+def plan_batches(
+    indices: Sequence[int],
+    batch_size: int,
+    lengths: Sequence[int] | None = None,
+    sort_by_length: bool = False,
+    max_batch_tokens: int | None = None,
+) -> list[list[int]]:
+    """
+    Split sample indices into batches.
+
+    Without sorting the batches follow the given order, the same way a plain
+    DataLoader does. With sorting, samples of similar length are grouped together,
+    so that each batch is padded to a length close to its real length.
+
+    If a token budget is given, it replaces the fixed batch size: a batch grows while
+    the number of its rows multiplied by its longest sample fits into the budget.
+    A sample that alone exceeds the budget forms a batch of its own.
+
+    Args:
+        indices (Sequence[int]): Indices of samples to infer
+        batch_size (int): Maximum number of samples in a batch
+        lengths (Sequence[int] | None): Tokenized lengths of all samples in the dataset
+        sort_by_length (bool): Whether to group samples by length
+        max_batch_tokens (int | None): Maximum number of padded tokens in a batch
+
+    Returns:
+        list[list[int]]: Batches of sample indices
+    """
+    order = list(indices)
+    if (sort_by_length or max_batch_tokens) and lengths is None:
+        raise ValueError('Lengths are required to sort samples or to apply token budget')
+    sizes = lengths if lengths is not None else []
+
+    if sort_by_length:
+        order.sort(key=lambda index: sizes[index], reverse=True)
+
+    if not max_batch_tokens:
+        return [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+    batches: list[list[int]] = []
+    current: list[int] = []
+    longest = 0
+    for index in order:
+        candidate_longest = max(longest, sizes[index])
+        if current and (len(current) + 1) * candidate_longest > max_batch_tokens:
+            batches.append(current)
+            current, candidate_longest = [], sizes[index]
+        current.append(index)
+        longest = candidate_longest
+    if current:
+        batches.append(current)
+    return batches
+
+
+def collect_padding_stats(lengths: Sequence[int], batches: Sequence[Sequence[int]]) -> PaddingStats:
+    """
+    Compute padding overhead of the planned batches.
+
+    Args:
+        lengths (Sequence[int]): Tokenized lengths of all samples in the dataset
+        batches (Sequence[Sequence[int]]): Batches of sample indices
+
+    Returns:
+        PaddingStats: Padding statistics
+    """
+    real_tokens = sum(lengths[index] for batch in batches for index in batch)
+    padded_tokens = sum(
+        len(batch) * max(lengths[index] for index in batch) for batch in batches if batch
+    )
+    return PaddingStats(
+        num_batches=len(batches), real_tokens=real_tokens, padded_tokens=padded_tokens
+    )
@@ -0,0 +1,99 @@
+"""
+Module with bounded execution of blocking inference calls.
+"""
+
+# pylint: disable=duplicate-code
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class QueueFullError(RuntimeError):
+    """
+    Raised when a request is rejected because the inference queue is full.
+    """
+
+    def __init__(self, retry_after: float) -> None:
+        """
+        Initialize an instance of QueueFullError.
+
+        Args:
+            retry_after (float): Suggested delay in seconds before a retry
+        """
+        super().__init__(f'Inference queue is full, retry in {retry_after:.1f} seconds')
+        self.retry_after = retry_after
+
+
+class BoundedExecutor(Executor):
+    """
+    Thread pool that rejects tasks instead of queueing them without limit.
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int, retry_after: float = 1.0) -> None:
+        """
+        Initialize an instance of BoundedExecutor.
+
+        Args:
+            max_workers (int): The maximum number of tasks running concurrently
+            max_queue_size (int): The maximum number of tasks waiting for a worker
+            retry_after (float): Suggested delay in seconds before retrying a rejected task
+        """
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix='inference')
+        self._capacity = max_workers + max_queue_size
+        self._slots = threading.BoundedSemaphore(self._capacity)
+        self._retry_after = retry_after
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """
+        Property with the number of accepted tasks that are not finished yet.
+
+        Returns:
+            int: Number of running and waiting tasks
+        """
+        return self._pending
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        """
+        Schedule a callable if there is a free slot.
+
+        Args:
+            fn (Callable): Callable to execute
+            *args (Any): Positional arguments of the callable
+            **kwargs (Any): Keyword arguments of the callable
+
+        Returns:
+            concurrent.futures.Future: Future of the callable result
+        """
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError(self._retry_after)
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """
+        Stop accepting tasks and release workers.
+
+        Args:
+            wait (bool): Whether to wait for running tasks
+            cancel_futures (bool): Whether to cancel tasks that are not started
+        """
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def _release(self) -> None:
+        """
+        Free a slot of a finished task.
+        """
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
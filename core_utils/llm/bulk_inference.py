@@ -0,0 +1,45 @@
+"""
+Module with streaming inference of many requests.
+"""
+
+# pylint: disable=duplicate-code
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Sequence
+
+
+async def stream_in_order(
+    infer: Callable[[Any], Awaitable[Any]],
+    items: Sequence[Any],
+    window: int,
+) -> AsyncIterator[Any]:
+    """
+    Infer items as concurrent requests and yield results in the order of items.
+
+    Every item takes the same path as a single request, so items share batches,
+    caches and the concurrency limit with other requests. At most window items
+    are in flight at once, so a large job does not fill the queue of a batcher.
+    Requests in flight are cancelled when the stream is closed.
+
+    Args:
+        infer (Callable[[Any], Awaitable[Any]]): Coroutine function inferring an item
+        items (Sequence[Any]): Items to infer
+        window (int): The maximum number of items in flight
+
+    Yields:
+        Any: Result of an item
+    """
+    pending: deque[asyncio.Future] = deque()
+    next_items = iter(items)
+    try:
+        while True:
+            for item in next_items:
+                pending.append(asyncio.ensure_future(infer(item)))
+                if len(pending) >= window:
+                    break
+            if not pending:
+                return
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,472 @@
+"""
+Module with iteration-level (continuous) batching of seq2seq generation.
+"""
+
+# pylint: disable=duplicate-code, too-many-instance-attributes, import-outside-toplevel
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from core_utils.llm.bounded_executor import QueueFullError
+from core_utils.llm.service_metrics import BATCH_SIZE, timed_stage
+
+try:
+    import torch
+except ImportError:
+    print('Library "torch" not installed. Failed to import.')
+
+
+@dataclass
+class _Sequence:
+    """
+    State of a sequence being decoded.
+    """
+
+    future: Future
+    tokens: list[int] = field(default_factory=list)
+    on_text: Callable[[str], Any] | None = None
+    text: str = ''
+
+
+@dataclass
+class _Batch:
+    """
+    Key-value caches of in-flight sequences, a row per sequence.
+
+    Self-attention caches are padded on the left, so every sequence writes its next
+    token to the same position. Cross-attention caches are padded on the right.
+    """
+
+    #: Self-attention keys and values and cross-attention keys and values of every layer
+    cache: tuple[tuple['torch.Tensor', ...], ...]
+    decoder_mask: 'torch.Tensor'
+    encoder_mask: 'torch.Tensor'
+
+    def select(self, rows: list[int]) -> '_Batch':
+        """
+        Keep only the given rows, dropping padding not needed by any of them.
+
+        Args:
+            rows (list[int]): Indices of rows to keep
+
+        Returns:
+            _Batch: Batch of the rows
+        """
+        index = torch.tensor(rows, dtype=torch.long, device=self.decoder_mask.device)
+        decoder_mask = self.decoder_mask[index]
+        encoder_mask = self.encoder_mask[index]
+        first = int(decoder_mask.any(dim=0).long().argmax())
+        last = int(encoder_mask.sum(dim=1).max())
+        return _Batch(
+            cache=tuple(
+                (self_key[index, :, first:], self_value[index, :, first:],
+                 cross_key[index, :, :last], cross_value[index, :, :last])
+                for self_key, self_value, cross_key, cross_value in self.cache
+            ),
+            decoder_mask=decoder_mask[:, first:],
+            encoder_mask=encoder_mask[:, :last],
+        )
+
+    def join(self, other: '_Batch') -> '_Batch':
+        """
+        Append rows of another batch, padding caches of both to common lengths.
+
+        Args:
+            other (_Batch): Batch to append
+
+        Returns:
+            _Batch: Batch with rows of both batches
+        """
+        decoder_length = max(self.decoder_mask.shape[1], other.decoder_mask.shape[1])
+        encoder_length = max(self.encoder_mask.shape[1], other.encoder_mask.shape[1])
+        lengths = (decoder_length, decoder_length, encoder_length, encoder_length)
+        return _Batch(
+            cache=tuple(
+                tuple(
+                    torch.cat([_pad(mine, length, -2, left), _pad(theirs, length, -2, left)])
+                    for mine, theirs, length, left in zip(own, others, lengths,
+                                                          (True, True, False, False))
+                )
+                for own, others in zip(self.cache, other.cache)
+            ),
+            decoder_mask=torch.cat([_pad(self.decoder_mask, decoder_length, -1, True),
+                                    _pad(other.decoder_mask, decoder_length, -1, True)]),
+            encoder_mask=torch.cat([_pad(self.encoder_mask, encoder_length, -1, False),
+                                    _pad(other.encoder_mask, encoder_length, -1, False)]),
+        )
+
+
+def _pad(tensor: 'torch.Tensor', length: int, dim: int, left: bool) -> 'torch.Tensor':
+    """
+    Pad a tensor with zeros along a dimension.
+
+    Args:
+        tensor (torch.Tensor): Tensor to pad
+        length (int): Length of the dimension after padding
+        dim (int): Negative index of the dimension
+        left (bool): Whether to pad at the start of the dimension
+
+    Returns:
+        torch.Tensor: Padded tensor
+    """
+    missing = length - tensor.shape[dim]
+    padding = [0, 0] * -dim
+    padding[-2 if left else -1] = missing
+    return torch.nn.functional.pad(tensor, padding)
+
+
+#: Options of generation configs the scheduler applies
+_SUPPORTED_OPTIONS = {'min_length', 'min_new_tokens', 'repetition_penalty',
+                      'no_repeat_ngram_size'}
+
+
+def _unsupported_options(generation_config: Any) -> list[str]:
+    """
+    Find options of a generation config that make generation differ from greedy
+    decoding adjusted by the supported logits processors.
+
+    Args:
+        generation_config (transformers.GenerationConfig): Generation config of a model
+
+    Returns:
+        list[str]: Names of unsupported options set to non-default values
+    """
+    from transformers import GenerationConfig
+
+    default = GenerationConfig()
+    options = ('do_sample', 'num_beams', 'num_beam_groups', 'penalty_alpha', 'dola_layers',
+               'encoder_repetition_penalty', 'encoder_no_repeat_ngram_size', 'bad_words_ids',
+               'force_words_ids', 'constraints', 'forced_bos_token_id', 'forced_eos_token_id',
+               'exponential_decay_length_penalty', 'suppress_tokens', 'begin_suppress_tokens',
+               'forced_decoder_ids', 'sequence_bias', 'guidance_scale', 'stop_strings',
+               'max_time', 'num_return_sequences')
+    return [option for option in options
+            if getattr(generation_config, option, None) != getattr(default, option, None)]
+
+
+class ContinuousBatchingScheduler:
+    """
+    Seq2seq decoder that admits and retires sequences at token boundaries.
+
+    New requests join the in-flight batch before every decoding step, finished
+    sequences leave it right after the step that produced their last token,
+    so short outputs do not wait for long ones. Every step feeds only the last
+    token of each sequence and reuses key-value caches of previous tokens.
+
+    Decoding is greedy with min length, repetition penalty and n-gram blocking
+    of the generation config of the model applied, so the output is the same
+    as of generate. Models with other generation options are not supported.
+    Left-padded caches keep distances between tokens, so the model must use
+    relative positions, as T5 does.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        tokenizer: Any,
+        max_length: int,
+        max_batch_size: int,
+        max_queue_size: int | None = None,
+        retry_after: float = 1.0,
+    ) -> None:
+        """
+        Initialize an instance of ContinuousBatchingScheduler.
+
+        Args:
+            model (Any): Seq2seq HuggingFace model
+            tokenizer (Any): Tokenizer of the model
+            max_length (int): The maximum length of an input sequence
+            max_batch_size (int): The maximum number of sequences decoded together
+            max_queue_size (int | None): The maximum number of requests waiting for admission,
+                unlimited if not given
+            retry_after (float): Suggested delay in seconds before retrying a rejected request
+
+        Raises:
+            ValueError: If the model or its generation config is not supported
+        """
+        from transformers import (
+            GenerationConfig,
+            LogitsProcessorList,
+            MinLengthLogitsProcessor,
+            MinNewTokensLengthLogitsProcessor,
+            NoRepeatNGramLogitsProcessor,
+            RepetitionPenaltyLogitsProcessor,
+        )
+
+        if not getattr(model.config, 'relative_attention_num_buckets', None):
+            raise ValueError('Continuous batching requires a seq2seq model '
+                             'with relative positions')
+        generation_config = model.generation_config
+        unsupported = _unsupported_options(generation_config)
+        if unsupported:
+            raise ValueError('Continuous batching supports only greedy decoding, '
+                             f'generation config sets {", ".join(unsupported)}')
+
+        self._model = model
+        self._tokenizer = tokenizer
+        self._max_length = max_length
+        self._max_batch_size = max_batch_size
+        self._max_queue_size = max_queue_size
+        self._retry_after = retry_after
+
+        if generation_config.max_new_tokens is not None:
+            self._max_output_length = generation_config.max_new_tokens + 1
+        elif generation_config.max_length == GenerationConfig().max_length:
+            # generate() counts the default length in new tokens, not including start token
+            self._max_output_length = generation_config.max_length + 1
+        else:
+            self._max_output_length = generation_config.max_length
+        self._start_token_id = generation_config.decoder_start_token_id
+        eos_token_id = generation_config.eos_token_id
+        self._eos_token_ids = set(eos_token_id if isinstance(eos_token_id, list)
+                                  else [eos_token_id])
+
+        self._logits_processor = LogitsProcessorList()
+        if generation_config.min_length:
+            self._logits_processor.append(
+                MinLengthLogitsProcessor(generation_config.min_length, eos_token_id)
+            )
+        if generation_config.min_new_tokens:
+            self._logits_processor.append(MinNewTokensLengthLogitsProcessor(
+                1, generation_config.min_new_tokens, eos_token_id
+            ))
+        if generation_config.repetition_penalty not in (None, 1.0):
+            self._logits_processor.append(
+                RepetitionPenaltyLogitsProcessor(generation_config.repetition_penalty)
+            )
+        if generation_config.no_repeat_ngram_size:
+            self._logits_processor.append(
+                NoRepeatNGramLogitsProcessor(generation_config.no_repeat_ngram_size)
+            )
+
+        self._pending: queue.Queue = queue.Queue()
+        self._active: list[_Sequence] = []
+        self._batch: _Batch | None = None
+        self._completed = 0
+        self._steps = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Property with the number of requests waiting for admission.
+
+        Returns:
+            int: Number of waiting requests
+        """
+        return self._pending.qsize()
+
+    @property
+    def occupancy(self) -> float:
+        """
+        Property with the share of occupied slots of the in-flight batch.
+
+        Returns:
+            float: Batch occupancy in range [0, 1]
+        """
+        return len(self._active) / self._max_batch_size
+
+    def stats(self) -> dict:
+        """
+        Collect scheduler statistics.
+
+        Returns:
+            dict: Queue depth, batch occupancy and counters
+        """
+        return {
+            'queue_depth': self.queue_depth,
+            'active_sequences': len(self._active),
+            'max_batch_size': self._max_batch_size,
+            'occupancy': round(self.occupancy, 4),
+            'decoding_steps': self._steps,
+            'completed_requests': self._completed,
+        }
+
+    def submit(self, text: str, on_text: Callable[[str], Any] | None = None) -> Future:
+        """
+        Put a text to the queue of generation requests.
+
+        Args:
+            text (str): Text to infer the model on
+            on_text (Callable[[str], Any] | None): Function called from the decoding thread
+                with every new piece of decoded text
+
+        Returns:
+            concurrent.futures.Future: Future resolved with the decoded prediction
+
+        Raises:
+            QueueFullError: If too many requests are waiting
+        """
+        if self._max_queue_size is not None and self.queue_depth >= self._max_queue_size:
+            raise QueueFullError(self._retry_after)
+
+        future: Future = Future()
+        self._pending.put((text, future, on_text))
+        return future
+
+    def _run(self) -> None:
+        """
+        Decode sequences until the process exits.
+        """
+        with torch.no_grad():
+            while True:
+                try:
+                    self._admit(block=not self._active)
+                    self._step()
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    for sequence in self._active:
+                        if not sequence.future.done():
+                            sequence.future.set_exception(error)
+                    self._active = []
+                    self._batch = None
+
+    def _admit(self, block: bool) -> None:
+        """
+        Move waiting requests to the in-flight batch while it has free slots.
+
+        Admitted texts are encoded together and get their first token.
+
+        Args:
+            block (bool): Whether to wait for a request if the queue is empty
+        """
+        admitted: list[tuple[str, _Sequence]] = []
+        while len(self._active) + len(admitted) < self._max_batch_size:
+            try:
+                text, future, on_text = self._pending.get(block=block)
+            except queue.Empty:
+                break
+            block = False
+            if future.set_running_or_notify_cancel():
+                admitted.append((text, _Sequence(future=future, tokens=[self._start_token_id],
+                                                 on_text=on_text)))
+        if not admitted:
+            return
+
+        try:
+            batch, logits = self._prefill([text for text, _ in admitted])
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            for _, sequence in admitted:
+                sequence.future.set_exception(error)
+            return
+
+        sequences = [sequence for _, sequence in admitted]
+        self._active.extend(sequences)
+        self._batch = batch if self._batch is None else self._batch.join(batch)
+        self._advance(sequences, logits, range(len(self._active) - len(sequences),
+                                               len(self._active)))
+
+    def _prefill(self, texts: list[str]) -> tuple[_Batch, 'torch.Tensor']:
+        """
+        Run encoder on texts and decoder on their start tokens.
+
+        Args:
+            texts (list[str]): Texts to encode
+
+        Returns:
+            tuple[_Batch, torch.Tensor]: Caches of the texts and logits of their first tokens
+        """
+        from transformers import DynamicCache, EncoderDecoderCache
+
+        device = self._model.device
+        with timed_stage('tokenize'):
+            model_input = self._tokenizer(texts, return_tensors='pt', padding=True,
+                                          max_length=self._max_length,
+                                          truncation=True).to(device)
+        with timed_stage('encode'):
+            encoder_states = self._model.get_encoder()(**model_input).last_hidden_state
+            decoder_input_ids = torch.full((len(texts), 1), self._start_token_id,
+                                           dtype=torch.long, device=device)
+            output = self._model(encoder_outputs=(encoder_states, ),
+                                 attention_mask=model_input['attention_mask'],
+                                 decoder_input_ids=decoder_input_ids,
+                                 past_key_values=EncoderDecoderCache(DynamicCache(),
+                                                                     DynamicCache()),
+                                 use_cache=True)
+        batch = _Batch(cache=output.past_key_values.to_legacy_cache(),
+                       decoder_mask=torch.ones_like(decoder_input_ids),
+                       encoder_mask=model_input['attention_mask'])
+        return batch, output.logits[:, -1]
+
+    def _step(self) -> None:
+        """
+        Decode one token for every in-flight sequence and retire finished ones.
+        """
+        if not self._active or self._batch is None:
+            return
+
+        from transformers import EncoderDecoderCache
+
+        batch = self._batch
+        batch_size, encoder_length = batch.encoder_mask.shape
+        # Cross-attention reads cached keys and values, encoder states only give the shape
+        encoder_states = torch.zeros((), dtype=self._model.dtype, device=self._model.device)
+        encoder_states = encoder_states.expand(batch_size, encoder_length,
+                                               self._model.config.d_model)
+        decoder_input_ids = torch.tensor([[sequence.tokens[-1]] for sequence in self._active],
+                                         dtype=torch.long, device=self._model.device)
+        decoder_mask = torch.nn.functional.pad(batch.decoder_mask, (0, 1), value=1)
+
+        with timed_stage('generate_step'):
+            output = self._model(encoder_outputs=(encoder_states, ),
+                                 attention_mask=batch.encoder_mask,
+                                 decoder_input_ids=decoder_input_ids,
+                                 decoder_attention_mask=decoder_mask,
+                                 past_key_values=EncoderDecoderCache.from_legacy_cache(batch.cache),
+                                 use_cache=True)
+        self._steps += 1
+        BATCH_SIZE.observe(batch_size, batcher='continuous')
+
+        self._batch = _Batch(cache=output.past_key_values.to_legacy_cache(),
+                             decoder_mask=decoder_mask, encoder_mask=batch.encoder_mask)
+        self._advance(list(self._active), output.logits[:, -1], range(batch_size))
+
+    def _advance(self, sequences: list[_Sequence], logits: 'torch.Tensor',
+                 rows: range) -> None:
+        """
+        Append the next token to sequences and retire finished ones from the batch.
+
+        Args:
+            sequences (list[_Sequence]): Sequences to advance
+            logits (torch.Tensor): Logits of the next token of every sequence
+            rows (range): Rows of the sequences in the batch
+        """
+        finished = set()
+        for sequence, scores, row in zip(sequences, logits, rows):
+            if self._logits_processor:
+                input_ids = torch.tensor([sequence.tokens], dtype=torch.long,
+                                         device=scores.device)
+                scores = self._logits_processor(input_ids, scores[None])[0]
+            token = int(scores.argmax())
+            sequence.tokens.append(token)
+            if sequence.on_text is not None:
+                self._stream(sequence)
+            if token in self._eos_token_ids or len(sequence.tokens) >= self._max_output_length:
+                with timed_stage('decode'):
+                    decoded = self._tokenizer.decode(sequence.tokens, skip_special_tokens=True)
+                sequence.future.set_result(str(decoded))
+                self._completed += 1
+                finished.add(row)
+
+        if finished:
+            kept = [row for row in range(len(self._active)) if row not in finished]
+            self._active = [self._active[row] for row in kept]
+            self._batch = self._batch.select(kept) if kept and self._batch else None
+
+    def _stream(self, sequence: _Sequence) -> None:
+        """
+        Pass the newly decoded piece of a sequence to its callback.
+
+        Args:
+            sequence (_Sequence): Sequence with a new token
+        """
+        text = str(self._tokenizer.decode(sequence.tokens, skip_special_tokens=True))
+        if len(text) <= len(sequence.text) or not text.startswith(sequence.text):
+            return
+        piece, sequence.text = text[len(sequence.text):], text
+        try:
+            sequence.on_text(piece)  # type: ignore[misc]
+        except Exception:  # pylint: disable=broad-exception-caught
+            sequence.on_text = None
@@ -0,0 +1,378 @@
+"""
+Module with analytic estimation of compute cost and latency of transformer inference.
+"""
+
+# pylint: disable=duplicate-code
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+try:
+    import torch
+except ImportError:
+    print('Library "torch" not installed. Failed to import.')
+
+
+@dataclass
+class StageCost:
+    """
+    Compute and memory cost of a stage of inference.
+    """
+
+    #: Floating point operations
+    flops: float = 0.0
+
+    #: Bytes of weights and caches read from memory
+    bytes: float = 0.0
+
+    #: The number of tokens multiplied by weight matrices at once
+    rows: int = 1
+
+    def __add__(self, other: 'StageCost') -> 'StageCost':
+        """
+        Combine costs of two stages.
+
+        Args:
+            other (StageCost): Cost to add
+
+        Returns:
+            StageCost: Combined cost
+        """
+        return StageCost(self.flops + other.flops, self.bytes + other.bytes,
+                         max(self.rows, other.rows))
+
+    def seconds(self, host: 'HostProfile') -> float:
+        """
+        Estimate time of the stage on a host: a stage is bound either by arithmetic
+        or by reading memory.
+
+        Args:
+            host (HostProfile): Measured speed of the host
+
+        Returns:
+            float: Time in seconds
+        """
+        return max(self.flops / host.flops_at(self.rows), self.bytes / host.bytes_per_second)
+
+
+@dataclass
+class HostProfile:
+    """
+    Speed of a host measured by micro-benchmarks.
+    """
+
+    #: Achieved throughput of multiplications of a weight matrix by the number of rows
+    #: of the other operand: few rows use vector units poorly
+    flops_per_second: dict[int, float]
+
+    #: Achieved bandwidth of reading weights that do not fit into caches
+    bytes_per_second: float
+
+    @classmethod
+    def measure(cls, size: int = 1024, bandwidth_mb: int = 64,
+                min_seconds: float = 0.2) -> 'HostProfile':
+        """
+        Measure speed of the host with the current number of torch threads.
+
+        Args:
+            size (int): Side of the square weight matrix multiplied to measure throughput
+            bandwidth_mb (int): Size in megabytes of the matrix read to measure bandwidth
+            min_seconds (float): The minimum duration of every benchmark
+
+        Returns:
+            HostProfile: Measured speed
+        """
+        flops_per_second = {}
+        with torch.no_grad():
+            weight = torch.randn(size, size)
+            for rows in (1, 4, 16, 64, 256, 1024):
+                tokens = torch.randn(rows, size)
+                flops_time = time_per_call(lambda: torch.matmul(tokens, weight), min_seconds)
+                flops_per_second[rows] = 2 * rows * size ** 2 / flops_time
+
+            columns = 1024
+            matrix = torch.randn(bandwidth_mb * 2 ** 20 // (4 * columns), columns)
+            vector = torch.randn(columns)
+            bandwidth_time = time_per_call(lambda: torch.mv(matrix, vector), min_seconds)
+
+        return cls(
+            flops_per_second=flops_per_second,
+            bytes_per_second=matrix.numel() * matrix.element_size() / bandwidth_time,
+        )
+
+    def flops_at(self, rows: int) -> float:
+        """
+        Get throughput of multiplications by the number of rows, interpolating
+        linearly between measured numbers of rows.
+
+        Args:
+            rows (int): The number of rows
+
+        Returns:
+            float: FLOP/s
+        """
+        measured = sorted(self.flops_per_second.items())
+        if rows <= measured[0][0]:
+            return measured[0][1]
+        for (low, low_flops), (high, high_flops) in zip(measured, measured[1:]):
+            if rows <= high:
+                return low_flops + (high_flops - low_flops) * (rows - low) / (high - low)
+        return measured[-1][1]
+
+    def as_dict(self) -> dict:
+        """
+        Represent the profile as a dictionary.
+
+        Returns:
+            dict: GFLOP/s by the number of rows and GB/s
+        """
+        return {
+            'gflops_per_second': {
+                str(rows): round(flops / 1e9, 3)
+                for rows, flops in sorted(self.flops_per_second.items())
+            },
+            'gb_per_second': round(self.bytes_per_second / 1e9, 3),
+        }
+
+
+def time_per_call(function: Callable[[], Any], min_seconds: float) -> float:
+    """
+    Measure mean time of a function call after a warm-up call.
+
+    Args:
+        function (Callable[[], Any]): Function to call
+        min_seconds (float): The minimum total duration of measured calls
+
+    Returns:
+        float: Time of a call in seconds
+    """
+    function()
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def _first(config: Any, *names: str) -> Any:
+    """
+    Get the first set attribute of a config.
+
+    Args:
+        config (transformers.PretrainedConfig): Config of a model
+        *names (str): Names of attributes in the order of preference
+
+    Returns:
+        Any: Value of the attribute, None if none of them is set
+    """
+    for name in names:
+        value = getattr(config, name, None)
+        if value is not None:
+            return value
+    return None
+
+
+class CostModel:
+    """
+    Cost of inference of a transformer derived from its config.
+
+    Encoder-only, decoder-only and encoder-decoder models are supported.
+    Generation is assumed to reuse the key-value cache: every step runs the decoder
+    on one token, reading all decoder weights and the cache of previous tokens.
+    Time of a pass is the time of its arithmetic or memory reads, whichever is longer,
+    plus a fixed overhead of framework calls calibrated on the model.
+    """
+
+    def __init__(self, config: Any, dtype_bytes: int = 4) -> None:
+        """
+        Initialize an instance of CostModel.
+
+        Args:
+            config (transformers.PretrainedConfig): Config of the model
+            dtype_bytes (int): Size of a weight in bytes
+        """
+        self._dtype_bytes = dtype_bytes
+        self.is_encoder_decoder = bool(getattr(config, 'is_encoder_decoder', False))
+        self.is_decoder_only = not self.is_encoder_decoder and any(
+            name.endswith('ForCausalLM') for name in getattr(config, 'architectures', None) or ()
+        )
+
+        self.hidden_size = config.hidden_size
+        heads = config.num_attention_heads
+        head_size = _first(config, 'd_kv', 'head_dim') or self.hidden_size // heads
+        self.inner_size = heads * head_size
+        self.kv_size = (_first(config, 'num_key_value_heads') or heads) * head_size
+        self.vocab_size = config.vocab_size
+
+        self.encoder_ff = _first(config, 'encoder_ffn_dim', 'intermediate_size', 'd_ff',
+                                 'ffn_dim', 'n_inner') or 4 * self.hidden_size
+        self.decoder_ff = _first(config, 'decoder_ffn_dim') or self.encoder_ff
+        self.ff_matrices = 3 if getattr(config, 'is_gated_act', False) else 2
+
+        self.encoder_layers = _first(config, 'encoder_layers', 'num_layers',
+                                     'num_hidden_layers')
+        self.decoder_layers = _first(config, 'decoder_layers', 'num_decoder_layers') \
+            or self.encoder_layers
+
+        #: Fixed time of an encoder pass, or of a prompt pass of a decoder-only model
+        self.encode_overhead = 0.0
+
+        #: Fixed time of a generation step
+        self.step_overhead = 0.0
+
+        #: Time of a generation step added by every sequence of a batch beyond its
+        #: arithmetic: skinny multiplications and selection of tokens over the vocabulary
+        self.sequence_overhead = 0.0
+
+    def encode(self, input_length: int, batch_size: int = 1) -> StageCost:
+        """
+        Cost of the encoder pass, or of the prompt pass of a decoder-only model.
+
+        For encoder-decoder models projections of encoder tokens to keys and values
+        of cross-attention, done once before generation, are included.
+
+        Args:
+            input_length (int): The number of input tokens
+            batch_size (int): The number of sequences
+
+        Returns:
+            StageCost: Cost of the pass
+        """
+        tokens = batch_size * input_length
+        projection = 2 * self.hidden_size * (self.inner_size + self.kv_size)
+        feed_forward = self.ff_matrices * self.hidden_size * self.encoder_ff
+        flops = 2 * tokens * (projection + feed_forward) \
+            + 4 * batch_size * input_length ** 2 * self.inner_size
+        layers = self.decoder_layers if self.is_decoder_only else self.encoder_layers
+        cost = StageCost(flops * layers, (projection + feed_forward) * self._dtype_bytes * layers,
+                         tokens)
+        if self.is_encoder_decoder:
+            cross_projection = 2 * self.hidden_size * self.inner_size
+            cost = cost + StageCost(
+                2 * tokens * cross_projection * self.decoder_layers,
+                cross_projection * self._dtype_bytes * self.decoder_layers,
+                tokens,
+            )
+        return cost
+
+    def decode_step(self, position: int, input_length: int, batch_size: int = 1) -> StageCost:
+        """
+        Cost of a generation step producing one token for every sequence.
+
+        Args:
+            position (int): The number of tokens already in the key-value cache
+            input_length (int): The number of encoder tokens attended by cross-attention
+            batch_size (int): The number of sequences
+
+        Returns:
+            StageCost: Cost of the step
+        """
+        weights = 2 * self.hidden_size * (self.inner_size + self.kv_size) \
+            + self.ff_matrices * self.hidden_size * self.decoder_ff
+        flops = 2 * batch_size * weights + 4 * batch_size * (position + 1) * self.inner_size
+        cache = 2 * batch_size * (position + 1) * self.kv_size
+        if self.is_encoder_decoder:
+            cross_weights = 2 * self.hidden_size * self.inner_size
+            weights += cross_weights
+            flops += 2 * batch_size * cross_weights \
+                + 4 * batch_size * input_length * self.inner_size
+            cache += 2 * batch_size * input_length * self.inner_size
+
+        head = self.hidden_size * self.vocab_size
+        return StageCost(
+            flops * self.decoder_layers + 2 * batch_size * head,
+            ((weights + cache) * self.decoder_layers + head) * self._dtype_bytes,
+            batch_size,
+        )
+
+    def calibrate(self, model: Any, host: HostProfile, min_seconds: float = 0.2) -> None:
+        """
+        Measure fixed time of passes of a model on one-token inputs and short outputs.
+
+        Arithmetic of such passes is negligible, so their time is the overhead of
+        framework calls added to every pass. Generation is also measured on a batch
+        to find the time added by every sequence. Weights of the model do not matter,
+        a model created from the config is enough.
+
+        Args:
+            model (transformers.PreTrainedModel): Model to calibrate on
+            host (HostProfile): Measured speed of the host
+            min_seconds (float): The minimum duration of every measurement
+        """
+        token = torch.ones((1, 1), dtype=torch.long)
+        with torch.no_grad():
+            if not self.is_encoder_decoder and not self.is_decoder_only:
+                encode_time = time_per_call(lambda: model(input_ids=token), min_seconds)
+                self.encode_overhead = max(encode_time - self.encode(1).seconds(host), 0.0)
+                return
+
+            def step_time(batch_size: int) -> tuple[float, float]:
+                tokens = token.expand(batch_size, 1)
+                short_time, long_time = (
+                    time_per_call(
+                        lambda: model.generate(tokens, min_new_tokens=length,
+                                               max_new_tokens=length, do_sample=False,
+                                               num_beams=1),
+                        min_seconds,
+                    )
+                    for length in (short, long)
+                )
+                return short_time, (long_time - short_time) / (long - short)
+
+            short, long, batch_size = 2, 10, 4
+            short_time, single_step = step_time(1)
+            self.step_overhead = max(single_step - self.decode_step(short, 1).seconds(host), 0.0)
+            self.encode_overhead = max(
+                short_time - short * single_step - self.encode(1).seconds(host), 0.0
+            )
+
+            batch_step = step_time(batch_size)[1] \
+                - self.decode_step(short, 1, batch_size).seconds(host)
+            self.sequence_overhead = max(
+                (batch_step - self.step_overhead) / (batch_size - 1), 0.0
+            )
+
+    def estimate(self, host: HostProfile, input_length: int, output_length: int = 0,
+                 batch_size: int = 1, num_beams: int = 1) -> dict:
+        """
+        Estimate cost and latency of inference of a batch.
+
+        Args:
+            host (HostProfile): Measured speed of the host
+            input_length (int): The number of input tokens of every sequence
+            output_length (int): The number of generated tokens of every sequence,
+                ignored for encoder-only models
+            batch_size (int): The number of sequences
+            num_beams (int): The number of beams of every sequence
+
+        Returns:
+            dict: FLOPs, bytes read and seconds of encoding and generation,
+                total latency and throughput in sequences per second
+        """
+        encoding = self.encode(input_length, batch_size)
+        encoding_seconds = encoding.seconds(host) + self.encode_overhead
+
+        generation = StageCost()
+        generation_seconds = 0.0
+        first_position = 0 if self.is_encoder_decoder else input_length
+        generates = self.is_encoder_decoder or self.is_decoder_only
+        for step in range(output_length if generates else 0):
+            step_cost = self.decode_step(first_position + step, input_length,
+                                         batch_size * num_beams)
+            generation = generation + step_cost
+            generation_seconds += step_cost.seconds(host) + self.step_overhead \
+                + self.sequence_overhead * (batch_size * num_beams - 1)
+
+        latency = encoding_seconds + generation_seconds
+        return {
+            'encoder_gflops': round(encoding.flops / 1e9, 4),
+            'decoder_gflops': round(generation.flops / 1e9, 4),
+            'decoder_gb_read': round(generation.bytes / 1e9, 4),
+            'encoder_seconds': round(encoding_seconds, 5),
+            'decoder_seconds': round(generation_seconds, 5),
+            'latency': round(latency, 5),
+            'sequences_per_second': round(batch_size / latency, 3) if latency else 0.0,
+        }
@@ -0,0 +1,122 @@
+"""
+Module with statistics of assisted (speculative) decoding.
+"""
+
+# pylint: disable=duplicate-code
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Any
+
+
+@dataclass
+class DecodingStats:
+    """
+    Accumulated statistics of decoding with a draft model.
+    """
+
+    #: Number of tokens generated by the main model
+    generated_tokens: int = 0
+
+    #: Number of forward passes of the main model
+    target_calls: int = 0
+
+    #: Number of forward passes of the draft model, each proposing one token
+    draft_calls: int = 0
+
+    #: Time spent on generation
+    seconds: float = 0.0
+
+    @property
+    def acceptance_rate(self) -> float:
+        """
+        Share of draft tokens accepted by the main model.
+
+        Every verification pass of the main model yields one token of its own
+        on top of the accepted draft tokens.
+
+        Returns:
+            float: Acceptance rate in range [0, 1]
+        """
+        if not self.draft_calls:
+            return 0.0
+        accepted = max(0, self.generated_tokens - self.target_calls)
+        return min(1.0, accepted / self.draft_calls)
+
+    @property
+    def tokens_per_second(self) -> float:
+        """
+        Generation throughput.
+
+        Returns:
+            float: Generated tokens per second
+        """
+        if not self.seconds:
+            return 0.0
+        return self.generated_tokens / self.seconds
+
+    def as_dict(self) -> dict:
+        """
+        Represent statistics as a dictionary.
+
+        Returns:
+            dict: Statistics with computed rates
+        """
+        return {
+            'generated_tokens': self.generated_tokens,
+            'target_calls': self.target_calls,
+            'draft_calls': self.draft_calls,
+            'acceptance_rate': round(self.acceptance_rate, 4),
+            'tokens_per_second': round(self.tokens_per_second, 3),
+        }
+
+
+class ForwardCallCounter:
+    """
+    Context manager counting forward passes of a module.
+    """
+
+    def __init__(self, module: Any) -> None:
+        """
+        Initialize an instance of ForwardCallCounter.
+
+        Args:
+            module (torch.nn.Module): Module to watch
+        """
+        self._module = module
+        self._handle: Any = None
+        self.calls = 0
+
+    def __enter__(self) -> 'ForwardCallCounter':
+        """
+        Start counting forward passes.
+
+        Returns:
+            ForwardCallCounter: The counter itself
+        """
+        self._handle = self._module.register_forward_hook(self._count)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """
+        Stop counting forward passes.
+
+        Args:
+            exc_type (type[BaseException] | None): Type of a raised exception
+            exc_value (BaseException | None): Raised exception
+            traceback (TracebackType | None): Traceback of a raised exception
+        """
+        self._handle.remove()
+
+    def _count(self, *_: Any) -> None:
+        """
+        Forward hook incrementing the counter.
+
+        Args:
+            *_ (Any): Module, its inputs and outputs
+        """
+        self.calls += 1
@@ -0,0 +1,281 @@
+"""
+Module with fine-tuning running in the background of a service.
+"""
+
+# pylint: disable=duplicate-code, too-many-instance-attributes, import-outside-toplevel
+import asyncio
+import enum
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future, wait
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class JobState(enum.Enum):
+    """
+    States of a fine-tuning job.
+    """
+
+    #: Created, not started yet
+    PENDING = 'pending'
+
+    #: Training or saving the model
+    RUNNING = 'running'
+
+    #: Finished, the fine-tuned model is in use
+    SUCCEEDED = 'succeeded'
+
+    #: Stopped by an error
+    FAILED = 'failed'
+
+    def __str__(self) -> str:
+        """
+        String representation of a job state.
+
+        Returns:
+             str: Name of a state
+        """
+        return self.value
+
+
+@functools.cache
+def _progress_callback_class() -> type:
+    """
+    Define a trainer callback passing training progress to a job.
+
+    The class is defined on first use, so that transformers is imported
+    only when fine-tuning starts.
+
+    Returns:
+        type: Subclass of transformers.TrainerCallback
+    """
+    from transformers import TrainerCallback
+
+    class ProgressCallback(TrainerCallback):  # type: ignore
+        """
+        Trainer callback passing training progress to a job.
+        """
+
+        def __init__(self, job: 'FineTuningJob') -> None:
+            """
+            Initialize an instance of ProgressCallback.
+
+            Args:
+                job (FineTuningJob): Job to report progress to
+            """
+            self._job = job
+
+        def on_train_begin(self, args: Any, state: Any, control: Any, **kwargs: Any) -> None:
+            """
+            Record the number of training steps.
+
+            Args:
+                args (transformers.TrainingArguments): Training arguments
+                state (transformers.TrainerState): State of the trainer
+                control (transformers.TrainerControl): Control of the training loop
+                **kwargs (Any): Model, optimizer and other training objects
+            """
+            self._job.update(step=state.global_step, max_steps=state.max_steps)
+
+        def on_step_end(self, args: Any, state: Any, control: Any, **kwargs: Any) -> None:
+            """
+            Record a finished training step.
+
+            Args:
+                args (transformers.TrainingArguments): Training arguments
+                state (transformers.TrainerState): State of the trainer
+                control (transformers.TrainerControl): Control of the training loop
+                **kwargs (Any): Model, optimizer and other training objects
+            """
+            self._job.update(step=state.global_step, max_steps=state.max_steps)
+
+        def on_log(self, args: Any, state: Any, control: Any, logs: dict | None = None,
+                   **kwargs: Any) -> None:
+            """
+            Record the last training loss, or the mean one at the end of training.
+
+            Args:
+                args (transformers.TrainingArguments): Training arguments
+                state (transformers.TrainerState): State of the trainer
+                control (transformers.TrainerControl): Control of the training loop
+                logs (dict | None): Logged values
+                **kwargs (Any): Model, optimizer and other training objects
+            """
+            if logs:
+                self._job.update(loss=logs.get('loss', logs.get('train_loss')))
+
+    return ProgressCallback
+
+
+class FineTuningJob:
+    """
+    Fine-tuning run in a background thread while a service serves other models.
+
+    The fine-tuning function receives trainer callbacks reporting progress of the job.
+    Its result is passed to the finishing function, which puts the fine-tuned model
+    in use; the job succeeds only when both of them complete.
+
+    Transformers is imported by the job thread only after the preparing function
+    returns, so a preparing function that waits for the service to import it keeps
+    the two threads from importing heavy libraries at once.
+    """
+
+    def __init__(
+        self,
+        fine_tune: Callable[[list[Any]], Any],
+        on_finish: Callable[[Any], None],
+        prepare: Callable[[], Any] | None = None,
+    ) -> None:
+        """
+        Initialize an instance of FineTuningJob.
+
+        Args:
+            fine_tune (Callable[[list[Any]], Any]): Function fine-tuning a model
+                with the given trainer callbacks
+            on_finish (Callable[[Any], None]): Function receiving the result of fine-tuning
+            prepare (Callable[[], Any] | None): Function run in the job thread
+                before anything else, such as loading of the served models
+        """
+        self._fine_tune = fine_tune
+        self._on_finish = on_finish
+        self._prepare = prepare
+        self._lock = threading.Lock()
+        self._finished: Future = Future()
+        self._thread = threading.Thread(target=self._run, name='fine-tuning', daemon=True)
+
+        self._state = JobState.PENDING
+        self._started_at: float | None = None
+        self._finished_at: float | None = None
+        self._step = 0
+        self._max_steps = 0
+        self._loss: float | None = None
+        self._error: str | None = None
+
+    @property
+    def state(self) -> JobState:
+        """
+        State of the job.
+
+        Returns:
+            JobState: Current state
+        """
+        return self._state
+
+    def start(self) -> None:
+        """
+        Start fine-tuning in the background.
+        """
+        with self._lock:
+            self._state = JobState.RUNNING
+            self._started_at = time.monotonic()
+        self._thread.start()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Wait for the job to finish.
+
+        Args:
+            timeout (float | None): The maximum time to wait in seconds
+
+        Returns:
+            bool: Whether the job has finished
+        """
+        return not wait([self._finished], timeout).not_done
+
+    async def finished(self, timeout: float | None = None) -> bool:
+        """
+        Wait for the job to finish without blocking the event loop.
+
+        Args:
+            timeout (float | None): The maximum time to wait in seconds
+
+        Returns:
+            bool: Whether the job has finished
+        """
+        if self._finished.done():
+            return True
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(self._finished)), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def update(self, step: int | None = None, max_steps: int | None = None,
+               loss: float | None = None) -> None:
+        """
+        Record progress of fine-tuning.
+
+        Args:
+            step (int | None): The number of finished training steps
+            max_steps (int | None): The total number of training steps
+            loss (float | None): The last training loss
+        """
+        with self._lock:
+            if step is not None:
+                self._step = step
+            if max_steps is not None:
+                self._max_steps = max_steps
+            if loss is not None:
+                self._loss = loss
+
+    def eta(self) -> float | None:
+        """
+        Estimate the time left until the end of training.
+
+        Returns:
+            float | None: Seconds left, None before the first step
+        """
+        with self._lock:
+            if self._started_at is None or not self._step or self._state != JobState.RUNNING:
+                return None
+            elapsed = time.monotonic() - self._started_at
+            return elapsed / self._step * max(self._max_steps - self._step, 0)
+
+    def stats(self) -> dict:
+        """
+        Collect progress of the job.
+
+        Returns:
+            dict: State, training steps, the last loss, elapsed and remaining time
+        """
+        eta = self.eta()
+        with self._lock:
+            if self._started_at is None:
+                elapsed = 0.0
+            else:
+                elapsed = (self._finished_at or time.monotonic()) - self._started_at
+            return {
+                'state': str(self._state),
+                'step': self._step,
+                'max_steps': self._max_steps,
+                'progress': round(self._step / self._max_steps, 4) if self._max_steps else 0.0,
+                'loss': self._loss,
+                'elapsed': round(elapsed, 3),
+                'eta': None if eta is None else round(eta, 3),
+                'error': self._error,
+            }
+
+    def _run(self) -> None:
+        """
+        Fine-tune the model and pass the result to the finishing function.
+        """
+        try:
+            if self._prepare is not None:
+                self._prepare()
+            self._on_finish(self._fine_tune([_progress_callback_class()(self)]))
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            logger.exception('fine-tuning failed')
+            with self._lock:
+                self._state = JobState.FAILED
+                self._error = repr(error)
+        else:
+            with self._lock:
+                self._state = JobState.SUCCEEDED
+        finally:
+            with self._lock:
+                self._finished_at = time.monotonic()
+            self._finished.set_result(None)
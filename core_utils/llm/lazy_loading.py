@@ -0,0 +1,141 @@
+"""
+Module with lazy loading of models served by a service.
+"""
+
+# pylint: disable=duplicate-code, too-many-instance-attributes
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class LazyLoader(Generic[T]):
+    """
+    Value created on first use, such as a loaded model.
+
+    A service starts accepting connections before its models are loaded: the first
+    request loads them, or loading is started in the background right away and
+    requests wait for it. After loading the optional warm-up runs once, so that
+    one-time costs of the first inference are not paid by a request.
+    A failed loading is retried by the next request.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], T],
+        warm_up: Callable[[T], Any] | None = None,
+        name: str = 'model',
+    ) -> None:
+        """
+        Initialize an instance of LazyLoader.
+
+        Args:
+            factory (Callable[[], T]): Blocking function creating the value
+            warm_up (Callable[[T], Any] | None): Blocking function run once with the
+                created value before it is used
+            name (str): Name of the value for logs
+        """
+        self._factory = factory
+        self._warm_up = warm_up
+        self._name = name
+        self._lock = threading.Lock()
+        self._value: T | None = None
+        self._loaded = False
+        self._loading = False
+        self._load_seconds: float | None = None
+        self._warm_up_seconds: float | None = None
+        self._error: str | None = None
+
+    @property
+    def loaded(self) -> bool:
+        """
+        Property with the state of loading.
+
+        Returns:
+            bool: Whether the value is created and warmed up
+        """
+        return self._loaded
+
+    def get(self) -> T:
+        """
+        Get the value, creating it on the first call.
+
+        Concurrent callers wait for one creation.
+
+        Returns:
+            T: The value
+        """
+        if self._loaded:
+            return self._value  # type: ignore
+        with self._lock:
+            if not self._loaded:
+                self._load()
+        return self._value  # type: ignore
+
+    async def aget(self) -> T:
+        """
+        Get the value without blocking the event loop while it is created.
+
+        Returns:
+            T: The value
+        """
+        if self._loaded:
+            return self._value  # type: ignore
+        return await asyncio.get_running_loop().run_in_executor(None, self.get)
+
+    def preload(self) -> None:
+        """
+        Start creating the value in a background thread.
+        """
+        def load() -> None:
+            try:
+                self.get()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception('loading of %s failed', self._name)
+
+        threading.Thread(target=load, name=f'load-{self._name}', daemon=True).start()
+
+    def stats(self) -> dict:
+        """
+        Collect the state of loading.
+
+        Returns:
+            dict: Whether the value is loaded, loading time, warm-up time and the last error
+        """
+        return {
+            'loaded': self._loaded,
+            'loading': self._loading,
+            'load_seconds': self._load_seconds,
+            'warm_up_seconds': self._warm_up_seconds,
+            'error': self._error,
+        }
+
+    def _load(self) -> None:
+        """
+        Create and warm up the value, must be called with the lock held.
+        """
+        self._loading = True
+        try:
+            start = time.perf_counter()
+            value = self._factory()
+            self._load_seconds = round(time.perf_counter() - start, 3)
+            logger.info('%s loaded in %.2f s', self._name, self._load_seconds)
+
+            if self._warm_up is not None:
+                start = time.perf_counter()
+                self._warm_up(value)
+                self._warm_up_seconds = round(time.perf_counter() - start, 3)
+                logger.info('%s warmed up in %.2f s', self._name, self._warm_up_seconds)
+        except Exception as error:
+            self._error = repr(error)
+            raise
+        finally:
+            self._loading = False
+        self._value = value
+        self._error = None
+        self._loaded = True
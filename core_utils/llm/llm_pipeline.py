@@ -65,6 +65,7 @@ class AbstractLLMPipeline(ABC):
         max_length: int,
         batch_size: int,
         device: str = "cpu",
+        max_batch_tokens: int | None = None,
     ) -> None:
         """
         Initialize an instance of AbstractLLMPipeline.
@@ -73,8 +74,10 @@ class AbstractLLMPipeline(ABC):
             model_name (str): The name of the pre-trained model.
             dataset (torch.utils.data.dataset.Dataset): The dataset used.
             max_length (int): The maximum length of generated sequence.
-            batch_size (int): The size of the batch inside DataLoader.
+            batch_size (int): The maximum number of samples in a batch planned by plan_batches.
             device (str): The device for inference.
+            max_batch_tokens (int | None): The maximum number of padded tokens in a batch.
+                If set, it is used instead of batch_size to form batches.
         """
         self._model_name = model_name
         self._model = None
@@ -82,6 +85,7 @@ class AbstractLLMPipeline(ABC):
         self._max_length = max_length
         self._batch_size = batch_size
         self._device = device
+        self._max_batch_tokens = max_batch_tokens
 
     @abstractmethod
     def infer_sample(self, sample: tuple[str, ...]) -> str | None:
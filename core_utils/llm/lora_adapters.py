@@ -0,0 +1,154 @@
+"""
+Module with serving of several LoRA adapters over one base model.
+"""
+
+# pylint: disable=duplicate-code, import-outside-toplevel
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Sequence
+
+#: Name of the subdirectory of a fine-tuned model where its LoRA adapter is saved
+ADAPTER_DIR = 'adapter'
+
+#: Name under which rows inferred without adapters are passed to and reported by peft
+BASE_MODEL = '__base__'
+
+
+class LoraAdapters:
+    """
+    LoRA adapters attached to one base model.
+
+    Adapters are injected into layers of the base model in place, so the weights
+    of the base model are kept in memory once for all fine-tunes. Rows of one batch
+    may target different adapters: the base model computation is shared by them and
+    every row gets the low-rank delta of its own adapter. Model calls are done under
+    a lock, as activation and routing of adapters change the shared layers.
+    """
+
+    def __init__(self, model: Any, adapters: dict[str, Path]) -> None:
+        """
+        Initialize an instance of LoraAdapters.
+
+        Args:
+            model (torch.nn.Module): Base model
+            adapters (dict[str, pathlib.Path]): Directories of saved adapters by names
+        """
+        if not adapters:
+            raise ValueError('At least one adapter is required')
+        from peft import PeftModel
+
+        self._lock = threading.Lock()
+        self._active: str | None = None
+
+        names = iter(adapters)
+        first = next(names)
+        self.model = PeftModel.from_pretrained(model, str(adapters[first]), adapter_name=first)
+        for name in names:
+            self.model.load_adapter(str(adapters[name]), adapter_name=name)
+        self.model.eval()
+
+        self._switches = 0
+        self._mixed_batches = 0
+        self._stats_lock = threading.Lock()
+        self._samples: dict[str, int] = {}
+        self._seconds: dict[str, float] = {}
+
+    @property
+    def names(self) -> list[str]:
+        """
+        Names of loaded adapters.
+
+        Returns:
+            list[str]: Adapter names
+        """
+        return list(self.model.peft_config)
+
+    def stats(self) -> dict:
+        """
+        Collect statistics of adapters.
+
+        Model time of a batch is divided between adapters in proportion to their rows,
+        so the base model computation shared by a mixed batch is amortized over all of them.
+
+        Returns:
+            dict: Loaded adapters, the active one, the number of switches
+                and throughput of every adapter
+        """
+        with self._stats_lock:
+            throughput = {
+                name: {
+                    'samples': samples,
+                    'samples_per_second': round(samples / self._seconds[name], 3)
+                    if self._seconds[name] else 0.0,
+                }
+                for name, samples in self._samples.items()
+            }
+        return {'adapters': self.names, 'active': self._active, 'switches': self._switches,
+                'mixed_batches': self._mixed_batches, 'throughput': throughput}
+
+    @contextmanager
+    def route(self, adapters: Sequence[str | None]) -> Iterator[list[str] | None]:
+        """
+        Hold the model for a batch whose rows are inferred with their own adapters.
+
+        A batch of rows of one adapter is inferred with the adapter activated,
+        rows of a mixed batch are routed through their adapters by the model call.
+
+        Args:
+            adapters (Sequence[str | None]): Adapter names of rows, None for the base model
+
+        Yields:
+            list[str] | None: Value of `adapter_names` argument of the model call,
+                None if the batch is inferred with one activated adapter
+        """
+        unknown = {adapter for adapter in adapters if adapter is not None} - set(self.names)
+        if unknown:
+            raise ValueError(f'Unknown adapters: {", ".join(sorted(unknown))}')
+
+        start = time.perf_counter()
+        distinct = set(adapters)
+        with self._lock:
+            if len(distinct) == 1:
+                with self._activated(next(iter(distinct))):
+                    yield None
+            else:
+                self._mixed_batches += 1
+                yield [BASE_MODEL if adapter is None else adapter for adapter in adapters]
+        self._record(adapters, time.perf_counter() - start)
+
+    @contextmanager
+    def _activated(self, adapter: str | None) -> Iterator[None]:
+        """
+        Activate an adapter, must be used with the lock held.
+
+        Args:
+            adapter (str | None): Name of the adapter, None for the base model
+
+        Yields:
+            None: Control while the adapter is active
+        """
+        if adapter != self._active:
+            self._switches += 1
+            self._active = adapter
+        if adapter is None:
+            with self.model.disable_adapter():
+                yield
+        else:
+            self.model.set_adapter(adapter)
+            yield
+
+    def _record(self, adapters: Sequence[str | None], duration: float) -> None:
+        """
+        Account rows of a batch and its model time to adapters.
+
+        Args:
+            adapters (Sequence[str | None]): Adapter names of rows, None for the base model
+            duration (float): Model time of the batch in seconds
+        """
+        with self._stats_lock:
+            for adapter in adapters:
+                name = BASE_MODEL if adapter is None else adapter
+                self._samples[name] = self._samples.get(name, 0) + 1
+                self._seconds[name] = self._seconds.get(name, 0.0) + duration / len(adapters)
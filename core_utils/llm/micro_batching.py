@@ -0,0 +1,184 @@
+"""
+Module with asynchronous micro-batching of inference requests.
+"""
+
+# pylint: disable=duplicate-code, too-many-instance-attributes
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, Sequence
+
+from core_utils.llm.bounded_executor import QueueFullError
+from core_utils.llm.service_metrics import BATCH_SIZE
+
+
+class MicroBatcher:
+    """
+    Queue collecting concurrent requests into batches for a single model call.
+
+    A batch is dispatched when it is full or when the collection window expires.
+    The window adapts to the observed interval between requests: when the next
+    request is not expected within the maximum window, a request is dispatched
+    at once, so a single client is served as fast as without batching.
+    """
+
+    def __init__(
+        self,
+        infer_batch: Callable[[list[Any]], Sequence[Any]],
+        max_batch_size: int,
+        max_wait: float,
+        executor: Executor | None = None,
+        max_queue_size: int | None = None,
+        retry_after: float = 1.0,
+        max_concurrent_batches: int = 1,
+    ) -> None:
+        """
+        Initialize an instance of MicroBatcher.
+
+        Args:
+            infer_batch (Callable[[list[Any]], Sequence[Any]]): Blocking function returning
+                one result per item of a batch
+            max_batch_size (int): The maximum number of requests in a batch
+            max_wait (float): The maximum time in seconds to wait for a batch to fill
+            executor (concurrent.futures.Executor | None): Executor running model calls,
+                the default executor of the event loop if not given
+            max_queue_size (int | None): The maximum number of requests waiting for a batch,
+                unlimited if not given
+            retry_after (float): Suggested delay in seconds before retrying a rejected request
+            max_concurrent_batches (int): The maximum number of batches inferred at once
+        """
+        self._infer_batch = infer_batch
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._executor = executor
+        self._max_queue_size = max_queue_size
+        self._retry_after = retry_after
+        self._max_concurrent_batches = max_concurrent_batches
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+        self._last_arrival: float | None = None
+        self._interval = max_wait
+
+        self._batches = 0
+        self._requests = 0
+
+    @property
+    def window(self) -> float:
+        """
+        Property with the current collection window.
+
+        Returns:
+            float: Time in seconds to wait for a batch to fill
+        """
+        if self._interval >= self._max_wait:
+            return 0.0
+        return min(self._max_wait, self._interval * (self._max_batch_size - 1))
+
+    def stats(self) -> dict:
+        """
+        Collect batching statistics.
+
+        Returns:
+            dict: Counters of batches and requests with the current window
+        """
+        return {
+            'batches': self._batches,
+            'requests': self._requests,
+            'mean_batch_size': round(self._requests / self._batches, 3) if self._batches else 0.0,
+            'queue_depth': self._queue.qsize(),
+            'window': round(self.window, 4),
+        }
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Infer a request as a part of a batch.
+
+        Args:
+            item (Any): Request to infer
+
+        Returns:
+            Any: Result for the request
+
+        Raises:
+            QueueFullError: If too many requests are waiting
+        """
+        if self._max_queue_size is not None and self._queue.qsize() >= self._max_queue_size:
+            raise QueueFullError(self._retry_after)
+
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+        now = loop.time()
+        if self._last_arrival is not None:
+            self._interval = 0.8 * self._interval + 0.2 * (now - self._last_arrival)
+        self._last_arrival = now
+
+        future = loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self) -> None:
+        """
+        Collect and infer batches until the event loop is closed.
+        """
+        slots = asyncio.Semaphore(self._max_concurrent_batches)
+        while True:
+            await slots.acquire()
+            batch = await self._collect()
+            task = asyncio.get_running_loop().create_task(self._infer(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _infer(self, batch: list[tuple[Any, asyncio.Future]]) -> None:
+        """
+        Infer a batch in the executor and resolve futures of its requests.
+
+        Args:
+            batch (list[tuple[Any, asyncio.Future]]): Requests with futures of their results
+        """
+        items = [item for item, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._infer_batch, items
+            )
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        self._batches += 1
+        self._requests += len(batch)
+        BATCH_SIZE.observe(len(batch), batcher='micro')
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _collect(self) -> list[tuple[Any, asyncio.Future]]:
+        """
+        Wait for a batch to fill or for the window to expire.
+
+        Returns:
+            list[tuple[Any, asyncio.Future]]: Requests with futures of their results
+        """
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.window
+        while len(batch) < self._max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
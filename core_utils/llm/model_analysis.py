@@ -0,0 +1,120 @@
+"""
+Module with analysis of model properties without model weights.
+"""
+
+# pylint: disable=duplicate-code
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+try:
+    import torch
+except ImportError:
+    print('Library "torch" not installed. Failed to import.')
+
+from core_utils.llm.prediction_cache import fingerprint
+
+
+def config_fingerprint(model_class: Any, config: Any) -> str:
+    """
+    Compute identity of a model architecture from its config.
+
+    The name or path of the model is not taken into account, so models
+    with identical configs share the identity.
+
+    Args:
+        model_class (type): Auto class of transformers models creating the model
+        config (transformers.PretrainedConfig): Config of the model
+
+    Returns:
+        str: Hexadecimal SHA-256 digest
+    """
+    values = config.to_dict()
+    values.pop('_name_or_path', None)
+    return fingerprint(model_class.__name__, json.dumps(values, sort_keys=True, default=str))
+
+
+def create_meta_model(model_class: Any, config: Any) -> Any:
+    """
+    Create a model on the meta device: its tensors have shapes but no data.
+
+    A forward pass of such a model only infers shapes of outputs, so it takes
+    no memory and almost no time. Eager attention is used as other implementations
+    check values of attention masks.
+
+    Args:
+        model_class (type): Auto class of transformers models to create the model with
+        config (transformers.PretrainedConfig): Config of the model
+
+    Returns:
+        torch.nn.Module: Model in evaluation mode
+    """
+    with torch.device('meta'):
+        return model_class.from_config(config, attn_implementation='eager').eval()
+
+
+class ModelAnalysisCache:
+    """
+    JSON file with model analysis by identities of model architectures.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """
+        Initialize an instance of ModelAnalysisCache.
+
+        Args:
+            path (pathlib.Path): Path to the file
+        """
+        self._path = path
+        self._lock = threading.Lock()
+
+    def analyze(self, model_class: Any, config: Any, analyze: Callable[[Any], dict]) -> dict:
+        """
+        Get analysis of a model, computing it on the meta device if it is not cached.
+
+        Args:
+            model_class (type): Auto class of transformers models creating the model
+            config (transformers.PretrainedConfig): Config of the model
+            analyze (Callable[[Any], dict]): Function analyzing a model on the meta device
+
+        Returns:
+            dict: Properties of the model in JSON types
+        """
+        key = config_fingerprint(model_class, config)
+        with self._lock:
+            analyses = self._load()
+            if key not in analyses:
+                analyses[key] = json.loads(json.dumps(
+                    analyze(create_meta_model(model_class, config))
+                ))
+                self._save(analyses)
+            return analyses[key]
+
+    def _load(self) -> dict:
+        """
+        Read cached analyses.
+
+        Returns:
+            dict: Analyses by identities, empty if the file is missing or damaged
+        """
+        try:
+            with open(self._path, encoding='utf-8') as file:
+                analyses = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        return analyses if isinstance(analyses, dict) else {}
+
+    def _save(self, analyses: dict) -> None:
+        """
+        Write analyses replacing the file at once.
+
+        Args:
+            analyses (dict): Analyses by identities
+        """
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self._path.with_name(f'{self._path.name}.{os.getpid()}.tmp')
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(analyses, file, indent=4, sort_keys=True)
+        os.replace(temporary, self._path)
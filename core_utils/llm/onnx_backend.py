@@ -0,0 +1,105 @@
+"""
+Module with ONNX Runtime backend for HuggingFace models.
+"""
+
+# pylint: disable=duplicate-code, import-outside-toplevel
+import enum
+from pathlib import Path
+from typing import Any
+
+from core_utils.llm.prediction_cache import model_fingerprint
+
+
+class Backend(enum.Enum):
+    """
+    Inference backends enum.
+    """
+
+    TORCH = "torch"
+    ONNX = "onnx"
+
+    def __str__(self) -> str:
+        """
+        String representation of a backend.
+
+        Returns:
+             str: Name of a backend
+        """
+        return self.value
+
+
+class OnnxTask(enum.Enum):
+    """
+    Model heads supported by ONNX backend.
+    """
+
+    SEQ2SEQ = "seq2seq"
+    CLASSIFICATION = "classification"
+
+
+def get_export_dir(model_name: str, export_root: Path) -> Path:
+    """
+    Choose a directory for exported graphs of a model.
+
+    Graphs of a local model are stored next to its weights, graphs of a model
+    from HuggingFace Hub are stored under the given root.
+
+    Args:
+        model_name (str): The name of the pre-trained model or a path to it
+        export_root (pathlib.Path): Root directory for exports of Hub models
+
+    Returns:
+        pathlib.Path: Directory for exported graphs
+    """
+    if Path(model_name).is_dir():
+        return Path(model_name) / 'onnx'
+    return export_root / model_name
+
+
+def load_onnx_model(model_name: str, task: OnnxTask, export_root: Path) -> Any:
+    """
+    Load a model exported to ONNX, exporting it on first use.
+
+    A seq2seq model is exported as an encoder and a decoder with past key values.
+    Exported graphs are reused until the source model changes. ONNX Runtime
+    is imported on first load, so that importing the module stays cheap.
+
+    Args:
+        model_name (str): The name of the pre-trained model or a path to it
+        task (OnnxTask): Model head
+        export_root (pathlib.Path): Root directory for exports of Hub models
+
+    Returns:
+        Any: ONNX Runtime model with HuggingFace interface on CPU provider
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTModelForSequenceClassification
+    except ImportError as error:
+        raise ImportError('ONNX backend requires "optimum[onnxruntime]" library') from error
+    from transformers import GenerationConfig
+
+    model_class = {
+        OnnxTask.SEQ2SEQ: ORTModelForSeq2SeqLM,
+        OnnxTask.CLASSIFICATION: ORTModelForSequenceClassification,
+    }[task]
+
+    export_dir = get_export_dir(model_name, export_root)
+    source_path = export_dir / 'source_fingerprint.txt'
+    source = model_fingerprint(model_name)
+
+    if source_path.exists() and source_path.read_text(encoding='utf-8') == source:
+        model = model_class.from_pretrained(export_dir, provider='CPUExecutionProvider')
+    else:
+        export_kwargs = {'use_cache': True} if task is OnnxTask.SEQ2SEQ else {}
+        model = model_class.from_pretrained(
+            model_name, export=True, provider='CPUExecutionProvider', **export_kwargs
+        )
+        model.save_pretrained(export_dir)
+        source_path.write_text(source, encoding='utf-8')
+
+    if task is OnnxTask.SEQ2SEQ:
+        try:
+            model.generation_config = GenerationConfig.from_pretrained(model_name)
+        except OSError:
+            model.generation_config = GenerationConfig.from_model_config(model.config)
+    return model
@@ -0,0 +1,184 @@
+"""
+Module with data-parallel inference across worker processes.
+"""
+
+# pylint: disable=duplicate-code
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+from typing import Any, Callable, Sequence
+
+try:
+    import torch
+except ImportError:
+    print('Library "torch" not installed. Failed to import.')
+
+try:
+    from pandas import DataFrame
+except ImportError:
+    print('Library "pandas" not installed. Failed to import.')
+    DataFrame = dict  # type: ignore
+
+
+def split_into_shards(num_samples: int, num_shards: int) -> list[range]:
+    """
+    Split sample indices into contiguous shards of almost equal size.
+
+    Args:
+        num_samples (int): The number of samples
+        num_shards (int): The number of shards
+
+    Returns:
+        list[range]: Non-empty ranges of sample indices
+    """
+    base, remainder = divmod(num_samples, num_shards)
+    shards = []
+    start = 0
+    for shard_index in range(num_shards):
+        stop = start + base + (1 if shard_index < remainder else 0)
+        if stop > start:
+            shards.append(range(start, stop))
+        start = stop
+    return shards
+
+
+def default_threads_per_worker(num_workers: int) -> int:
+    """
+    Divide available CPU cores between worker processes.
+
+    Args:
+        num_workers (int): The number of worker processes
+
+    Returns:
+        int: The number of intra-op threads for each worker
+    """
+    return max(1, (os.cpu_count() or 1) // num_workers)
+
+
+def _run_worker(
+    shard_index: int,
+    pipeline_factory: Callable[[Any], Any],
+    shard: Any,
+    num_threads: int,
+    infer_kwargs: dict,
+    results: Any,
+) -> None:
+    """
+    Infer a single shard inside a worker process.
+
+    Args:
+        shard_index (int): Position of the shard
+        pipeline_factory (Callable[[Any], Any]): Picklable function that creates a pipeline
+            for the given dataset
+        shard (Any): Dataset shard
+        num_threads (int): The number of intra-op threads
+        infer_kwargs (dict): Arguments of infer_dataset
+        results (Any): Queue to put the result to
+    """
+    torch.set_num_threads(num_threads)
+    try:
+        pipeline = pipeline_factory(shard)
+        predictions = pipeline.infer_dataset(**infer_kwargs)
+        results.put((shard_index, (predictions, pipeline.padding_stats), None))
+    except Exception:  # pylint: disable=broad-exception-caught
+        results.put((shard_index, None, traceback.format_exc()))
+
+
+def infer_in_processes(
+    pipeline_factory: Callable[[Any], Any],
+    shards: Sequence[Any],
+    num_threads: int,
+    **infer_kwargs: Any,
+) -> list[tuple[DataFrame, Any]]:
+    """
+    Infer shards in separate processes, one process per shard.
+
+    Each process loads its own model copy once and uses a fixed number of
+    intra-op threads. Processes are spawned, so the factory and shards must be picklable.
+    If a worker fails, the others are terminated: a worker blocked on putting its
+    result to the queue would never exit otherwise.
+
+    Args:
+        pipeline_factory (Callable[[Any], Any]): Picklable function that creates a pipeline
+            for the given dataset
+        shards (Sequence[Any]): Dataset shards
+        num_threads (int): The number of intra-op threads for each process
+        **infer_kwargs (Any): Arguments of infer_dataset
+
+    Returns:
+        list[tuple[DataFrame, Any]]: Predictions and padding statistics of pipelines
+            in the order of shards
+
+    Raises:
+        RuntimeError: If inference fails in a worker process
+    """
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=_run_worker,
+            args=(index, pipeline_factory, shard, num_threads, infer_kwargs, results),
+        )
+        for index, shard in enumerate(shards)
+    ]
+    for worker in workers:
+        worker.start()
+
+    collected: dict[int, tuple[DataFrame, Any]] = {}
+    errors = []
+    while len(collected) < len(workers) and not errors:
+        try:
+            shard_index, result, error = results.get(timeout=1)
+        except queue.Empty:
+            crashed = [
+                index for index, worker in enumerate(workers)
+                if index not in collected and worker.exitcode not in (None, 0)
+            ]
+            if crashed:
+                exitcode = workers[crashed[0]].exitcode
+                errors.append(f'worker {crashed[0]} exited with code {exitcode}')
+            continue
+        if error is not None:
+            errors.append(error)
+        collected[shard_index] = result
+    for worker in workers:
+        if errors and worker.is_alive():
+            worker.terminate()
+        worker.join()
+
+    if errors:
+        raise RuntimeError(f'Inference failed in a worker process:\n{errors[0]}')
+    return [collected[index] for index in range(len(shards))]
+
+
+def measure_scaling(
+    run: Callable[[int], None], process_counts: Sequence[int], num_samples: int
+) -> dict[int, dict[str, float]]:
+    """
+    Measure throughput of inference for different numbers of processes.
+
+    Args:
+        run (Callable[[int], None]): Function that infers the dataset with the given
+            number of processes
+        process_counts (Sequence[int]): Numbers of processes to try
+        num_samples (int): The number of samples inferred by each run
+
+    Returns:
+        dict[int, dict[str, float]]: Duration, throughput and speedup per process count
+    """
+    report: dict[int, dict[str, float]] = {}
+    for num_processes in process_counts:
+        start = time.perf_counter()
+        run(num_processes)
+        duration = time.perf_counter() - start
+        report[num_processes] = {
+            'seconds': round(duration, 3),
+            'samples_per_second': round(num_samples / duration, 3),
+        }
+
+    baseline = report[process_counts[0]]['samples_per_second'] if process_counts else 0
+    for stats in report.values():
+        stats['speedup'] = round(stats['samples_per_second'] / baseline, 3)
+    return report
@@ -0,0 +1,131 @@
+"""
+Module with persistent storage of model predictions.
+"""
+
+# pylint: disable=duplicate-code
+import hashlib
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Sequence
+
+
+def fingerprint(*parts: Any) -> str:
+    """
+    Compute a stable hash of the given parts.
+
+    Args:
+        *parts (Any): Values to hash, converted to strings
+
+    Returns:
+        str: Hexadecimal SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+
+def model_fingerprint(model_name: str, *settings: Any) -> str:
+    """
+    Compute identity of a model together with its inference settings.
+
+    For a local model directory modification times of its files are taken into
+    account, so that a re-trained model does not reuse stale predictions.
+
+    Args:
+        model_name (str): The name of the pre-trained model or a path to it
+        *settings (Any): Inference settings affecting predictions
+
+    Returns:
+        str: Hexadecimal SHA-256 digest
+    """
+    model_path = Path(model_name)
+    files_state = []
+    if model_path.is_dir():
+        files_state = [
+            f'{file.name}:{file.stat().st_mtime_ns}'
+            for file in sorted(model_path.iterdir())
+            if file.is_file()
+        ]
+    return fingerprint(model_name, *files_state, *settings)
+
+
+class PredictionCache:
+    """
+    SQLite storage of predictions keyed by model identity and input sample.
+    """
+
+    def __init__(self, path: Path, namespace: str) -> None:
+        """
+        Initialize an instance of PredictionCache.
+
+        Args:
+            path (pathlib.Path): Path to SQLite database file
+            namespace (str): Identity of the model and inference settings
+        """
+        self._path = path
+        self._namespace = namespace
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as connection, connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS predictions ('
+                'namespace TEXT NOT NULL, '
+                'sample_hash TEXT NOT NULL, '
+                'prediction TEXT NOT NULL, '
+                'PRIMARY KEY (namespace, sample_hash))'
+            )
+
+    def get_many(self, samples: Sequence[tuple[str, ...]]) -> list[str | None]:
+        """
+        Look up stored predictions for the given samples.
+
+        Args:
+            samples (Sequence[tuple[str, ...]]): Samples to look up
+
+        Returns:
+            list[str | None]: Stored predictions, None for misses
+        """
+        hashes = [fingerprint(*sample) for sample in samples]
+        found: dict[str, str] = {}
+        with closing(self._connect()) as connection:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                rows = connection.execute(
+                    'SELECT sample_hash, prediction FROM predictions '
+                    f'WHERE namespace = ? AND sample_hash IN ({placeholders})',
+                    (self._namespace, *chunk),
+                )
+                found.update(rows)
+        return [found.get(sample_hash) for sample_hash in hashes]
+
+    def put_many(self, samples: Sequence[tuple[str, ...]], predictions: Sequence[str]) -> None:
+        """
+        Store predictions for the given samples.
+
+        Args:
+            samples (Sequence[tuple[str, ...]]): Inferred samples
+            predictions (Sequence[str]): Predictions for the samples
+        """
+        rows = [
+            (self._namespace, fingerprint(*sample), prediction)
+            for sample, prediction in zip(samples, predictions)
+        ]
+        with closing(self._connect()) as connection, connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO predictions (namespace, sample_hash, prediction) '
+                'VALUES (?, ?, ?)',
+                rows,
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open a new connection to the database.
+
+        Returns:
+            sqlite3.Connection: Database connection
+        """
+        return sqlite3.connect(self._path, timeout=30)
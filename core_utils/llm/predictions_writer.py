@@ -0,0 +1,102 @@
+"""
+Module with incremental, resumable storage of predictions.
+"""
+
+# pylint: disable=duplicate-code
+import json
+import os
+from pathlib import Path
+
+try:
+    from pandas import DataFrame
+except ImportError:
+    print('Library "pandas" not installed. Failed to import.')
+    DataFrame = dict  # type: ignore
+
+
+class PredictionsWriter:
+    """
+    Appends chunks of predictions to a CSV file and records a checkpoint after each chunk.
+
+    The resulting file is the same as the one written by DataFrame.to_csv for the
+    whole predictions table, so it can be passed to a task evaluator as is.
+    """
+
+    def __init__(self, path: Path, run_id: str) -> None:
+        """
+        Initialize an instance of PredictionsWriter.
+
+        If a checkpoint of the same run exists, the file is truncated to the last
+        completely written chunk and writing continues from there. Otherwise,
+        the file is written from scratch.
+
+        Args:
+            path (pathlib.Path): Path to CSV file with predictions
+            run_id (str): Identity of the model, its settings and the dataset
+        """
+        self._path = path
+        self._checkpoint_path = path.with_name(f'{path.name}.checkpoint.json')
+        self._run_id = run_id
+        self._offset = 0
+        self._size = 0
+
+        checkpoint = self._read_checkpoint()
+        if (checkpoint is not None and self._path.exists()
+                and self._path.stat().st_size >= checkpoint['bytes']):
+            self._offset = checkpoint['rows']
+            self._size = checkpoint['bytes']
+            with self._path.open('r+b') as file:
+                file.truncate(self._size)
+        else:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._path.unlink(missing_ok=True)
+
+    @property
+    def offset(self) -> int:
+        """
+        Property with the number of rows already written.
+
+        Returns:
+            int: Number of written rows
+        """
+        return self._offset
+
+    def append(self, chunk: DataFrame) -> None:
+        """
+        Append a chunk of predictions and record a checkpoint.
+
+        Args:
+            chunk (pandas.DataFrame): Predictions for the next rows of the dataset
+        """
+        with self._path.open('a', encoding='utf-8', newline='') as file:
+            chunk.to_csv(file, header=self._offset == 0)
+            file.flush()
+            os.fsync(file.fileno())
+
+        self._offset += len(chunk)
+        self._size = self._path.stat().st_size
+        self._write_checkpoint()
+
+    def _read_checkpoint(self) -> dict | None:
+        """
+        Read the checkpoint of the current run.
+
+        Returns:
+            dict | None: Checkpoint if it exists and belongs to the same run
+        """
+        if not self._checkpoint_path.exists():
+            return None
+        with self._checkpoint_path.open(encoding='utf-8') as file:
+            checkpoint: dict = json.load(file)
+        if checkpoint.get('run_id') != self._run_id:
+            return None
+        return checkpoint
+
+    def _write_checkpoint(self) -> None:
+        """
+        Atomically replace the checkpoint with the current state.
+        """
+        temporary_path = self._checkpoint_path.with_suffix('.tmp')
+        with temporary_path.open('w', encoding='utf-8') as file:
+            json.dump({'run_id': self._run_id, 'rows': self._offset, 'bytes': self._size}, file)
+        os.replace(temporary_path, self._checkpoint_path)
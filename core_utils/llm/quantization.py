@@ -0,0 +1,171 @@
+"""
+Module with int8 quantization of models for CPU inference.
+"""
+
+# pylint: disable=duplicate-code
+import enum
+import io
+from typing import Any, Callable, Sequence
+
+try:
+    import torch
+    from torch import nn
+except ImportError:
+    print('Library "torch" not installed. Failed to import.')
+    nn = None  # type: ignore
+
+#: Output and classification heads kept in float precision
+MODULES_TO_NOT_CONVERT = ('lm_head', 'classifier', 'score')
+
+
+class QuantizationMode(enum.Enum):
+    """
+    Quantization modes enum.
+    """
+
+    #: Int8 weights, activations are quantized on the fly
+    DYNAMIC = "dynamic"
+
+    #: Int8 weights and activations with ranges calibrated on data
+    STATIC = "static"
+
+    def __str__(self) -> str:
+        """
+        String representation of a quantization mode.
+
+        Returns:
+             str: Name of a mode
+        """
+        return self.value
+
+
+class StaticQuantLinear(nn.Module):  # type: ignore
+    """
+    Linear layer surrounded by quantization and dequantization of its input and output.
+    """
+
+    def __init__(self, linear: Any) -> None:
+        """
+        Initialize an instance of StaticQuantLinear.
+
+        Args:
+            linear (torch.nn.Linear): Layer to quantize
+        """
+        super().__init__()
+        self.quant = torch.ao.quantization.QuantStub()
+        self.linear = linear
+        self.dequant = torch.ao.quantization.DeQuantStub()
+        self._dequantized_weight: Any = None
+
+    @property
+    def weight(self) -> Any:
+        """
+        Property with access to weight of the wrapped layer.
+
+        A converted layer keeps packed int8 weight behind a method, so its weight
+        is dequantized once: models check dtype and shape of weights as of nn.Linear.
+
+        Returns:
+            torch.Tensor: Float weight of the wrapped layer
+        """
+        weight = self.linear.weight
+        if not callable(weight):
+            return weight
+        if self._dequantized_weight is None:
+            self._dequantized_weight = weight().dequantize()
+        return self._dequantized_weight
+
+    def forward(self, hidden_states: Any) -> Any:
+        """
+        Apply the layer to quantized input.
+
+        Args:
+            hidden_states (torch.Tensor): Input of the layer
+
+        Returns:
+            torch.Tensor: Output of the layer
+        """
+        return self.dequant(self.linear(self.quant(hidden_states)))
+
+
+def _is_excluded(name: str, modules_to_not_convert: Sequence[str]) -> bool:
+    """
+    Check whether a module belongs to one of the modules kept in float precision.
+
+    Args:
+        name (str): Qualified name of the module
+        modules_to_not_convert (Sequence[str]): Names of modules to keep
+
+    Returns:
+        bool: Whether the module is not to be quantized
+    """
+    return any(part in modules_to_not_convert for part in name.split('.'))
+
+
+def quantize_dynamic(model: Any,
+                     modules_to_not_convert: Sequence[str] = MODULES_TO_NOT_CONVERT) -> Any:
+    """
+    Quantize weights of Linear layers of a model to int8.
+
+    Args:
+        model (torch.nn.Module): Model to quantize
+        modules_to_not_convert (Sequence[str]): Names of modules kept in float precision
+
+    Returns:
+        torch.nn.Module: Quantized model
+    """
+    for name, module in model.named_modules():
+        if _is_excluded(name, modules_to_not_convert):
+            module.qconfig = None
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static(model: Any, calibrate: Callable[[], Any],
+                    modules_to_not_convert: Sequence[str] = MODULES_TO_NOT_CONVERT) -> Any:
+    """
+    Quantize weights and activations of Linear layers of a model to int8.
+
+    Activation ranges are collected by observers while calibrate runs the model
+    on representative data.
+
+    Args:
+        model (torch.nn.Module): Model to quantize
+        calibrate (Callable[[], Any]): Function that runs the model on calibration data
+        modules_to_not_convert (Sequence[str]): Names of modules kept in float precision
+
+    Returns:
+        torch.nn.Module: Quantized model
+    """
+    qconfig = torch.ao.quantization.get_default_qconfig('fbgemm')
+    for module_name, module in list(model.named_modules()):
+        for name, child in module.named_children():
+            if _is_excluded(f'{module_name}.{name}', modules_to_not_convert):
+                continue
+            if isinstance(child, nn.Linear):
+                wrapper = StaticQuantLinear(child)
+                wrapper.qconfig = qconfig
+                setattr(module, name, wrapper)
+
+    model.eval()
+    torch.ao.quantization.prepare(model, inplace=True)
+    with torch.no_grad():
+        calibrate()
+    torch.ao.quantization.convert(model, inplace=True)
+    return model
+
+
+def get_model_size(model: Any) -> int:
+    """
+    Compute size of serialized model weights.
+
+    Packed int8 weights of quantized layers are included.
+
+    Args:
+        model (torch.nn.Module): Model
+
+    Returns:
+        int: Size in bytes
+    """
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes
@@ -0,0 +1,143 @@
+"""
+Module with in-memory cache of service responses.
+"""
+
+# pylint: disable=duplicate-code, too-many-instance-attributes
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable
+
+from core_utils.llm.prediction_cache import PredictionCache
+
+
+def normalize_text(text: str) -> str:
+    """
+    Bring a text to a canonical form: NFC normalization and collapsed whitespace.
+
+    Args:
+        text (str): Text from a request
+
+    Returns:
+        str: Normalized text
+    """
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache of responses with expiration.
+
+    Entries evicted from memory can still be found in an optional persistent tier,
+    which survives restarts of a service and is keyed by model identity.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        disk: PredictionCache | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initialize an instance of ResponseCache.
+
+        Args:
+            max_size (int): The maximum number of entries in memory
+            ttl (float): Lifetime of an entry in memory in seconds
+            disk (PredictionCache | None): Persistent tier
+            clock (Callable[[], float]): Source of current time in seconds
+        """
+        self._max_size = max_size
+        self._ttl = ttl
+        self._disk = disk
+        self._clock = clock
+        self._entries: OrderedDict[tuple[str, ...], tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: tuple[str, ...]) -> str | None:
+        """
+        Look up a response.
+
+        Args:
+            key (tuple[str, ...]): Normalized request
+
+        Returns:
+            str | None: Cached response, None for a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self._clock():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self._expirations += 1
+
+        if self._disk is not None:
+            value = self._disk.get_many([key])[0]
+            if value is not None:
+                with self._lock:
+                    self._disk_hits += 1
+                    self._store(key, value)
+                return value
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def put(self, key: tuple[str, ...], value: str) -> None:
+        """
+        Store a response.
+
+        Args:
+            key (tuple[str, ...]): Normalized request
+            value (str): Response
+        """
+        with self._lock:
+            self._store(key, value)
+        if self._disk is not None:
+            self._disk.put_many([key], [value])
+
+    def stats(self) -> dict:
+        """
+        Collect cache statistics.
+
+        Returns:
+            dict: Hit and miss counters, evictions and current size
+        """
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                'size': len(self._entries),
+                'hits': self._hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'hit_rate': round((self._hits + self._disk_hits) / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+            }
+
+    def _store(self, key: tuple[str, ...], value: str) -> None:
+        """
+        Put an entry to memory evicting the least recently used ones.
+
+        Must be called with the lock held.
+
+        Args:
+            key (tuple[str, ...]): Normalized request
+            value (str): Response
+        """
+        self._entries[key] = (self._clock() + self._ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
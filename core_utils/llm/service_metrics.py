@@ -0,0 +1,479 @@
+"""
+Module with service metrics in Prometheus text exposition format.
+"""
+
+# pylint: disable=duplicate-code
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, TypeVar
+
+try:
+    import resource
+except ImportError:
+    resource = None  # type: ignore
+
+#: Buckets in seconds for latencies from milliseconds to a minute
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+#: Buckets for numbers of requests in a batch
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+Labels = tuple[str, ...]
+
+
+def _format_labels(names: Labels, values: Labels) -> str:
+    """
+    Format labels of a sample.
+
+    Args:
+        names (Labels): Names of labels
+        values (Labels): Values of labels
+
+    Returns:
+        str: Labels in curly braces, empty string without labels
+    """
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    """
+    Format a value of a sample.
+
+    Args:
+        value (float): Value
+
+    Returns:
+        str: Value as Prometheus expects it
+    """
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """
+    Base class of a metric family with labels.
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, description: str, label_names: Labels = ()) -> None:
+        """
+        Initialize an instance of a metric.
+
+        Args:
+            name (str): Name of the metric
+            description (str): Help text of the metric
+            label_names (Labels): Names of labels
+        """
+        self.name = name
+        self._description = description
+        self._label_names = label_names
+        self._lock = threading.Lock()
+
+    def render(self) -> list[str]:
+        """
+        Render the metric.
+
+        Returns:
+            list[str]: Lines of text exposition format
+        """
+        lines = [f'# HELP {self.name} {self._description}', f'# TYPE {self.name} {self.kind}']
+        for suffix, label_names, label_values, value in self._samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(label_names, label_values)} '
+                         f'{_format_value(value)}')
+        return lines
+
+    def _labels(self, labels: dict[str, str]) -> Labels:
+        """
+        Order label values by label names.
+
+        Args:
+            labels (dict[str, str]): Label values by names
+
+        Returns:
+            Labels: Label values
+        """
+        return tuple(str(labels[name]) for name in self._label_names)
+
+    @abstractmethod
+    def _samples(self) -> list[tuple[str, Labels, Labels, float]]:
+        """
+        Collect samples of the metric.
+
+        Returns:
+            list[tuple[str, Labels, Labels, float]]: Name suffix, label names and values, value
+        """
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing value.
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name: str, description: str, label_names: Labels = (),
+                 function: Callable[[], dict[Labels, float]] | None = None) -> None:
+        """
+        Initialize an instance of Counter.
+
+        Args:
+            name (str): Name of the metric
+            description (str): Help text of the metric
+            label_names (Labels): Names of labels
+            function (Callable[[], dict[Labels, float]] | None): Function returning current
+                values by label values, instead of incrementing the counter
+        """
+        super().__init__(name, description, label_names)
+        self._function = function
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """
+        Increase the counter.
+
+        Args:
+            amount (float): Increment
+            **labels (str): Label values
+        """
+        key = self._labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> list[tuple[str, Labels, Labels, float]]:
+        """
+        Collect samples of the metric.
+
+        Returns:
+            list[tuple[str, Labels, Labels, float]]: Name suffix, label names and values, value
+        """
+        with self._lock:
+            values = dict(self._function() if self._function else self._values)
+        return [('', self._label_names, key, value) for key, value in sorted(values.items())]
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down.
+    """
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels: str) -> None:
+        """
+        Set the gauge.
+
+        Args:
+            value (float): Value
+            **labels (str): Label values
+        """
+        with self._lock:
+            self._values[self._labels(labels)] = value
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over cumulative buckets.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str, buckets: tuple[float, ...],
+                 label_names: Labels = ()) -> None:
+        """
+        Initialize an instance of Histogram.
+
+        Args:
+            name (str): Name of the metric
+            description (str): Help text of the metric
+            buckets (tuple[float, ...]): Upper bounds of buckets in increasing order
+            label_names (Labels): Names of labels
+        """
+        super().__init__(name, description, label_names)
+        self._buckets = (*buckets, math.inf)
+        self._counts: dict[Labels, list[int]] = {}
+        self._sums: dict[Labels, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Record an observation.
+
+        Args:
+            value (float): Observed value
+            **labels (str): Label values
+        """
+        key = self._labels(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self._buckets))
+            for index, bound in enumerate(self._buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def _samples(self) -> list[tuple[str, Labels, Labels, float]]:
+        """
+        Collect samples of the metric.
+
+        Returns:
+            list[tuple[str, Labels, Labels, float]]: Name suffix, label names and values, value
+        """
+        samples = []
+        bucket_labels = (*self._label_names, 'le')
+        with self._lock:
+            for key in sorted(self._counts):
+                total = 0
+                for bound, count in zip(self._buckets, self._counts[key]):
+                    total += count
+                    samples.append(('_bucket', bucket_labels,
+                                    (*key, _format_value(bound)), float(total)))
+                samples.append(('_sum', self._label_names, key, self._sums[key]))
+                samples.append(('_count', self._label_names, key, float(total)))
+        return samples
+
+
+_MetricT = TypeVar('_MetricT', bound=_Metric)
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize an instance of MetricsRegistry.
+        """
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, description: str, label_names: Labels = (),
+                function: Callable[[], dict[Labels, float]] | None = None) -> Counter:
+        """
+        Register a counter.
+
+        Args:
+            name (str): Name of the metric
+            description (str): Help text of the metric
+            label_names (Labels): Names of labels
+            function (Callable[[], dict[Labels, float]] | None): Function returning current values
+
+        Returns:
+            Counter: Registered counter
+        """
+        return self._register(Counter(name, description, label_names, function))
+
+    def gauge(self, name: str, description: str, label_names: Labels = (),
+              function: Callable[[], dict[Labels, float]] | None = None) -> Gauge:
+        """
+        Register a gauge.
+
+        Args:
+            name (str): Name of the metric
+            description (str): Help text of the metric
+            label_names (Labels): Names of labels
+            function (Callable[[], dict[Labels, float]] | None): Function returning current values
+
+        Returns:
+            Gauge: Registered gauge
+        """
+        return self._register(Gauge(name, description, label_names, function))
+
+    def histogram(self, name: str, description: str, buckets: tuple[float, ...],
+                  label_names: Labels = ()) -> Histogram:
+        """
+        Register a histogram.
+
+        Args:
+            name (str): Name of the metric
+            description (str): Help text of the metric
+            buckets (tuple[float, ...]): Upper bounds of buckets in increasing order
+            label_names (Labels): Names of labels
+
+        Returns:
+            Histogram: Registered histogram
+        """
+        return self._register(Histogram(name, description, buckets, label_names))
+
+    def render(self) -> str:
+        """
+        Render all metrics in text exposition format.
+
+        Returns:
+            str: Metrics text
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return ''.join('\n'.join(metric.render()) + '\n' for metric in metrics)
+
+    def _register(self, metric: _MetricT) -> _MetricT:
+        """
+        Add a metric to the registry.
+
+        Args:
+            metric (_MetricT): Metric to add
+
+        Returns:
+            _MetricT: The added metric
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Metric {metric.name} is already registered')
+            self._metrics[metric.name] = metric
+        return metric
+
+
+def process_memory_bytes() -> float:
+    """
+    Get resident memory of the current process.
+
+    Returns:
+        float: Resident set size in bytes, peak size where current one is not available
+    """
+    try:
+        with open('/proc/self/statm', encoding='utf-8') as statm:
+            return float(int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE'))
+    except (OSError, ValueError):
+        if resource is None:
+            return 0.0
+        return float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+
+#: Registry of metrics recorded by shared inference components
+REGISTRY = MetricsRegistry()
+
+#: Time spent in stages of inference: tokenization, model calls and decoding
+STAGE_SECONDS = REGISTRY.histogram(
+    'llm_stage_duration_seconds', 'Duration of inference stages.', LATENCY_BUCKETS, ('stage', )
+)
+
+#: Numbers of requests inferred together
+BATCH_SIZE = REGISTRY.histogram(
+    'llm_batch_size', 'Number of requests in a model call.', BATCH_SIZE_BUCKETS, ('batcher', )
+)
+
+REGISTRY.gauge('process_resident_memory_bytes', 'Resident memory size in bytes.',
+               function=lambda: {(): process_memory_bytes()})
+
+_recording = threading.local()
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """
+    Measure duration of an inference stage.
+
+    Args:
+        stage (str): Name of the stage
+
+    Yields:
+        None: Control to the measured code
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_SECONDS.observe(duration, stage=stage)
+        recorded = getattr(_recording, 'stages', None)
+        if recorded is not None:
+            recorded.append((stage, duration))
+
+
+@contextmanager
+def recorded_stages() -> Iterator[list[tuple[str, float]]]:
+    """
+    Collect durations of inference stages measured in the current thread.
+
+    Worker processes send collected durations to the parent process, which
+    observes them with observe_stages, as metrics of workers are not rendered.
+
+    Yields:
+        list[tuple[str, float]]: Names and durations of stages finished so far
+    """
+    previous = getattr(_recording, 'stages', None)
+    _recording.stages = []
+    try:
+        yield _recording.stages
+    finally:
+        _recording.stages = previous
+
+
+def observe_stages(stages: list[tuple[str, float]]) -> None:
+    """
+    Observe durations of inference stages measured elsewhere.
+
+    Args:
+        stages (list[tuple[str, float]]): Names and durations of stages
+    """
+    for stage, duration in stages:
+        STAGE_SECONDS.observe(duration, stage=stage)
+
+
+def register_serving_metrics(
+    registry: MetricsRegistry,
+    batchers: dict[str, Any] | Callable[[], dict[str, Any]],
+    response_cache: Any,
+    in_flight: Any,
+) -> Histogram:
+    """
+    Register metrics of an inference service.
+
+    Queue depth, cache and coalescing metrics are read from stats of the components
+    when metrics are rendered.
+
+    Args:
+        registry (MetricsRegistry): Registry of the service
+        batchers (dict[str, Any] | Callable[[], dict[str, Any]]): Batchers of requests
+            by model names, or a function returning batchers of models loaded so far
+        response_cache (ResponseCache): Cache of responses
+        in_flight (SingleFlight): Coalescing of identical requests
+
+    Returns:
+        Histogram: Histogram of HTTP request latency to observe by the service
+    """
+    get_batchers = batchers if callable(batchers) else lambda: batchers
+    registry.gauge(
+        'llm_queue_depth', 'Number of requests waiting for a batch.', ('model', ),
+        function=lambda: {(name, ): batcher.stats()['queue_depth']
+                          for name, batcher in get_batchers().items()},
+    )
+    registry.gauge(
+        'llm_batch_occupancy', 'Share of occupied slots of an in-flight decoding batch.',
+        ('model', ),
+        function=lambda: {(name, ): batcher.stats()['occupancy']
+                          for name, batcher in get_batchers().items()
+                          if 'occupancy' in batcher.stats()},
+    )
+    registry.counter(
+        'llm_response_cache_lookups_total', 'Lookups of the response cache by result.',
+        ('result', ),
+        function=lambda: {(result, ): response_cache.stats()[key]
+                          for result, key in (('hit', 'hits'), ('disk_hit', 'disk_hits'),
+                                              ('miss', 'misses'))},
+    )
+    registry.gauge(
+        'llm_response_cache_hit_ratio', 'Share of lookups answered by the response cache.',
+        function=lambda: {(): response_cache.stats()['hit_rate']},
+    )
+    registry.counter(
+        'llm_coalesced_requests_total', 'Requests that awaited an identical running request.',
+        function=lambda: {(): in_flight.stats()['coalesced']},
+    )
+    return registry.histogram(
+        'http_request_duration_seconds', 'Time until the start of an HTTP response.',
+        LATENCY_BUCKETS, ('method', 'path', 'status'),
+    )
@@ -5,11 +5,10 @@ Module with description of abstract LLM pipeline.
 # pylint: disable=too-few-public-methods, too-many-arguments, duplicate-code, invalid-name
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-try:
+if TYPE_CHECKING:
     from peft import LoraConfig
-except ImportError:
-    print('Library "peft" not installed. Failed to import.')
 
 try:
     from torch.utils.data.dataset import Dataset
@@ -29,7 +28,7 @@ class AbstractSFTPipeline(ABC):
     _model: HFModelLike | None
     _dataset: Dataset
     _batch_size: int | None
-    _lora_config: LoraConfig | None
+    _lora_config: 'LoraConfig | None'
     _max_length: int | None
     _max_sft_steps: int | None
     _device: str | None
@@ -0,0 +1,73 @@
+"""
+Module with coalescing of identical concurrent requests.
+"""
+
+# pylint: disable=duplicate-code
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Registry of running computations shared by requests with the same key.
+
+    The first request with a key starts a computation, requests with the same key
+    arriving before it finishes await its result. A finished computation is
+    forgotten, so later requests start a new one or hit a cache in front of it.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize an instance of SingleFlight.
+        """
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self._started = 0
+        self._coalesced = 0
+
+    def stats(self) -> dict:
+        """
+        Collect coalescing statistics.
+
+        Returns:
+            dict: Number of running, started and coalesced computations
+        """
+        return {
+            'in_flight': len(self._calls),
+            'started': self._started,
+            'coalesced': self._coalesced,
+        }
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await a running computation for the key or start a new one.
+
+        Cancellation of a waiting request does not cancel the shared computation.
+
+        Args:
+            key (Hashable): Identity of a request
+            compute (Callable[[], Awaitable[Any]]): Function starting the computation
+
+        Returns:
+            Any: Result of the computation
+        """
+        call = self._calls.get(key)
+        if call is not None and not call.done():
+            self._coalesced += 1
+            return await asyncio.shield(call)
+
+        call = asyncio.ensure_future(compute())
+        self._calls[key] = call
+        self._started += 1
+        call.add_done_callback(lambda _: self._forget(key, call))
+        return await asyncio.shield(call)
+
+    def _forget(self, key: Hashable, call: asyncio.Future) -> None:
+        """
+        Remove a finished computation.
+
+        Args:
+            key (Hashable): Identity of a request
+            call (asyncio.Future): Finished computation
+        """
+        if self._calls.get(key) is call:
+            del self._calls[key]
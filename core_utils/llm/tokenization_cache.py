@@ -0,0 +1,255 @@
+"""
+Module with persistent storage of tokenized dataset columns.
+"""
+
+# pylint: disable=duplicate-code
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Callable, Sequence
+
+try:
+    import torch
+except ImportError:
+    print('Library "torch" not installed. Failed to import.')
+
+from core_utils.llm.prediction_cache import fingerprint
+
+
+def tokenizer_fingerprint(tokenizer: Any) -> str:
+    """
+    Compute identity of a tokenizer from its vocabulary and processing rules.
+
+    The name or path of the tokenizer is not taken into account, so copies
+    of a tokenizer saved next to fine-tuned models share the identity. Truncation
+    and padding state of a fast tokenizer is left out as well: it is changed
+    by every call of the tokenizer.
+
+    Args:
+        tokenizer (transformers.PreTrainedTokenizerBase): Tokenizer
+
+    Returns:
+        str: Hexadecimal SHA-256 digest
+    """
+    if getattr(tokenizer, 'is_fast', False):
+        rules = json.loads(tokenizer.backend_tokenizer.to_str())
+        rules.pop('truncation', None)
+        rules.pop('padding', None)
+        rules = json.dumps(rules, sort_keys=True)
+    else:
+        rules = sorted(tokenizer.get_vocab().items())
+    return fingerprint(type(tokenizer).__name__, rules, tokenizer.truncation_side,
+                       sorted(tokenizer.special_tokens_map.items()))
+
+
+class TokenizedColumn:
+    """
+    Token ids of texts stored contiguously: ids of the i-th text are
+    ids[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, ids: 'torch.Tensor', offsets: 'torch.Tensor') -> None:
+        """
+        Initialize an instance of TokenizedColumn.
+
+        Args:
+            ids (torch.Tensor): Concatenated token ids of all texts
+            offsets (torch.Tensor): Start of every text in ids followed by the total length
+        """
+        self._ids = ids
+        self._offsets = offsets
+
+    @classmethod
+    def encode(cls, tokenizer: Any, texts: Sequence[str], max_length: int) -> 'TokenizedColumn':
+        """
+        Tokenize texts in one batched call of the tokenizer.
+
+        Args:
+            tokenizer (transformers.PreTrainedTokenizerBase): Tokenizer
+            texts (Sequence[str]): Texts to tokenize
+            max_length (int): The maximum number of tokens of a text
+
+        Returns:
+            TokenizedColumn: Token ids of texts truncated to max_length
+        """
+        encoded = tokenizer(list(texts), max_length=max_length, truncation=True,
+                            return_attention_mask=False)['input_ids']
+        return cls.from_ids(encoded)
+
+    @classmethod
+    def from_ids(cls, encoded: Sequence[Sequence[int]]) -> 'TokenizedColumn':
+        """
+        Store token ids of texts contiguously.
+
+        Args:
+            encoded (Sequence[Sequence[int]]): Token ids of every text
+
+        Returns:
+            TokenizedColumn: Token ids of texts
+        """
+        lengths = torch.tensor([0] + [len(input_ids) for input_ids in encoded])
+        ids = torch.tensor([token for input_ids in encoded for token in input_ids],
+                           dtype=torch.int32)
+        return cls(ids, torch.cumsum(lengths, 0))
+
+    @classmethod
+    def from_padded(cls, input_ids: Sequence[Sequence[int]],
+                    attention_mask: Sequence[Sequence[int]]) -> 'TokenizedColumn':
+        """
+        Store token ids of texts tokenized with padding, dropping the padding.
+
+        Args:
+            input_ids (Sequence[Sequence[int]]): Padded token ids of every text
+            attention_mask (Sequence[Sequence[int]]): Attention mask of every text
+
+        Returns:
+            TokenizedColumn: Token ids of texts
+        """
+        return cls.from_ids([
+            [token for token, attended in zip(row, mask) if attended]
+            for row, mask in zip(input_ids, attention_mask)
+        ])
+
+    def __len__(self) -> int:
+        """
+        Return the number of texts.
+
+        Returns:
+            int: The number of texts
+        """
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> 'torch.Tensor':
+        """
+        Get token ids of a text.
+
+        Args:
+            index (int): Index of the text
+
+        Returns:
+            torch.Tensor: Token ids
+        """
+        return self._ids[self._offsets[index]:self._offsets[index + 1]]
+
+    @property
+    def lengths(self) -> list[int]:
+        """
+        Property with the numbers of tokens of texts.
+
+        Returns:
+            list[int]: The number of tokens of every text
+        """
+        return (self._offsets[1:] - self._offsets[:-1]).tolist()
+
+    def pad(self, indices: Sequence[int], pad_token_id: int, padding_side: str = 'right',
+            length: int | None = None) -> dict[str, 'torch.Tensor']:
+        """
+        Collect token ids of texts into a padded batch, as a tokenizer with padding does.
+
+        Args:
+            indices (Sequence[int]): Indices of texts in the batch
+            pad_token_id (int): Id of the padding token
+            padding_side (str): Side of texts to add padding to, 'right' or 'left'
+            length (int | None): Length to pad to, the longest text in the batch if not given
+
+        Returns:
+            dict[str, torch.Tensor]: Input ids and attention mask
+        """
+        rows = [self[index] for index in indices]
+        length = length or max((len(row) for row in rows), default=0)
+        input_ids = torch.full((len(rows), length), pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(rows), length), dtype=torch.long)
+        for position, row in enumerate(rows):
+            columns = slice(0, len(row)) if padding_side == 'right' \
+                else slice(length - len(row), length)
+            input_ids[position, columns] = row
+            attention_mask[position, columns] = 1
+        return {'input_ids': input_ids, 'attention_mask': attention_mask}
+
+    def pad_like(self, tokenizer: Any, indices: Sequence[int],
+                 length: int | None = None) -> dict[str, 'torch.Tensor']:
+        """
+        Collect token ids of texts into a batch with the inputs a tokenizer would return.
+
+        Args:
+            tokenizer (transformers.PreTrainedTokenizerBase): Tokenizer the texts were
+                tokenized with
+            indices (Sequence[int]): Indices of texts in the batch
+            length (int | None): Length to pad to, the longest text in the batch if not given
+
+        Returns:
+            dict[str, torch.Tensor]: Input ids, attention mask and token type ids
+                if the model of the tokenizer expects them
+        """
+        batch = self.pad(indices, tokenizer.pad_token_id, tokenizer.padding_side, length)
+        if 'token_type_ids' in tokenizer.model_input_names:
+            batch['token_type_ids'] = torch.zeros_like(batch['input_ids'])
+        return batch
+
+    def save(self, path: Path) -> None:
+        """
+        Write token ids to a file replacing it at once.
+
+        Args:
+            path (pathlib.Path): Path to the file
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        torch.save({'ids': self._ids, 'offsets': self._offsets}, temporary)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'TokenizedColumn':
+        """
+        Read token ids from a file, mapping them into memory instead of copying.
+
+        Args:
+            path (pathlib.Path): Path to the file
+
+        Returns:
+            TokenizedColumn: Token ids of texts
+        """
+        stored = torch.load(str(path), mmap=True, weights_only=True)
+        return cls(stored['ids'], stored['offsets'])
+
+
+class TokenizationCache:
+    """
+    Directory of tokenized columns keyed by tokenizer identity, max_length and texts.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        """
+        Initialize an instance of TokenizationCache.
+
+        Args:
+            directory (pathlib.Path): Directory with files of tokenized columns
+        """
+        self._directory = directory
+
+    def encode(self, tokenizer: Any, texts: Sequence[str], max_length: int,
+               tokenize: Callable[[], TokenizedColumn] | None = None) -> TokenizedColumn:
+        """
+        Get token ids of texts, tokenizing them only if they are not stored yet.
+
+        Args:
+            tokenizer (transformers.PreTrainedTokenizerBase): Tokenizer
+            texts (Sequence[str]): Texts to tokenize
+            max_length (int): The maximum number of tokens of a text
+            tokenize (Callable[[], TokenizedColumn] | None): Function tokenizing the texts
+                with the tokenizer and truncating them to max_length, one batched call
+                of the tokenizer if not given
+
+        Returns:
+            TokenizedColumn: Token ids of texts truncated to max_length
+        """
+        key = fingerprint(tokenizer_fingerprint(tokenizer), max_length, fingerprint(*texts))
+        path = self._directory / f'{key}.pt'
+        try:
+            return TokenizedColumn.load(path)
+        except (OSError, RuntimeError, KeyError, pickle.UnpicklingError):
+            column = tokenize() if tokenize is not None \
+                else TokenizedColumn.encode(tokenizer, texts, max_length)
+            column.save(path)
+            return column
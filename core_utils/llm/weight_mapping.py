@@ -0,0 +1,73 @@
+"""
+Module with inspection of model weights backed by memory-mapped checkpoint files.
+"""
+
+# pylint: disable=duplicate-code
+import bisect
+import itertools
+from pathlib import Path
+from typing import Any
+
+
+def get_file_mappings(pid: int | str = 'self') -> list[tuple[int, int, str]]:
+    """
+    Get memory regions of a process mapped from files.
+
+    Available only on Linux.
+
+    Args:
+        pid (int | str): Process id
+
+    Returns:
+        list[tuple[int, int, str]]: Start and end addresses and paths of files,
+            sorted by addresses
+    """
+    regions = []
+    for line in Path(f'/proc/{pid}/maps').read_text(encoding='utf-8').splitlines():
+        fields = line.split(maxsplit=5)
+        if len(fields) < 6 or not fields[5].startswith('/'):
+            continue
+        start, end = (int(address, 16) for address in fields[0].split('-'))
+        regions.append((start, end, fields[5]))
+    return sorted(regions)
+
+
+def get_weights_mapping(model: Any) -> dict:
+    """
+    Find out which weights of a model view memory-mapped files.
+
+    Pages of mapped weights are read on first access and shared through the page cache
+    by all processes on a host loading the same checkpoint, weights in anonymous memory
+    are private copies of a process. Tied weights are counted once.
+
+    Args:
+        model (torch.nn.Module): Model
+
+    Returns:
+        dict: Sizes in bytes of mapped and private weights, share of mapped ones
+            and mapped files
+    """
+    regions = get_file_mappings()
+    starts = [start for start, _, _ in regions]
+    seen = set()
+    mapped = private = 0
+    files = set()
+    for tensor in itertools.chain(model.parameters(), model.buffers()):
+        address = tensor.data_ptr()
+        if address in seen or not tensor.numel():
+            continue
+        seen.add(address)
+        size = tensor.numel() * tensor.element_size()
+
+        index = bisect.bisect_right(starts, address) - 1
+        if index >= 0 and address < regions[index][1]:
+            mapped += size
+            files.add(regions[index][2])
+        else:
+            private += size
+    return {
+        'mapped_bytes': mapped,
+        'private_bytes': private,
+        'mapped_share': round(mapped / (mapped + private), 4) if mapped + private else 0.0,
+        'files': sorted(files),
+    }
@@ -0,0 +1,221 @@
+"""
+Module with a pool of inference processes sharing model weights.
+"""
+
+# pylint: disable=duplicate-code, too-many-instance-attributes
+import itertools
+import multiprocessing
+import threading
+import traceback
+from concurrent.futures import Future
+from typing import Any, Callable, Sequence
+
+try:
+    import torch
+except ImportError:
+    print('Library "torch" not installed. Failed to import.')
+
+from core_utils.llm.parallel import default_threads_per_worker
+from core_utils.llm.service_metrics import observe_stages, recorded_stages
+
+
+def _serve(
+    connection: Any,
+    handlers: dict[str, Callable[[list[Any]], Sequence[Any]]],
+    num_threads: int,
+    inherited: list[Any],
+) -> None:
+    """
+    Run requests received from the parent process until it asks to stop
+    or the connection is closed.
+
+    Durations of inference stages are sent back together with results.
+
+    Args:
+        connection (multiprocessing.connection.Connection): Connection to the parent process
+        handlers (dict[str, Callable[[list[Any]], Sequence[Any]]]): Inference functions by names
+        num_threads (int): The number of intra-op threads
+        inherited (list[multiprocessing.connection.Connection]): Parent ends of connections
+            copied by fork, closed so that workers notice when the parent closes them
+    """
+    for parent_end in inherited:
+        parent_end.close()
+    torch.set_num_threads(num_threads)
+    while True:
+        try:
+            request = connection.recv()
+        except (EOFError, OSError):
+            return
+        if request is None:
+            return
+        request_id, handler, items = request
+        with recorded_stages() as stages:
+            try:
+                connection.send((request_id, True, list(handlers[handler](items)), stages))
+            except Exception:  # pylint: disable=broad-exception-caught
+                connection.send((request_id, False, traceback.format_exc(), stages))
+
+
+class _Worker:
+    """
+    Parent side of a worker process.
+    """
+
+    def __init__(self, process: Any, connection: Any) -> None:
+        """
+        Initialize an instance of _Worker.
+
+        Args:
+            process (multiprocessing.Process): Worker process
+            connection (multiprocessing.connection.Connection): Connection to the worker
+        """
+        self.process = process
+        self.connection = connection
+        self.pending: dict[int, Future] = {}
+        self.completed = 0
+        self.alive = True
+        self.send_lock = threading.Lock()
+
+
+class WorkerPool:
+    """
+    Inference processes forked after models are loaded.
+
+    Forked processes share memory pages of model weights with the parent process
+    until the pages are written, so adding a worker does not add a copy of a model.
+    Every request is sent to the worker with the fewest outstanding requests.
+    The pool must be created before the parent process runs any inference,
+    and only on platforms supporting fork.
+    """
+
+    def __init__(
+        self,
+        handlers: dict[str, Callable[[list[Any]], Sequence[Any]]],
+        num_workers: int,
+        threads_per_worker: int | None = None,
+    ) -> None:
+        """
+        Initialize an instance of WorkerPool.
+
+        Args:
+            handlers (dict[str, Callable[[list[Any]], Sequence[Any]]]): Blocking inference
+                functions by names, returning one result per item
+            num_workers (int): The number of worker processes
+            threads_per_worker (int | None): The number of intra-op threads of a worker,
+                available cores are divided between workers if not given
+        """
+        context = multiprocessing.get_context('fork')
+        num_threads = threads_per_worker or default_threads_per_worker(num_workers)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._workers: list[_Worker] = []
+        for _ in range(num_workers):
+            parent_end, child_end = context.Pipe()
+            inherited = [worker.connection for worker in self._workers] + [parent_end]
+            process = context.Process(target=_serve,
+                                      args=(child_end, handlers, num_threads, inherited),
+                                      daemon=True)
+            process.start()
+            child_end.close()
+            self._workers.append(_Worker(process, parent_end))
+
+        for worker in self._workers:
+            threading.Thread(target=self._receive, args=(worker, ), daemon=True).start()
+
+    def stats(self) -> dict:
+        """
+        Collect statistics of workers.
+
+        Returns:
+            dict: Outstanding and completed requests of every worker
+        """
+        with self._lock:
+            return {
+                'workers': [
+                    {'pid': worker.process.pid, 'alive': worker.alive,
+                     'outstanding': len(worker.pending), 'completed': worker.completed}
+                    for worker in self._workers
+                ],
+                'queue_depth': sum(len(worker.pending) for worker in self._workers),
+            }
+
+    def submit(self, handler: str, items: list[Any]) -> Future:
+        """
+        Send a request to the least loaded worker.
+
+        Args:
+            handler (str): Name of the inference function
+            items (list[Any]): Items to infer
+
+        Returns:
+            concurrent.futures.Future: Future resolved with results for the items
+        """
+        future: Future = Future()
+        with self._lock:
+            alive = [worker for worker in self._workers if worker.alive]
+            if not alive:
+                raise RuntimeError('All inference workers have exited')
+            worker = min(alive, key=lambda candidate: len(candidate.pending))
+            request_id = next(self._ids)
+            worker.pending[request_id] = future
+        with worker.send_lock:
+            worker.connection.send((request_id, handler, items))
+        return future
+
+    def infer(self, handler: str) -> Callable[[list[Any]], list[Any]]:
+        """
+        Make a blocking inference function running in the pool.
+
+        Args:
+            handler (str): Name of the inference function
+
+        Returns:
+            Callable[[list[Any]], list[Any]]: Function returning one result per item
+        """
+        return lambda items: self.submit(handler, items).result()
+
+    def close(self) -> None:
+        """
+        Stop worker processes.
+
+        Closing a connection does not end it for a worker while the parent
+        is receiving from it, so workers are asked to stop with an empty request.
+        """
+        for worker in self._workers:
+            with worker.send_lock:
+                try:
+                    worker.connection.send(None)
+                except OSError:
+                    pass
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.connection.close()
+
+    def _receive(self, worker: _Worker) -> None:
+        """
+        Resolve futures with results sent by a worker until it exits.
+
+        Args:
+            worker (_Worker): Worker to listen to
+        """
+        while True:
+            try:
+                request_id, success, payload, stages = worker.connection.recv()
+            except (EOFError, OSError):
+                break
+            observe_stages(stages)
+            with self._lock:
+                future = worker.pending.pop(request_id)
+                worker.completed += 1
+            if success:
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(f'Inference worker failed:\n{payload}'))
+
+        with self._lock:
+            worker.alive = False
+            pending, worker.pending = worker.pending, {}
+        for future in pending.values():
+            future.set_exception(RuntimeError('Inference worker exited'))
@@ -1,5 +1,18 @@
 const summarizeButton = document.getElementById('summarizeButton');
 
+function parseEvent(rawEvent) {
+    let name = 'message';
+    const data = [];
+    for (const line of rawEvent.split('\n')) {
+        if (line.startsWith('event:')) {
+            name = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            data.push(line.slice(5).trim());
+        }
+    }
+    return { name, data: data.length ? JSON.parse(data.join('\n')) : {} };
+}
+
 summarizeButton.addEventListener('click', async () => {
     const inputText = document.getElementById('inputText').value;
     const summaryResult = document.getElementById('result');
@@ -12,7 +25,7 @@ summarizeButton.addEventListener('click', async () => {
     summaryResult.textContent = 'Summarizing...';
 
     try {
-        const response = await fetch('/infer', {
+        const response = await fetch('/infer/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -24,14 +37,38 @@ summarizeButton.addEventListener('click', async () => {
             throw new Error('Network response was not ok');
         }
 
-        const data = await response.json();
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let summary = '';
 
-        const trimmedInfer = (data.infer || '').trim();
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+
+            const rawEvents = buffer.split('\n\n');
+            buffer = rawEvents.pop();
+
+            for (const rawEvent of rawEvents) {
+                const event = parseEvent(rawEvent);
+                if (event.name === 'message') {
+                    summary += event.data.token;
+                    summaryResult.textContent = summary;
+                } else if (event.name === 'end') {
+                    summary = (event.data.infer || '').trim();
+                } else if (event.name === 'error') {
+                    throw new Error(event.data.detail);
+                }
+            }
+        }
 
-        if (trimmedInfer === "") {
+        if (summary.trim() === "") {
             summaryResult.textContent = 'We could not summarize your text :('; //
         } else {
-            summaryResult.textContent = trimmedInfer; //
+            summaryResult.textContent = summary.trim(); //
         }
 
     } catch (error) {
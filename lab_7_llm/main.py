@@ -3,25 +3,38 @@ Laboratory work.
 
 Working with Large Language Models.
 """
-# pylint: disable=too-few-public-methods, undefined-variable, too-many-arguments, super-init-not-called
+# pylint: disable=too-few-public-methods, undefined-variable, too-many-arguments, super-init-not-called, import-outside-toplevel
+import time
+from functools import partial
 from pathlib import Path
-from typing import Iterable, Sequence
+from typing import Callable, Iterable, Iterator, Sequence
 
 import pandas as pd
 import torch
-from datasets import load_dataset
-from evaluate import load
 from pandas import DataFrame
-from torch.utils.data import DataLoader, Dataset
-from torchinfo import summary
-from transformers import AutoModelForSeq2SeqLM, T5TokenizerFast
+from torch.utils.data import Dataset
 
+from core_utils.llm.batching import collect_padding_stats, PaddingStats, plan_batches
+from core_utils.llm.continuous_batching import ContinuousBatchingScheduler
+from core_utils.llm.decoding_stats import DecodingStats, ForwardCallCounter
 from core_utils.llm.llm_pipeline import AbstractLLMPipeline
 from core_utils.llm.metrics import Metrics
+from core_utils.llm.model_analysis import ModelAnalysisCache
+from core_utils.llm.onnx_backend import Backend, load_onnx_model, OnnxTask
+from core_utils.llm.parallel import (
+    default_threads_per_worker,
+    infer_in_processes,
+    split_into_shards,
+)
+from core_utils.llm.prediction_cache import fingerprint, model_fingerprint, PredictionCache
+from core_utils.llm.predictions_writer import PredictionsWriter
+from core_utils.llm.quantization import QuantizationMode, quantize_dynamic, quantize_static
 from core_utils.llm.raw_data_importer import AbstractRawDataImporter
 from core_utils.llm.raw_data_preprocessor import AbstractRawDataPreprocessor, ColumnNames
+from core_utils.llm.service_metrics import timed_stage
 from core_utils.llm.task_evaluator import AbstractTaskEvaluator
 from core_utils.llm.time_decorator import report_time
+from core_utils.llm.tokenization_cache import TokenizationCache, TokenizedColumn
 
 
 class RawDataImporter(AbstractRawDataImporter):
@@ -37,6 +50,8 @@ class RawDataImporter(AbstractRawDataImporter):
         Raises:
             TypeError: In case of downloaded dataset is not pd.DataFrame
         """
+        from datasets import load_dataset
+
         self._raw_data = load_dataset(self._hf_name, split='test',
                                       revision='v2.0', trust_remote_code=True).to_pandas()
 
@@ -136,7 +151,17 @@ class LLMPipeline(AbstractLLMPipeline):
     """
 
     def __init__(
-        self, model_name: str, dataset: TaskDataset, max_length: int, batch_size: int, device: str
+        self,
+        model_name: str,
+        dataset: TaskDataset,
+        max_length: int,
+        batch_size: int,
+        device: str,
+        max_batch_tokens: int | None = None,
+        cache_path: Path | None = None,
+        quantization: QuantizationMode | None = None,
+        backend: Backend = Backend.TORCH,
+        draft_model_name: str | None = None,
     ) -> None:
         """
         Initialize an instance of LLMPipeline.
@@ -145,30 +170,93 @@ class LLMPipeline(AbstractLLMPipeline):
             model_name (str): The name of the pre-trained model
             dataset (TaskDataset): The dataset used
             max_length (int): The maximum length of generated sequence
-            batch_size (int): The size of the batch inside DataLoader
+            batch_size (int): The maximum number of samples in a batch planned by plan_batches
             device (str): The device for inference
+            max_batch_tokens (int | None): The maximum number of padded tokens in a batch
+            cache_path (pathlib.Path | None): Path to a persistent store of predictions
+            quantization (QuantizationMode | None): Int8 quantization mode for CPU inference
+            backend (Backend): Runtime executing the model
+            draft_model_name (str | None): The name of a smaller model with the same vocabulary
+                proposing tokens for assisted decoding, texts of a batch are then
+                generated one by one
         """
-        super().__init__(model_name, dataset, max_length, batch_size, device)
+        from transformers import AutoModelForSeq2SeqLM, T5TokenizerFast
+
+        super().__init__(model_name, dataset, max_length, batch_size, device, max_batch_tokens)
 
         self._tokenizer = T5TokenizerFast.from_pretrained(self._model_name)
-        self._model = AutoModelForSeq2SeqLM.from_pretrained(self._model_name).to(self._device)
 
+        if (quantization is not None or backend is Backend.ONNX) and self._device != 'cpu':
+            raise ValueError('Quantized and ONNX inference are supported only on CPU')
+        if (quantization is not None or draft_model_name) and backend is Backend.ONNX:
+            raise ValueError('Quantization and draft model are supported only by torch backend')
+
+        self._backend = backend
+        self._quantization = quantization
+        if backend is Backend.ONNX:
+            self._model = load_onnx_model(self._model_name, OnnxTask.SEQ2SEQ,
+                                          Path(__file__).parent / 'dist' / 'onnx')
+        else:
+            self._model = AutoModelForSeq2SeqLM.from_pretrained(
+                self._model_name).to(self._device).eval()
+        self._draft_model_name = draft_model_name
+        self._draft_model = None
+        if draft_model_name:
+            self._draft_model = AutoModelForSeq2SeqLM.from_pretrained(
+                draft_model_name).to(self._device).eval()
+        self._decoding_stats = DecodingStats()
+
+        self._padding_stats: PaddingStats | None = None
+        self._tokenized: TokenizedColumn | None = None
+
+        if quantization is QuantizationMode.DYNAMIC:
+            self._model = quantize_dynamic(self._model)
+        elif quantization is QuantizationMode.STATIC:
+            self._model = quantize_static(self._model, self._calibrate)
+
+        self._identity = model_fingerprint(
+            self._model_name, self._max_length, self._model.config.to_json_string(),
+            self._model.generation_config.to_json_string(), self._quantization, self._backend
+        )
+        self._cache_path = cache_path
+        self._cache: PredictionCache | None = None
+        if cache_path is not None:
+            self._cache = PredictionCache(cache_path, self._identity)
 
     def analyze_model(self) -> dict:
         """
         Analyze model computing properties.
 
+        Properties are computed on a copy of the model on the meta device created
+        from the config of the loaded model, and cached on disk by the config.
+
+        Returns:
+            dict: Properties of a model
+        """
+        from transformers import AutoModelForSeq2SeqLM
+
+        cache = ModelAnalysisCache(Path(__file__).parent / 'dist' / 'model_analysis.json')
+        return cache.analyze(AutoModelForSeq2SeqLM, self._model.config, self._summarize_model)
+
+    @staticmethod
+    def _summarize_model(test_model: torch.nn.Module) -> dict:
+        """
+        Summarize properties of a model on the meta device.
+
+        Args:
+            test_model (torch.nn.Module): Model on the meta device
+
         Returns:
             dict: Properties of a model
         """
-        test_model = AutoModelForSeq2SeqLM.from_pretrained(self._model_name)
+        from torchinfo import summary
 
         vocab_size = test_model.config.vocab_size
         emb_size = test_model.config.hidden_size
 
-        input_data = torch.ones((1, emb_size), dtype=torch.long)
-        model_summary = summary(test_model,
-                                input_data=input_data, decoder_input_ids=input_data)
+        input_data = torch.ones((1, emb_size), dtype=torch.long, device='meta')
+        model_summary = summary(test_model, input_data=input_data, decoder_input_ids=input_data,
+                                device='meta')
 
         return {
             'input_shape': model_summary.summary_list[0].input_size,
@@ -181,6 +269,59 @@ class LLMPipeline(AbstractLLMPipeline):
         }
 
 
+    @property
+    def decoding_stats(self) -> DecodingStats:
+        """
+        Property with accumulated statistics of assisted decoding.
+
+        Returns:
+            DecodingStats: Acceptance rate and throughput of the draft model
+        """
+        return self._decoding_stats
+
+    @property
+    def padding_stats(self) -> PaddingStats | None:
+        """
+        Property with padding statistics of the last length-aware inference.
+
+        Returns:
+            PaddingStats | None: Padding statistics if lengths were computed
+        """
+        return self._padding_stats
+
+    @property
+    def identity(self) -> str:
+        """
+        Property with identity of the model together with its inference settings.
+
+        Returns:
+            str: Hexadecimal digest of the model, max_length, generation config,
+                quantization and backend
+        """
+        return self._identity
+
+    def create_scheduler(
+        self, max_batch_size: int, max_queue_size: int | None = None
+    ) -> ContinuousBatchingScheduler:
+        """
+        Create a scheduler decoding concurrent requests in a shared batch.
+
+        Args:
+            max_batch_size (int): The maximum number of sequences decoded together
+            max_queue_size (int | None): The maximum number of requests waiting for admission
+
+        Returns:
+            ContinuousBatchingScheduler: Running scheduler over the pipeline model
+
+        Raises:
+            ValueError: If the backend, the model or its generation config is not supported
+        """
+        if self._backend is not Backend.TORCH or self._draft_model is not None:
+            raise ValueError('Continuous batching is supported only by torch backend '
+                             'without a draft model')
+        return ContinuousBatchingScheduler(self._model, self._tokenizer, self._max_length,
+                                           max_batch_size, max_queue_size)
+
     @report_time
     def infer_sample(self, sample: tuple[str, ...]) -> str | None:
         """
@@ -192,24 +333,61 @@ class LLMPipeline(AbstractLLMPipeline):
         Returns:
             str | None: A prediction
         """
-        return self._infer_batch([sample])[0]
+        return self.infer_samples([sample])[0]
+
+    def infer_samples(self, samples: Sequence[tuple[str, ...]]) -> list[str | None]:
+        """
+        Infer model on samples in a single batch, computing only those missing in the cache.
+
+        Args:
+            samples (Sequence[tuple[str, ...]]): Samples to infer
+
+        Returns:
+            list[str | None]: Predictions in the order of samples
+        """
+        predictions = self._lookup_cache(samples)
+        missing = [index for index, prediction in enumerate(predictions) if prediction is None]
+        if not missing:
+            return predictions
+
+        missing_samples = [samples[index] for index in missing]
+        output = self._infer_batch(list(zip(*missing_samples)))
+        if self._cache is not None:
+            self._cache.put_many(missing_samples, output)
+        for index, prediction in zip(missing, output):
+            predictions[index] = prediction
+        return predictions
 
 
     @report_time
-    def infer_dataset(self) -> pd.DataFrame:
+    def infer_dataset(
+        self,
+        sort_by_length: bool = False,
+        max_batch_tokens: int | None = None,
+        num_workers: int = 1,
+    ) -> pd.DataFrame:
         """
         Infer model on a whole dataset.
 
+        With sort_by_length samples are grouped into batches by their tokenized length,
+        which reduces padding. With a token budget batches are limited by the number of
+        padded tokens instead of the number of rows. Predictions are returned in the
+        original order anyway.
+
+        Args:
+            sort_by_length (bool): Whether to group samples of similar length into batches
+            max_batch_tokens (int | None): The maximum number of padded tokens in a batch,
+                overrides the value given at construction
+            num_workers (int): The number of processes to split the dataset between,
+                each process loads its own copy of the model
+
         Returns:
             pd.DataFrame: Data with predictions
         """
-        predictions = []
-
-        dataloader = DataLoader(self._dataset, batch_size=self._batch_size)
-        for batch in dataloader:
-            output = self._infer_batch(batch)
+        if num_workers > 1 and len(self._dataset) > 1:
+            return self._infer_in_workers(num_workers, sort_by_length, max_batch_tokens)
 
-            predictions.extend(output)
+        predictions = self._infer_rows(range(len(self._dataset)), sort_by_length, max_batch_tokens)
 
         res = pd.DataFrame(
             {ColumnNames.TARGET.name: self._dataset.data[ColumnNames.TARGET.name],
@@ -217,8 +395,211 @@ class LLMPipeline(AbstractLLMPipeline):
         )
         return res
 
+    def iter_infer_dataset(
+        self,
+        chunk_size: int,
+        start: int = 0,
+        sort_by_length: bool = False,
+        max_batch_tokens: int | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Infer model on a dataset chunk by chunk.
+
+        Chunks follow the dataset order, so concatenated chunks are equal to the
+        result of infer_dataset. Batching options are applied inside each chunk.
+
+        Args:
+            chunk_size (int): The number of samples in a chunk
+            start (int): Index of the first sample to infer
+            sort_by_length (bool): Whether to group samples of similar length into batches
+            max_batch_tokens (int | None): The maximum number of padded tokens in a batch
+
+        Yields:
+            pd.DataFrame: Data with predictions for the next chunk
+        """
+        targets = self._dataset.data[ColumnNames.TARGET.name]
+        chunks_stats: list[PaddingStats] = []
+        for chunk_start in range(start, len(self._dataset), chunk_size):
+            rows = range(chunk_start, min(chunk_start + chunk_size, len(self._dataset)))
+            predictions = self._infer_rows(rows, sort_by_length, max_batch_tokens)
+            if self._padding_stats is not None:
+                chunks_stats.append(self._padding_stats)
+                self._padding_stats = sum(chunks_stats, PaddingStats(0, 0, 0))
+
+            yield pd.DataFrame(
+                {ColumnNames.TARGET.name: targets.iloc[rows.start:rows.stop],
+                 ColumnNames.PREDICTION.name: predictions}
+            )
+
+    @report_time
+    def infer_dataset_to_file(
+        self,
+        path: Path,
+        chunk_size: int,
+        sort_by_length: bool = False,
+        max_batch_tokens: int | None = None,
+    ) -> None:
+        """
+        Infer model on a whole dataset, appending predictions to a file chunk by chunk.
+
+        A checkpoint is recorded after each chunk, so a restarted run with the same
+        model, inference settings and dataset continues from the first chunk that was
+        not written. A retrained model or other settings start the file from scratch.
+
+        Args:
+            path (pathlib.Path): Path to CSV file with predictions
+            chunk_size (int): The number of samples in a chunk
+            sort_by_length (bool): Whether to group samples of similar length into batches
+            max_batch_tokens (int | None): The maximum number of padded tokens in a batch
+        """
+        run_id = fingerprint(self._identity, self._batch_size, chunk_size, sort_by_length,
+                             max_batch_tokens or self._max_batch_tokens,
+                             *self._dataset.data[ColumnNames.SOURCE.name])
+        writer = PredictionsWriter(path, run_id)
+        for chunk in self.iter_infer_dataset(chunk_size, writer.offset,
+                                             sort_by_length, max_batch_tokens):
+            writer.append(chunk)
+
+    def _infer_in_workers(
+        self, num_workers: int, sort_by_length: bool, max_batch_tokens: int | None
+    ) -> pd.DataFrame:
+        """
+        Infer model on a whole dataset split into contiguous shards between processes.
+
+        Padding statistics of workers are merged into the statistics of the pipeline.
+
+        Args:
+            num_workers (int): The number of processes
+            sort_by_length (bool): Whether to group samples of similar length into batches
+            max_batch_tokens (int | None): The maximum number of padded tokens in a batch
+
+        Returns:
+            pd.DataFrame: Data with predictions in the original order
+        """
+        shards = [
+            TaskDataset(self._dataset.data.iloc[rows.start:rows.stop].reset_index(drop=True))
+            for rows in split_into_shards(len(self._dataset), num_workers)
+        ]
+        results = infer_in_processes(
+            self._pipeline_factory(), shards, default_threads_per_worker(len(shards)),
+            sort_by_length=sort_by_length, max_batch_tokens=max_batch_tokens
+        )
+        shards_stats = [stats for _, stats in results if stats is not None]
+        self._padding_stats = sum(shards_stats, PaddingStats(0, 0, 0)) if shards_stats else None
+        merged = pd.concat([predictions for predictions, _ in results])
+        merged.index = self._dataset.data.index
+        return merged
+
+    def _pipeline_factory(self) -> Callable[[TaskDataset], 'LLMPipeline']:
+        """
+        Create a picklable factory of pipelines with the same settings.
+
+        Returns:
+            Callable[[TaskDataset], LLMPipeline]: Function creating a pipeline for a dataset
+        """
+        return partial(
+            LLMPipeline, self._model_name,
+            max_length=self._max_length, batch_size=self._batch_size, device=self._device,
+            max_batch_tokens=self._max_batch_tokens, cache_path=self._cache_path,
+            quantization=self._quantization, backend=self._backend,
+            draft_model_name=self._draft_model_name
+        )
+
+    def _infer_rows(
+        self, rows: Sequence[int], sort_by_length: bool, max_batch_tokens: int | None
+    ) -> list[str | None]:
+        """
+        Infer model on the given rows of the dataset.
+
+        The whole dataset is tokenized at once only if lengths of samples are needed
+        to plan batches, otherwise every batch is tokenized on its own.
+
+        Args:
+            rows (Sequence[int]): Indices of samples to infer
+            sort_by_length (bool): Whether to group samples of similar length into batches
+            max_batch_tokens (int | None): The maximum number of padded tokens in a batch
+
+        Returns:
+            list[str | None]: Predictions in the order of rows
+        """
+        texts = self._dataset.data[ColumnNames.SOURCE.name]
+        samples = {index: (texts.iloc[index],) for index in rows}
+        predictions = dict(zip(rows, self._lookup_cache(list(samples.values()))))
+        missing = [index for index in rows if predictions[index] is None]
+
+        max_batch_tokens = max_batch_tokens or self._max_batch_tokens
+        lengths = self._get_sample_lengths() if sort_by_length or max_batch_tokens else None
+        batches = plan_batches(missing, self._batch_size, lengths, sort_by_length, max_batch_tokens)
+        self._padding_stats = collect_padding_stats(lengths, batches) if lengths else None
+
+        for indices in batches:
+            if lengths is None:
+                output = self._infer_batch([[texts.iloc[index] for index in indices]])
+            else:
+                with timed_stage('tokenize'):
+                    model_input = self._get_tokenized().pad_like(self._tokenizer, indices)
+                output = self._infer_tokens(model_input)
+            if self._cache is not None:
+                self._cache.put_many([samples[index] for index in indices], output)
+            predictions.update(zip(indices, output))
+
+        return [predictions[index] for index in rows]
+
+    def _lookup_cache(self, samples: Sequence[tuple[str, ...]]) -> list[str | None]:
+        """
+        Look up stored predictions of samples.
+
+        Args:
+            samples (Sequence[tuple[str, ...]]): Samples to look up
+
+        Returns:
+            list[str | None]: Stored predictions, None for samples to be inferred
+        """
+        if self._cache is None:
+            return [None] * len(samples)
+        return self._cache.get_many(samples)
+
+    def _calibrate(self) -> None:
+        """
+        Run model on the first samples of the dataset to calibrate static quantization.
+
+        Raises:
+            ValueError: In case of empty dataset
+        """
+        if self._dataset is None or not len(self._dataset):
+            raise ValueError('Static quantization requires a non-empty dataset for calibration')
+
+        num_samples = min(len(self._dataset), 16)
+        samples = [self._dataset[index] for index in range(num_samples)]
+        self._infer_batch(list(zip(*samples)))
+
+    def _get_sample_lengths(self) -> list[int]:
+        """
+        Compute tokenized lengths of all samples in the dataset.
+
+        Returns:
+            list[int]: Number of tokens in each sample after truncation
+        """
+        return self._get_tokenized().lengths
+
+    def _get_tokenized(self) -> TokenizedColumn:
+        """
+        Tokenize all samples of the dataset in one batched call.
+
+        Token ids are stored in dist/tokenized of the lab and reused by subsequent
+        calls and runs with the same tokenizer, max_length and texts.
+
+        Returns:
+            TokenizedColumn: Token ids of samples after truncation
+        """
+        if self._tokenized is None:
+            cache = TokenizationCache(Path(__file__).parent / 'dist' / 'tokenized')
+            self._tokenized = cache.encode(
+                self._tokenizer, self._dataset.data[ColumnNames.SOURCE.name].tolist(),
+                self._max_length
+            )
+        return self._tokenized
 
-    @torch.no_grad()
     def _infer_batch(self, sample_batch: Sequence[tuple[str, ...]]) -> list[str]:
         """
         Infer model on a single batch.
@@ -229,18 +610,73 @@ class LLMPipeline(AbstractLLMPipeline):
         Returns:
             list[str]: Model predictions as strings
         """
-        model_input = self._tokenizer(sample_batch[0],
-                                      return_tensors='pt',
-                                      max_length=self._max_length,
-                                      padding=True,
-                                      truncation=True).to(self._device)
+        with timed_stage('tokenize'):
+            model_input = self._tokenizer(sample_batch[0],
+                                          return_tensors='pt',
+                                          max_length=self._max_length,
+                                          padding=True,
+                                          truncation=True)
+
+        return self._infer_tokens(model_input)
+
+    @torch.no_grad()
+    def _infer_tokens(self, model_input: dict[str, torch.Tensor]) -> list[str]:
+        """
+        Infer model on a single tokenized batch.
+
+        Args:
+            model_input (dict[str, torch.Tensor]): Padded input ids and attention mask
+
+        Returns:
+            list[str]: Model predictions as strings
+        """
+        model_input = {name: tensor.to(self._device) for name, tensor in model_input.items()}
+        if self._draft_model is not None:
+            with timed_stage('generate'):
+                return [
+                    self._generate_with_draft(input_ids[attention_mask.bool()])
+                    for input_ids, attention_mask in zip(model_input['input_ids'],
+                                                         model_input['attention_mask'])
+                ]
+
+        with timed_stage('generate'):
+            output = self._model.generate(**model_input)
 
-        self._model.eval()
-        output = self._model.generate(**model_input)
-        decoded = self._tokenizer.batch_decode(output, skip_special_tokens=True)
+        with timed_stage('decode'):
+            decoded = self._tokenizer.batch_decode(output, skip_special_tokens=True)
 
         return list(map(str, decoded))
 
+    def _generate_with_draft(self, input_ids: torch.Tensor) -> str:
+        """
+        Generate a prediction for a single text with assisted decoding.
+
+        The draft model proposes tokens and the main model verifies them in one pass,
+        so greedy output is the same as without the draft model. Assisted decoding
+        supports only one sequence at a time.
+
+        Args:
+            input_ids (torch.Tensor): Token ids of the text without padding
+
+        Returns:
+            str: Model prediction
+        """
+        input_ids = input_ids.unsqueeze(0)
+
+        start = time.perf_counter()
+        with ForwardCallCounter(self._model) as target, \
+                ForwardCallCounter(self._draft_model) as draft:
+            output = self._model.generate(input_ids=input_ids,
+                                          attention_mask=torch.ones_like(input_ids),
+                                          assistant_model=self._draft_model)
+
+        self._decoding_stats.seconds += time.perf_counter() - start
+        self._decoding_stats.generated_tokens += output.shape[-1] - 1
+        self._decoding_stats.target_calls += target.calls
+        self._decoding_stats.draft_calls += draft.calls
+
+        return str(self._tokenizer.decode(output[0], skip_special_tokens=True))
+
 
 class TaskEvaluator(AbstractTaskEvaluator):
     """
@@ -255,6 +691,8 @@ class TaskEvaluator(AbstractTaskEvaluator):
             data_path (pathlib.Path): Path to predictions
             metrics (Iterable[Metrics]): List of metrics to check
         """
+        from evaluate import load
+
         super().__init__(metrics)
         self._loaded_metrics = [load(metric.value, seed=77) for metric in self._metrics]
         self._data_path = data_path
@@ -3,17 +3,39 @@ Web service for model inference.
 """
 # pylint: disable=too-few-public-methods, undefined-variable, unused-import, assignment-from-no-return, duplicate-code
 
+import asyncio
+import json
 import logging
+import math
+import statistics
+import time
+from collections import deque
 from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable
 
 import pandas as pd
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 from config.constants import PROJECT_ROOT
 from config.lab_settings import LabSettings
+from core_utils.llm.bounded_executor import BoundedExecutor, QueueFullError
+from core_utils.llm.bulk_inference import stream_in_order
+from core_utils.llm.continuous_batching import ContinuousBatchingScheduler
+from core_utils.llm.lazy_loading import LazyLoader
+from core_utils.llm.micro_batching import MicroBatcher
+from core_utils.llm.prediction_cache import model_fingerprint, PredictionCache
+from core_utils.llm.response_cache import normalize_text, ResponseCache
+from core_utils.llm.service_metrics import (
+    LATENCY_BUCKETS,
+    MetricsRegistry,
+    register_serving_metrics,
+    REGISTRY,
+)
+from core_utils.llm.single_flight import SingleFlight
+from core_utils.llm.worker_pool import WorkerPool
 from lab_7_llm.main import LLMPipeline, TaskDataset
 
 logging.basicConfig(level=logging.INFO)
@@ -28,40 +50,251 @@ class Query:
     question: str
 
 
-def init_application() -> tuple[FastAPI, LLMPipeline]:
+@dataclass
+class BatchQuery:
+    """
+    Class representing a list of input texts to be summarized by the model.
+    """
+    questions: list[str]
+
+
+ServedModel = tuple[LLMPipeline, ContinuousBatchingScheduler | MicroBatcher,
+                    Callable[[list[tuple[str, ...]]], list[str | None]]]
+
+
+def init_application() -> tuple[FastAPI, LazyLoader[ServedModel], LabSettings]:
     """
     Initialize core application.
 
+    Concurrent requests are either decoded in a shared batch joined at token boundaries,
+    if the model and its generation config allow it, or collected into batches
+    for a single generate call. Inference runs off the event loop,
+    requests beyond the queue capacity are rejected. With several workers batches are
+    inferred by processes forked after the model is loaded.
+
+    The model is loaded lazily, so the service accepts connections at once: loading
+    starts in the background with a warm-up inference, or on the first request.
+    With several workers the model is loaded before the service starts, as workers
+    must be forked before any inference.
+
     Run: uvicorn lab_7_llm.service:app --reload
 
     Returns:
-        tuple[fastapi.FastAPI, LLMPipeline]: instance of server and pipeline
+        tuple[fastapi.FastAPI, LazyLoader[ServedModel], LabSettings]: instance of server,
+            loader of the pipeline, batcher of concurrent requests and blocking function
+            inferring a batch of samples, and settings of the lab
     """
-    settings_path = PROJECT_ROOT / 'lab_7_llm' / 'settings.json'
-    parameters = LabSettings(settings_path).parameters
+    settings = LabSettings(PROJECT_ROOT / 'lab_7_llm' / 'settings.json')
+    parameters = settings.parameters
 
     max_length = 120
     batch_size = 1
+    max_batch_size = 8
+    max_wait = 0.02
+    max_concurrency = 1
+    max_queue_size = 32
+    num_workers = 1
+    continuous_batching = num_workers == 1
     device = 'cpu'
+    warm_up = True
+
+    def load_model() -> ServedModel:
+        summarization_pipeline = LLMPipeline(
+            parameters.model, TaskDataset(pd.DataFrame()),
+            max_length, batch_size, device
+        )
+
+        infer_samples = summarization_pipeline.infer_samples
+        if num_workers > 1:
+            worker_pool = WorkerPool({'summarize': infer_samples}, num_workers)
+            infer_samples = worker_pool.infer('summarize')
+
+        summarization_batcher: ContinuousBatchingScheduler | MicroBatcher | None = None
+        if continuous_batching:
+            try:
+                summarization_batcher = summarization_pipeline.create_scheduler(max_batch_size,
+                                                                                max_queue_size)
+            except ValueError as error:
+                logger.warning('continuous batching is not used: %s', error)
+        if summarization_batcher is None:
+            summarization_batcher = MicroBatcher(
+                infer_samples, max_batch_size, max_wait,
+                executor=BoundedExecutor(max(max_concurrency, num_workers), max_queue_size),
+                max_queue_size=max_queue_size,
+                max_concurrent_batches=num_workers,
+            )
+        return summarization_pipeline, summarization_batcher, infer_samples
 
-    summarization_pipeline = LLMPipeline(
-        parameters.model, TaskDataset(pd.DataFrame()),
-        max_length, batch_size, device
-    )
+    def warm_up_model(served: ServedModel) -> None:
+        served[2]([('Warm-up text.', )])
+
+    model = LazyLoader(load_model, warm_up_model if warm_up else None, parameters.model)
+    if num_workers > 1:
+        model.get()
+    elif warm_up:
+        model.preload()
 
     summarization_app = FastAPI()
 
-    return summarization_app, summarization_pipeline
+    return summarization_app, model, settings
 
 
-app, pipeline = init_application()
+app, served_model, lab_settings = init_application()
 
 app_path = PROJECT_ROOT / 'lab_7_llm' / 'assets'
 app.mount('/assets', StaticFiles(directory=app_path), name='assets')
 
+time_to_first_token: deque[float] = deque(maxlen=1000)
+
+bulk_window = 16
+
+response_cache = ResponseCache(
+    max_size=1024,
+    ttl=3600,
+    disk=PredictionCache(PROJECT_ROOT / 'lab_7_llm' / 'dist' / 'service_cache.sqlite',
+                         model_fingerprint(lab_settings.parameters.model)),
+)
+in_flight = SingleFlight()
+
+metrics_registry = MetricsRegistry()
+request_latency = register_serving_metrics(
+    metrics_registry,
+    lambda: {'summarizer': served_model.get()[1]} if served_model.loaded else {},
+    response_cache, in_flight,
+)
+first_token_latency = metrics_registry.histogram(
+    'llm_time_to_first_token_seconds', 'Time until the first piece of a streamed summary.',
+    LATENCY_BUCKETS,
+)
+
 logger.info('fastapi application started')
 
 
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, error: QueueFullError) -> JSONResponse:
+    """
+    Reject a request that does not fit into the inference queue.
+
+    Args:
+        request (Request): The incoming HTTP request object, provided by FastAPI
+        error (QueueFullError): Raised error with suggested retry delay
+
+    Returns:
+        JSONResponse: Response with status 503 and Retry-After header
+    """
+    logger.warning('rejected request to %s: %s', request.url.path, error)
+    return JSONResponse(status_code=503, content={'detail': str(error)},
+                        headers={'Retry-After': str(math.ceil(error.retry_after))})
+
+
+@app.middleware('http')
+async def measure_latency(request: Request, call_next: Callable) -> Response:
+    """
+    Observe latency of an HTTP request.
+
+    Args:
+        request (Request): The incoming HTTP request object, provided by FastAPI
+        call_next (Callable): Handler of the request
+
+    Returns:
+        Response: Response of the handler
+    """
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get('route')
+    path = getattr(route, 'path', None) or 'unmatched'
+    request_latency.observe(time.perf_counter() - start, method=request.method, path=path,
+                            status=str(response.status_code))
+    return response
+
+
+async def summarize(text: str, on_text: Callable[[str], Any] | None = None) -> str | None:
+    """
+    Summarize a text as a part of a batch of concurrent requests.
+
+    Summaries of repeated texts are taken from the response cache, concurrent
+    requests with the same text share one generation unless they are streamed.
+    Responses are keyed by identity of the pipeline, which covers max_length
+    and the generation config, so changed settings do not reuse stale summaries.
+
+    Args:
+        text (str): Text to summarize
+        on_text (Callable[[str], Any] | None): Function called with every new piece
+            of the summary, with the whole summary at once for micro-batching and cache hits
+
+    Returns:
+        str | None: A summary
+    """
+    text = normalize_text(text)
+    pipeline, _, _ = await served_model.aget()
+    key = (pipeline.identity, text)
+    result = response_cache.get(key)
+    if result is not None:
+        if on_text is not None and result:
+            on_text(result)
+        return result
+
+    if on_text is None:
+        return await in_flight.run(key, lambda: generate_summary(text, key))
+    return await generate_summary(text, key, on_text)
+
+
+async def generate_summary(text: str, key: tuple[str, str],
+                           on_text: Callable[[str], Any] | None = None) -> str | None:
+    """
+    Summarize a normalized text with the model and put the summary to the response cache.
+
+    Args:
+        text (str): Normalized text to summarize
+        key (tuple[str, str]): Key of the response in the cache
+        on_text (Callable[[str], Any] | None): Function called with every new piece
+            of the summary
+
+    Returns:
+        str | None: A summary
+    """
+    _, batcher, _ = await served_model.aget()
+    if isinstance(batcher, MicroBatcher):
+        result = await batcher.submit((text, ))
+        if on_text is not None and result:
+            on_text(result)
+    else:
+        result = await asyncio.wrap_future(batcher.submit(text, on_text))
+    if result is not None:
+        response_cache.put(key, result)
+    return result
+
+
+async def stream_events(first_piece: str | None, pieces: asyncio.Queue,
+                        summary: asyncio.Future, first_token_time: float) -> AsyncIterator[str]:
+    """
+    Format pieces of a summary as Server-Sent Events.
+
+    Args:
+        first_piece (str | None): Already received piece, None if the summary is empty
+        pieces (asyncio.Queue): Queue of next pieces ending with None
+        summary (asyncio.Future): Future of the whole summary
+        first_token_time (float): Time to first token in seconds
+
+    Yields:
+        str: Event with a piece of the summary, then the final event with the whole summary
+    """
+    piece = first_piece
+    while piece is not None:
+        yield f'data: {json.dumps({"token": piece})}\n\n'
+        piece = await pieces.get()
+
+    try:
+        result = summary.result()
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        logger.error('streaming inference failed: %s', error)
+        yield f'event: error\ndata: {json.dumps({"detail": str(error)})}\n\n'
+        return
+    logger.info('model inference complete: %s', result)
+    final = {'infer': result, 'time_to_first_token': round(first_token_time, 4)}
+    yield f'event: end\ndata: {json.dumps(final)}\n\n'
+
+
 @app.get('/', response_class=HTMLResponse)
 async def root(request: Request) -> HTMLResponse:
     """
@@ -89,7 +322,168 @@ async def infer(request: Query) -> dict[str, str]:
         dict[str, str]: A dictionary containing the inference results
     """
     logger.info('received request: %s', request.question)
-    result = pipeline.infer_sample((request.question, ))
+    result = await summarize(request.question)
     logger.info('model inference complete: %s', result)
 
     return {'infer': result}
+
+
+@app.post('/infer/stream')
+async def infer_stream(request: Query) -> StreamingResponse:
+    """
+    Create an endpoint streaming a summary as Server-Sent Events while it is generated.
+
+    Every event carries a new piece of the summary, the final `end` event carries
+    the whole summary and time to first token.
+
+    Args:
+        request (Query): The incoming HTTP request object containing the input text
+
+    Returns:
+        StreamingResponse: Stream of events
+    """
+    logger.info('received streaming request: %s', request.question)
+    loop = asyncio.get_running_loop()
+    pieces: asyncio.Queue = asyncio.Queue()
+
+    start = time.perf_counter()
+    summary = asyncio.ensure_future(summarize(
+        request.question, lambda piece: loop.call_soon_threadsafe(pieces.put_nowait, piece)
+    ))
+    summary.add_done_callback(lambda _: pieces.put_nowait(None))
+
+    first_piece = await pieces.get()
+    if first_piece is None:
+        summary.result()
+    first_token_time = time.perf_counter() - start
+    time_to_first_token.append(first_token_time)
+    first_token_latency.observe(first_token_time)
+
+    return StreamingResponse(stream_events(first_piece, pieces, summary, first_token_time),
+                             media_type='text/event-stream')
+
+
+@app.post('/infer/batch')
+async def infer_batch(request: BatchQuery) -> StreamingResponse:
+    """
+    Create an endpoint summarizing many texts in batches.
+
+    Texts are summarized as concurrent requests sharing batches, the response cache
+    and coalescing with other requests. Results are streamed as NDJSON lines
+    in the order of texts, a failure ends the stream with an error line.
+
+    Args:
+        request (BatchQuery): The incoming HTTP request object containing the input texts
+
+    Returns:
+        StreamingResponse: Stream of lines with index of a text and its summary
+    """
+    logger.info('received batch request of %s texts', len(request.questions))
+    results = stream_in_order(summarize, request.questions, bulk_window)
+    # an overloaded service rejects the whole request before the stream starts
+    received = [await anext(results)] if request.questions else []
+
+    async def lines() -> AsyncIterator[str]:
+        index = 0
+        try:
+            for result in received:
+                yield json.dumps({'index': index, 'infer': result}) + '\n'
+                index += 1
+            async for result in results:
+                yield json.dumps({'index': index, 'infer': result}) + '\n'
+                index += 1
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            logger.error('batch inference failed: %s', error)
+            yield json.dumps({'index': index, 'error': str(error)}) + '\n'
+        finally:
+            await results.aclose()
+
+    return StreamingResponse(lines(), media_type='application/x-ndjson')
+
+
+@app.get('/latency')
+async def latency_stats() -> dict:
+    """
+    Create an endpoint with time to first token of recent streaming requests.
+
+    Returns:
+        dict: Number of measurements, mean and percentiles in seconds
+    """
+    measurements = sorted(time_to_first_token)
+    if not measurements:
+        return {'time_to_first_token': {'count': 0}}
+    return {'time_to_first_token': {
+        'count': len(measurements),
+        'mean': round(statistics.fmean(measurements), 4),
+        'p50': round(statistics.median(measurements), 4),
+        'p95': round(measurements[int(0.95 * (len(measurements) - 1))], 4),
+    }}
+
+
+@app.get('/metrics')
+async def metrics() -> PlainTextResponse:
+    """
+    Create an endpoint with metrics of the service in Prometheus text format.
+
+    Returns:
+        PlainTextResponse: Metrics text
+    """
+    return PlainTextResponse(REGISTRY.render() + metrics_registry.render(),
+                             media_type='text/plain; version=0.0.4')
+
+
+@app.get('/health')
+async def health() -> dict[str, str]:
+    """
+    Create an endpoint reporting that the service is alive.
+
+    Returns:
+        dict[str, str]: Status of the service
+    """
+    return {'status': 'ok'}
+
+
+@app.get('/ready')
+async def ready() -> dict:
+    """
+    Create an endpoint reporting whether the model is ready to infer.
+
+    Returns:
+        dict: Readiness of the model with loading and warm-up time
+    """
+    return {'ready': served_model.loaded, 'model': served_model.stats()}
+
+
+@app.get('/cache')
+async def cache_stats() -> dict:
+    """
+    Create an endpoint with statistics of the response cache.
+
+    Returns:
+        dict: Hit and miss counters of the cache
+    """
+    return response_cache.stats()
+
+
+@app.get('/coalescing')
+async def coalescing_stats() -> dict:
+    """
+    Create an endpoint with statistics of coalescing of identical requests.
+
+    Returns:
+        dict: Counters of started and coalesced generations
+    """
+    return in_flight.stats()
+
+
+@app.get('/batching')
+async def batching_stats() -> dict:
+    """
+    Create an endpoint with the state of request batching.
+
+    Returns:
+        dict: Queue depth and counters of the batcher, empty before the model is loaded
+    """
+    if not served_model.loaded:
+        return {}
+    return served_model.get()[1].stats()
@@ -34,20 +34,26 @@ def main() -> None:
 
     dataset = TaskDataset(preprocessor.data.head(100))
 
-    batch_size = 1
+    batch_size = 64
     max_length = 120
+    max_batch_tokens = 2048
     device = 'cpu'
 
-    pipeline = LLMPipeline(parameters.model, dataset, max_length, batch_size, device)
+    cache_path = PROJECT_ROOT / 'lab_7_llm' / 'dist' / 'predictions_cache.sqlite'
+
+    pipeline = LLMPipeline(parameters.model, dataset, max_length, batch_size, device,
+                           max_batch_tokens=max_batch_tokens, cache_path=cache_path,
+                           draft_model_name=parameters.draft_model)
     print(pipeline.analyze_model())
     print(pipeline.infer_sample(dataset[22]))
 
     predictions_path = PROJECT_ROOT / 'lab_7_llm' / 'dist' / 'predictions.csv'
     predictions_path.parent.mkdir(parents=True, exist_ok=True)
 
-
-    predictions = pipeline.infer_dataset()
-    predictions.to_csv(predictions_path)
+    pipeline.infer_dataset_to_file(predictions_path, chunk_size=20, sort_by_length=True)
+    print(pipeline.padding_stats)
+    if parameters.draft_model:
+        print(pipeline.decoding_stats.as_dict())
 
     evaluator = TaskEvaluator(predictions_path, parameters.metrics)
     comparison = evaluator.run()
@@ -0,0 +1,106 @@
+"""
+Checks assisted decoding with a draft model
+"""
+# pylint: disable=duplicate-code
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from core_utils.llm.decoding_stats import DecodingStats
+from lab_7_llm.main import LLMPipeline, TaskDataset
+from lab_7_llm.tests.tiny_models import random_texts, save_t5
+
+
+class AssistedDecodingTest(unittest.TestCase):
+    """
+    Tests decoding with a draft model sharing the vocabulary of the main model
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        cls._target = save_t5(Path(cls._directory.name) / 'target')
+        cls._draft = save_t5(Path(cls._directory.name) / 'draft', seed=1, d_model=16,
+                             num_layers=1)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._directory.cleanup()
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_same_as_greedy(self) -> None:
+        """
+        Outputs with the draft model are identical to plain greedy decoding
+        """
+        samples = [(text, ) for text in random_texts(6)]
+        plain = LLMPipeline(self._target, TaskDataset(pd.DataFrame()), max_length=30,
+                            batch_size=4, device='cpu')
+        assisted = LLMPipeline(self._target, TaskDataset(pd.DataFrame()), max_length=30,
+                               batch_size=4, device='cpu', draft_model_name=self._draft)
+
+        self.assertEqual(plain.infer_samples(samples), assisted.infer_samples(samples))
+
+        stats = assisted.decoding_stats
+        self.assertGreater(stats.generated_tokens, 0)
+        self.assertGreaterEqual(stats.target_calls, len(samples))
+        self.assertGreater(stats.draft_calls, 0)
+        self.assertGreaterEqual(stats.acceptance_rate, 0.0)
+        self.assertLessEqual(stats.acceptance_rate, 1.0)
+        self.assertEqual(DecodingStats(), plain.decoding_stats)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_matching_draft_accepted(self) -> None:
+        """
+        Tokens of a draft model equal to the main model are mostly accepted
+        """
+        samples = [(text, ) for text in random_texts(6)]
+        assisted = LLMPipeline(self._target, TaskDataset(pd.DataFrame()), max_length=30,
+                               batch_size=4, device='cpu', draft_model_name=self._target)
+
+        assisted.infer_samples(samples)
+
+        stats = assisted.decoding_stats
+        self.assertLess(stats.target_calls, stats.generated_tokens)
+        self.assertGreater(stats.acceptance_rate, 0.5)
+
+
+class DecodingStatsTest(unittest.TestCase):
+    """
+    Tests statistics of assisted decoding
+    """
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_acceptance_rate(self) -> None:
+        """
+        Every pass of the main model adds one token on top of accepted draft tokens
+        """
+        stats = DecodingStats(generated_tokens=10, target_calls=4, draft_calls=8)
+
+        self.assertEqual(0.75, stats.acceptance_rate)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_acceptance_rate_bounds(self) -> None:
+        """
+        Acceptance rate stays within [0, 1] and is zero without draft passes
+        """
+        self.assertEqual(0.0, DecodingStats(generated_tokens=5, target_calls=5).acceptance_rate)
+        self.assertEqual(0.0, DecodingStats(generated_tokens=3, target_calls=5,
+                                            draft_calls=4).acceptance_rate)
+        self.assertEqual(1.0, DecodingStats(generated_tokens=20, target_calls=2,
+                                            draft_calls=4).acceptance_rate)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_tokens_per_second(self) -> None:
+        """
+        Throughput is computed over the time spent on generation
+        """
+        self.assertEqual(0.0, DecodingStats(generated_tokens=5).tokens_per_second)
+        self.assertEqual(4.0, DecodingStats(generated_tokens=10, seconds=2.5).tokens_per_second)
@@ -0,0 +1,166 @@
+"""
+Checks planning of inference batches and resumable storage of predictions
+"""
+# pylint: disable=duplicate-code
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from core_utils.llm.batching import collect_padding_stats, PaddingStats, plan_batches
+from core_utils.llm.predictions_writer import PredictionsWriter
+
+
+class PlanBatchesTest(unittest.TestCase):
+    """
+    Tests planning of batches
+    """
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_fixed_batch_size(self) -> None:
+        """
+        Samples are split into batches of the given size in the dataset order
+        """
+        self.assertEqual([[0, 1], [2, 3], [4]], plan_batches(range(5), 2))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_sort_by_length(self) -> None:
+        """
+        Samples of similar length are grouped, indices allow restoring the order
+        """
+        lengths = [3, 10, 1, 7]
+        batches = plan_batches(range(4), 2, lengths, sort_by_length=True)
+
+        self.assertEqual([[1, 3], [0, 2]], batches)
+        self.assertEqual(list(range(4)), sorted(index for batch in batches for index in batch))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_token_budget(self) -> None:
+        """
+        Padded size of every batch fits into the token budget
+        """
+        lengths = [4, 4, 4, 8, 8, 2]
+        batches = plan_batches(range(6), 100, lengths, max_batch_tokens=16)
+
+        self.assertEqual([[0, 1, 2], [3, 4], [5]], batches)
+        for batch in batches:
+            self.assertLessEqual(len(batch) * max(lengths[index] for index in batch), 16)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_oversize_sample(self) -> None:
+        """
+        A sample longer than the token budget forms a batch of its own
+        """
+        batches = plan_batches(range(3), 100, [2, 50, 2], max_batch_tokens=8)
+
+        self.assertEqual([[0], [1], [2]], batches)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_lengths_required(self) -> None:
+        """
+        Sorting and token budget are impossible without lengths
+        """
+        with self.assertRaises(ValueError):
+            plan_batches(range(3), 2, sort_by_length=True)
+        with self.assertRaises(ValueError):
+            plan_batches(range(3), 2, max_batch_tokens=8)
+
+
+class PaddingStatsTest(unittest.TestCase):
+    """
+    Tests statistics of padding overhead
+    """
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_collect(self) -> None:
+        """
+        Every batch is padded to its longest sample
+        """
+        stats = collect_padding_stats([2, 4, 3, 3], [[0, 1], [2, 3]])
+
+        self.assertEqual(PaddingStats(num_batches=2, real_tokens=12, padded_tokens=14), stats)
+        self.assertAlmostEqual(12 / 14, stats.efficiency)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_add(self) -> None:
+        """
+        Statistics of chunks are summed up
+        """
+        total = sum([PaddingStats(1, 3, 4), PaddingStats(2, 5, 8)], PaddingStats(0, 0, 0))
+
+        self.assertEqual(PaddingStats(3, 8, 12), total)
+        self.assertEqual(0.6667, total.as_dict()['padding_efficiency'])
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_empty(self) -> None:
+        """
+        No batches mean no padding overhead
+        """
+        self.assertEqual(1.0, PaddingStats(0, 0, 0).efficiency)
+
+
+class PredictionsWriterTest(unittest.TestCase):
+    """
+    Tests resumable storage of predictions
+    """
+
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self._path = Path(self._directory.name) / 'predictions.csv'
+        self._data = pd.DataFrame({'target': ['a', 'b', 'c', 'd'],
+                                   'predictions': ['1', '2', '3', '4']})
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_chunks_equal_whole_table(self) -> None:
+        """
+        File written by chunks is the same as written at once
+        """
+        writer = PredictionsWriter(self._path, 'run')
+        writer.append(self._data.iloc[:3])
+        writer.append(self._data.iloc[3:])
+
+        self.assertEqual(4, writer.offset)
+        self.assertEqual(self._data.to_csv(), self._path.read_text(encoding='utf-8'))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_resume(self) -> None:
+        """
+        A new writer of the same run continues after the last checkpoint
+        """
+        PredictionsWriter(self._path, 'run').append(self._data.iloc[:2])
+        with self._path.open('a', encoding='utf-8') as file:
+            file.write('2,partially written row')
+
+        writer = PredictionsWriter(self._path, 'run')
+        self.assertEqual(2, writer.offset)
+        writer.append(self._data.iloc[2:])
+
+        self.assertEqual(self._data.to_csv(), self._path.read_text(encoding='utf-8'))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_other_run_starts_over(self) -> None:
+        """
+        A checkpoint of another run is ignored
+        """
+        PredictionsWriter(self._path, 'run').append(self._data.iloc[:2])
+
+        writer = PredictionsWriter(self._path, 'other run')
+
+        self.assertEqual(0, writer.offset)
+        self.assertFalse(self._path.exists())
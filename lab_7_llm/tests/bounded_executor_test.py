@@ -0,0 +1,56 @@
+"""
+Checks rejection of inference tasks beyond the queue capacity
+"""
+# pylint: disable=duplicate-code
+import asyncio
+import threading
+import unittest
+
+import pytest
+
+from core_utils.llm.bounded_executor import BoundedExecutor, QueueFullError
+from core_utils.llm.micro_batching import MicroBatcher
+
+
+class BoundedExecutorTest(unittest.TestCase):
+    """
+    Tests rejection of tasks beyond the queue capacity
+    """
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_rejection(self) -> None:
+        """
+        A task beyond the capacity is rejected with a retry delay
+        """
+        executor = BoundedExecutor(max_workers=1, max_queue_size=1, retry_after=2.5)
+        release = threading.Event()
+        futures = [executor.submit(release.wait) for _ in range(2)]
+
+        with self.assertRaises(QueueFullError) as context:
+            executor.submit(release.wait)
+        self.assertEqual(2.5, context.exception.retry_after)
+        self.assertEqual(2, executor.pending)
+
+        release.set()
+        for future in futures:
+            future.result()
+        self.assertEqual(0, executor.pending)
+        executor.submit(lambda: None).result()
+        executor.shutdown()
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_full_batcher_queue(self) -> None:
+        """
+        A request beyond the queue of a batcher is rejected with a retry delay
+        """
+        batcher = MicroBatcher(lambda items: items, max_batch_size=1, max_wait=0,
+                               max_queue_size=1, retry_after=3)
+
+        async def run() -> None:
+            await asyncio.gather(batcher.submit(1), batcher.submit(2))
+
+        with self.assertRaises(QueueFullError) as context:
+            asyncio.run(run())
+        self.assertEqual(3, context.exception.retry_after)
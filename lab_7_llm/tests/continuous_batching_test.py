@@ -0,0 +1,111 @@
+"""
+Checks that continuous batching decodes the same summaries as generate
+"""
+# pylint: disable=duplicate-code
+import time
+import unittest
+
+import pytest
+import torch
+
+from core_utils.llm.continuous_batching import ContinuousBatchingScheduler
+from lab_7_llm.tests.tiny_models import build_t5, build_tokenizer, random_texts
+
+
+class ContinuousBatchingTest(unittest.TestCase):
+    """
+    Tests the continuous batching scheduler on a tiny T5 model
+    """
+
+    def setUp(self) -> None:
+        self._model = build_t5()
+        self._tokenizer = build_tokenizer()
+        self._max_length = 30
+
+    def _generate(self, text: str) -> str:
+        model_input = self._tokenizer([text], return_tensors='pt',
+                                      max_length=self._max_length, truncation=True)
+        with torch.no_grad():
+            output = self._model.generate(**model_input)
+        return str(self._tokenizer.decode(output[0], skip_special_tokens=True))
+
+    def _wait_active(self, scheduler: ContinuousBatchingScheduler, count: int) -> None:
+        deadline = time.monotonic() + 30
+        while scheduler.stats()['active_sequences'] < count:
+            self.assertLess(time.monotonic(), deadline, 'request is not admitted')
+            time.sleep(0.001)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_equal_to_generate(self) -> None:
+        """
+        Staggered requests of different lengths get greedy outputs of generate
+        """
+        texts = random_texts(12)
+        references = [self._generate(text) for text in texts]
+        scheduler = ContinuousBatchingScheduler(self._model, self._tokenizer,
+                                                self._max_length, max_batch_size=4)
+
+        futures = []
+        for index, text in enumerate(texts):
+            futures.append(scheduler.submit(text))
+            if index % 3 == 2:
+                time.sleep(0.01)
+
+        self.assertEqual(references, [future.result(timeout=60) for future in futures])
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_generation_config_applied(self) -> None:
+        """
+        Min length, repetition penalty and n-gram blocking are applied as by generate
+        """
+        generation_config = self._model.generation_config
+        generation_config.min_length = 12
+        generation_config.repetition_penalty = 1.3
+        generation_config.no_repeat_ngram_size = 2
+        texts = random_texts(6, seed=2)
+        references = [self._generate(text) for text in texts]
+        scheduler = ContinuousBatchingScheduler(self._model, self._tokenizer,
+                                                self._max_length, max_batch_size=4)
+
+        futures = [scheduler.submit(text) for text in texts]
+
+        self.assertEqual(references, [future.result(timeout=60) for future in futures])
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_short_request_overtakes_long(self) -> None:
+        """
+        A short request admitted later finishes before a long one admitted earlier
+        """
+        texts = random_texts(12)
+        lengths = {text: len(self._tokenizer(self._generate(text))['input_ids'])
+                   for text in texts}
+        long_text = max(texts, key=lengths.__getitem__)
+        short_text = min(texts, key=lengths.__getitem__)
+        self.assertGreater(lengths[long_text], lengths[short_text] + 2)
+
+        scheduler = ContinuousBatchingScheduler(self._model, self._tokenizer,
+                                                self._max_length, max_batch_size=4)
+        finished: list[str] = []
+        long_future = scheduler.submit(long_text)
+        long_future.add_done_callback(lambda _: finished.append('long'))
+        self._wait_active(scheduler, 1)
+        short_future = scheduler.submit(short_text)
+        short_future.add_done_callback(lambda _: finished.append('short'))
+
+        self.assertEqual(self._generate(short_text), short_future.result(timeout=60))
+        self.assertEqual(self._generate(long_text), long_future.result(timeout=60))
+        self.assertEqual(['short', 'long'], finished)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_beam_search_refused(self) -> None:
+        """
+        Generation options other than greedy decoding are refused
+        """
+        self._model.generation_config.num_beams = 3
+
+        with self.assertRaises(ValueError):
+            ContinuousBatchingScheduler(self._model, self._tokenizer, self._max_length, 4)
@@ -0,0 +1,109 @@
+"""
+Checks analytic estimation of compute cost of transformer inference
+"""
+# pylint: disable=duplicate-code
+import unittest
+
+import pytest
+from transformers import BertConfig, T5Config
+
+from core_utils.llm.cost_model import CostModel, HostProfile, StageCost
+
+
+class CostModelTest(unittest.TestCase):
+    """
+    Tests estimates on a fixed host profile without micro-benchmarks
+    """
+
+    def setUp(self) -> None:
+        self._host = HostProfile(flops_per_second={1: 1e9, 4: 4e9, 16: 10e9},
+                                 bytes_per_second=1e9)
+        self._encoder = BertConfig(vocab_size=10, hidden_size=8, num_attention_heads=2,
+                                   intermediate_size=16, num_hidden_layers=2)
+        self._seq2seq = T5Config(vocab_size=10, d_model=8, d_kv=4, num_heads=2, d_ff=16,
+                                 num_layers=1, num_decoder_layers=1)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_flops_at(self) -> None:
+        """
+        Throughput is interpolated between measured numbers of rows and clamped outside
+        """
+        self.assertEqual(1e9, self._host.flops_at(0))
+        self.assertEqual(1e9, self._host.flops_at(1))
+        self.assertEqual(2e9, self._host.flops_at(2))
+        self.assertEqual(4e9, self._host.flops_at(4))
+        self.assertEqual(7e9, self._host.flops_at(10))
+        self.assertEqual(10e9, self._host.flops_at(100))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_stage_bound(self) -> None:
+        """
+        A stage takes the time of its arithmetic or memory reads, whichever is longer
+        """
+        self.assertEqual(2.0, StageCost(flops=2e9, bytes=1e8, rows=1).seconds(self._host))
+        self.assertEqual(0.5, StageCost(flops=2e9, bytes=5e8, rows=16).seconds(self._host))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_encode_flops(self) -> None:
+        """
+        FLOPs of an encoder pass equal the hand-computed value
+        """
+        cost = CostModel(self._encoder).encode(input_length=3, batch_size=2)
+
+        # every layer: 4 attention projections 8x8 and 2 feed-forward matrices 8x16
+        # are 512 weights multiplied by 6 tokens, 2 * 6 * 512 = 6144 FLOPs;
+        # scores and weighted values are 2 * 2 * 3 * 3 * 8 = 288 FLOPs per sequence
+        self.assertEqual(2 * (6144 + 2 * 288), cost.flops)
+        self.assertEqual(2 * 512 * 4, cost.bytes)
+        self.assertEqual(6, cost.rows)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_encode_flops_with_cross_attention(self) -> None:
+        """
+        Keys and values of cross-attention are projected once as a part of encoding
+        """
+        cost = CostModel(self._seq2seq).encode(input_length=3)
+
+        # encoder layer: 2 * 3 * 512 + 2 * 2 * 3 * 3 * 8 = 3360 FLOPs,
+        # cross-attention keys and values: 2 * 3 * (2 * 8 * 8) = 768 FLOPs
+        self.assertEqual(3360 + 768, cost.flops)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_encoder_only_skips_generation(self) -> None:
+        """
+        Encoder-only models are estimated without generation steps
+        """
+        cost_model = CostModel(self._encoder)
+
+        estimate = cost_model.estimate(self._host, input_length=3, output_length=20,
+                                       batch_size=2)
+
+        self.assertEqual(0.0, estimate['decoder_gflops'])
+        self.assertEqual(0.0, estimate['decoder_seconds'])
+        self.assertEqual(estimate['encoder_seconds'], estimate['latency'])
+        self.assertEqual(cost_model.estimate(self._host, 3, 0, 2), estimate)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_generation_with_overheads(self) -> None:
+        """
+        Every generation step adds its cost and the calibrated overheads
+        """
+        cost_model = CostModel(self._seq2seq)
+        cost_model.step_overhead = 0.01
+        cost_model.sequence_overhead = 0.001
+        steps = [cost_model.decode_step(position, 3, 2).seconds(self._host)
+                 for position in range(4)]
+
+        estimate = cost_model.estimate(self._host, input_length=3, output_length=4,
+                                       batch_size=2)
+
+        self.assertAlmostEqual(sum(steps) + 4 * (0.01 + 0.001), estimate['decoder_seconds'],
+                               places=5)
+        self.assertAlmostEqual(estimate['encoder_seconds'] + estimate['decoder_seconds'],
+                               estimate['latency'], places=4)
@@ -0,0 +1,111 @@
+"""
+Checks lazy loading of served models
+"""
+# pylint: disable=duplicate-code
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core_utils.llm.lazy_loading import LazyLoader
+
+
+class LazyLoaderTest(unittest.TestCase):
+    """
+    Tests creation of a value on first use
+    """
+
+    def setUp(self) -> None:
+        self._calls: list[str] = []
+
+    def _factory(self) -> str:
+        self._calls.append('load')
+        time.sleep(0.05)
+        return 'model'
+
+    def _warm_up(self, value: str) -> None:
+        self._calls.append(f'warm up {value}')
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_created_on_first_use(self) -> None:
+        """
+        Nothing is loaded until the value is requested, then it is loaded and warmed up once
+        """
+        loader = LazyLoader(self._factory, self._warm_up)
+        self.assertFalse(loader.loaded)
+        self.assertEqual([], self._calls)
+
+        self.assertEqual('model', loader.get())
+        self.assertEqual('model', loader.get())
+
+        self.assertTrue(loader.loaded)
+        self.assertEqual(['load', 'warm up model'], self._calls)
+        self.assertIsNotNone(loader.stats()['load_seconds'])
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_concurrent_get(self) -> None:
+        """
+        Concurrent callers in threads and in the event loop wait for one loading
+        """
+        loader = LazyLoader(self._factory, self._warm_up)
+
+        async def get_in_loop() -> list[str]:
+            return list(await asyncio.gather(*(loader.aget() for _ in range(4))))
+
+        with ThreadPoolExecutor(4) as executor:
+            in_threads = [executor.submit(loader.get) for _ in range(4)]
+            in_loop = asyncio.run(get_in_loop())
+
+        self.assertEqual(['model'] * 8, in_loop + [future.result() for future in in_threads])
+        self.assertEqual(['load', 'warm up model'], self._calls)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_preload(self) -> None:
+        """
+        Loading started in the background is awaited by get instead of repeated
+        """
+        release = threading.Event()
+
+        def factory() -> str:
+            release.wait(timeout=30)
+            return self._factory()
+
+        loader = LazyLoader(factory)
+        loader.preload()
+        deadline = time.monotonic() + 30
+        while not loader.stats()['loading']:
+            self.assertLess(time.monotonic(), deadline, 'loading is not started')
+            time.sleep(0.001)
+        release.set()
+
+        self.assertEqual('model', loader.get())
+        self.assertEqual(['load'], self._calls)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_failure_retried(self) -> None:
+        """
+        A failed loading is recorded and retried by the next call
+        """
+        failures = [ValueError('no weights')]
+
+        def factory() -> str:
+            if failures:
+                raise failures.pop()
+            return self._factory()
+
+        loader = LazyLoader(factory)
+
+        with self.assertRaises(ValueError):
+            loader.get()
+        self.assertEqual("ValueError('no weights')", loader.stats()['error'])
+        self.assertFalse(loader.loaded)
+
+        self.assertEqual('model', asyncio.run(loader.aget()))
+        self.assertIsNone(loader.stats()['error'])
@@ -0,0 +1,68 @@
+"""
+Checks collection of concurrent requests into batches
+"""
+# pylint: disable=duplicate-code
+import asyncio
+import time
+import unittest
+
+import pytest
+
+from core_utils.llm.micro_batching import MicroBatcher
+
+
+class MicroBatcherTest(unittest.TestCase):
+    """
+    Tests collection of concurrent requests into batches
+    """
+
+    def setUp(self) -> None:
+        self._batches: list[list[int]] = []
+
+    def _infer(self, items: list[int]) -> list[int]:
+        self._batches.append(items)
+        return [item * 2 for item in items]
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_flush_on_size(self) -> None:
+        """
+        A full batch is dispatched without waiting for the window to expire
+        """
+        batcher = MicroBatcher(self._infer, max_batch_size=2, max_wait=10)
+
+        async def run() -> list:
+            return await asyncio.gather(*(batcher.submit(item) for item in range(4)))
+
+        start = time.perf_counter()
+        self.assertEqual([0, 2, 4, 6], asyncio.run(run()))
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertEqual([[0, 1], [2, 3]], self._batches)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_flush_on_timeout(self) -> None:
+        """
+        A batch that is not full is dispatched when the window expires
+        """
+        batcher = MicroBatcher(self._infer, max_batch_size=8, max_wait=0.2)
+
+        async def run() -> list:
+            return await asyncio.gather(*(batcher.submit(item) for item in range(3)))
+
+        start = time.perf_counter()
+        self.assertEqual([0, 2, 4], asyncio.run(run()))
+        self.assertGreaterEqual(time.perf_counter() - start, 0.15)
+        self.assertEqual([[0, 1, 2]], self._batches)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_single_request(self) -> None:
+        """
+        A request not followed by others is dispatched at once
+        """
+        batcher = MicroBatcher(self._infer, max_batch_size=8, max_wait=10)
+
+        start = time.perf_counter()
+        self.assertEqual(2, asyncio.run(batcher.submit(1)))
+        self.assertLess(time.perf_counter() - start, 5)
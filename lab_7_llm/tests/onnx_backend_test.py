@@ -0,0 +1,142 @@
+"""
+Checks reuse of models exported to ONNX
+"""
+# pylint: disable=duplicate-code
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+from unittest import mock
+
+import pytest
+
+from core_utils.llm.onnx_backend import get_export_dir, load_onnx_model, OnnxTask
+from core_utils.llm.prediction_cache import model_fingerprint
+from lab_7_llm.tests.tiny_models import save_t5
+
+
+class OnnxExportTest(unittest.TestCase):
+    """
+    Tests the decision to export a model with the exporter mocked
+    """
+
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self._root = Path(self._directory.name)
+        self._model_path = self._root / 'model'
+        self._model_path.mkdir()
+        (self._model_path / 'model.safetensors').write_bytes(b'weights')
+
+        def save_pretrained(directory: Path) -> None:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+
+        self._model_class = mock.MagicMock()
+        self._model_class.from_pretrained.return_value.save_pretrained.side_effect = \
+            save_pretrained
+        onnxruntime = ModuleType('optimum.onnxruntime')
+        onnxruntime.ORTModelForSeq2SeqLM = self._model_class  # type: ignore
+        onnxruntime.ORTModelForSequenceClassification = self._model_class  # type: ignore
+        self._modules = mock.patch.dict(sys.modules, {'optimum': ModuleType('optimum'),
+                                                      'optimum.onnxruntime': onnxruntime})
+        self._modules.start()
+
+    def tearDown(self) -> None:
+        self._modules.stop()
+        self._directory.cleanup()
+
+    def _load(self, model_name: str, task: OnnxTask = OnnxTask.CLASSIFICATION) -> Any:
+        return load_onnx_model(model_name, task, self._root / 'exports')
+
+    def _exported(self) -> bool:
+        return bool(self._model_class.from_pretrained.call_args.kwargs.get('export'))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_export_dir(self) -> None:
+        """
+        Graphs of a local model are stored next to it, of a Hub model under the root
+        """
+        self.assertEqual(self._model_path / 'onnx',
+                         get_export_dir(str(self._model_path), self._root / 'exports'))
+        self.assertEqual(self._root / 'exports' / 'org' / 'model',
+                         get_export_dir('org/model', self._root / 'exports'))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_exported_once(self) -> None:
+        """
+        A model is exported on first load and the export is reused afterwards
+        """
+        self._load(str(self._model_path))
+
+        self.assertTrue(self._exported())
+        self._model_class.from_pretrained.assert_called_with(
+            str(self._model_path), export=True, provider='CPUExecutionProvider'
+        )
+        source_path = self._model_path / 'onnx' / 'source_fingerprint.txt'
+        self.assertEqual(model_fingerprint(str(self._model_path)),
+                         source_path.read_text(encoding='utf-8'))
+
+        self._load(str(self._model_path))
+
+        self._model_class.from_pretrained.assert_called_with(
+            self._model_path / 'onnx', provider='CPUExecutionProvider'
+        )
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_reexported_when_source_changes(self) -> None:
+        """
+        A model is exported again when its weights are modified
+        """
+        self._load(str(self._model_path))
+        weights = self._model_path / 'model.safetensors'
+        stat = weights.stat()
+        os.utime(weights, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        self._load(str(self._model_path))
+
+        self.assertTrue(self._exported())
+        self.assertEqual(2, self._model_class.from_pretrained.call_count)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_reexported_when_fingerprint_differs(self) -> None:
+        """
+        An export with a stale or missing fingerprint is not reused
+        """
+        export_dir = get_export_dir('org/model', self._root / 'exports')
+        export_dir.mkdir(parents=True)
+        (export_dir / 'source_fingerprint.txt').write_text('stale', encoding='utf-8')
+
+        self._load('org/model')
+
+        self.assertTrue(self._exported())
+        self.assertEqual(model_fingerprint('org/model'),
+                         (export_dir / 'source_fingerprint.txt').read_text(encoding='utf-8'))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_seq2seq_generation_config(self) -> None:
+        """
+        A seq2seq model is exported with cache and gets the generation config of the source
+        """
+        model_name = save_t5(self._root / 't5')
+
+        model = self._load(model_name, OnnxTask.SEQ2SEQ)
+
+        self.assertTrue(self._model_class.from_pretrained.call_args.kwargs['use_cache'])
+        self.assertEqual(20, model.generation_config.max_length)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_optimum_missing(self) -> None:
+        """
+        A clear error is raised without ONNX Runtime support installed
+        """
+        with mock.patch.dict(sys.modules, {'optimum.onnxruntime': None}):
+            with self.assertRaisesRegex(ImportError, 'optimum'):
+                self._load(str(self._model_path))
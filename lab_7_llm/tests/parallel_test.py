@@ -0,0 +1,127 @@
+"""
+Checks data-parallel inference across worker processes
+"""
+# pylint: disable=duplicate-code
+import time
+import unittest
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from core_utils.llm.batching import PaddingStats
+from core_utils.llm.parallel import infer_in_processes, split_into_shards
+
+
+class DummyPipeline:
+    """
+    Pipeline upper-casing texts of its shard
+    """
+
+    def __init__(self, shard: pd.DataFrame) -> None:
+        """
+        Initialize an instance of DummyPipeline.
+
+        Args:
+            shard (pandas.DataFrame): Texts to infer
+        """
+        self._shard = shard
+        self.padding_stats = PaddingStats(1, len(shard), len(shard))
+
+    def infer_dataset(self, suffix: str = '') -> pd.DataFrame:
+        """
+        Infer texts of the shard.
+
+        Args:
+            suffix (str): Suffix to append to predictions
+
+        Returns:
+            pandas.DataFrame: Texts and predictions
+        """
+        if 'fail' in self._shard['text'].tolist():
+            raise ValueError('cannot infer the shard')
+        if 'hang' in self._shard['text'].tolist():
+            time.sleep(600)
+        return pd.DataFrame({'text': self._shard['text'],
+                             'predictions': self._shard['text'].str.upper() + suffix})
+
+
+def create_pipeline(shard: pd.DataFrame) -> Any:
+    """
+    Create a dummy pipeline in a worker process.
+
+    Args:
+        shard (pandas.DataFrame): Texts to infer
+
+    Returns:
+        Any: Dummy pipeline
+    """
+    return DummyPipeline(shard)
+
+
+class SplitIntoShardsTest(unittest.TestCase):
+    """
+    Tests splitting of samples between workers
+    """
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_every_index_once(self) -> None:
+        """
+        Every sample gets into exactly one contiguous shard of almost equal size
+        """
+        for num_samples, num_shards in ((10, 3), (9, 3), (100, 7), (1, 1)):
+            shards = split_into_shards(num_samples, num_shards)
+
+            self.assertEqual(list(range(num_samples)),
+                             [index for shard in shards for index in shard])
+            self.assertEqual(num_shards, len(shards))
+            self.assertLessEqual(max(map(len, shards)) - min(map(len, shards)), 1)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_fewer_samples_than_shards(self) -> None:
+        """
+        Empty shards are left out, so no worker is started without samples
+        """
+        self.assertEqual([range(0, 1), range(1, 2)], split_into_shards(2, 4))
+        self.assertEqual([], split_into_shards(0, 3))
+
+
+class InferInProcessesTest(unittest.TestCase):
+    """
+    Tests inference of shards in spawned processes
+    """
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_merged_in_order(self) -> None:
+        """
+        Results of shards are returned in the order of shards with padding statistics
+        """
+        data = pd.DataFrame({'text': [f'text {index}' for index in range(7)]})
+        shards = [data.iloc[rows.start:rows.stop].reset_index(drop=True)
+                  for rows in split_into_shards(len(data), 3)]
+
+        results = infer_in_processes(create_pipeline, shards, 1, suffix='!')
+
+        merged = pd.concat([predictions for predictions, _ in results], ignore_index=True)
+        self.assertEqual(data['text'].tolist(), merged['text'].tolist())
+        self.assertEqual([f'TEXT {index}!' for index in range(7)],
+                         merged['predictions'].tolist())
+        self.assertEqual(PaddingStats(3, 7, 7),
+                         sum((stats for _, stats in results), PaddingStats(0, 0, 0)))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_failure_terminates_others(self) -> None:
+        """
+        An error in one worker is raised without waiting for the other workers
+        """
+        shards = [pd.DataFrame({'text': ['fail']}), pd.DataFrame({'text': ['hang']})]
+        start = time.monotonic()
+
+        with self.assertRaisesRegex(RuntimeError, 'cannot infer the shard'):
+            infer_in_processes(create_pipeline, shards, 1)
+
+        self.assertLess(time.monotonic() - start, 120)
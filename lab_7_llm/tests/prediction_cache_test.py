@@ -0,0 +1,135 @@
+"""
+Checks persistent storage of predictions and identity of models
+"""
+# pylint: disable=duplicate-code
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import pytest
+
+from core_utils.llm.prediction_cache import model_fingerprint, PredictionCache
+
+
+class PredictionCacheTest(unittest.TestCase):
+    """
+    Tests storage of predictions in SQLite
+    """
+
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self._path = Path(self._directory.name) / 'cache' / 'predictions.sqlite'
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def _infer(self, cache: PredictionCache, samples: list[tuple[str, ...]],
+               computed: list[tuple[str, ...]]) -> list[str]:
+        predictions = cache.get_many(samples)
+        missing = [sample for sample, prediction in zip(samples, predictions)
+                   if prediction is None]
+        computed.extend(missing)
+        cache.put_many(missing, [sample[0].upper() for sample in missing])
+        return [prediction or sample[0].upper()
+                for sample, prediction in zip(samples, predictions)]
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_hits_reused_across_instances(self) -> None:
+        """
+        Only misses are computed, stored predictions are reused by a new instance
+        """
+        computed: list[tuple[str, ...]] = []
+        first = PredictionCache(self._path, 'model')
+        self.assertEqual(['A', 'B'], self._infer(first, [('a',), ('b',)], computed))
+
+        second = PredictionCache(self._path, 'model')
+        self.assertEqual(['B', 'C', 'A'],
+                         self._infer(second, [('b',), ('c',), ('a',)], computed))
+
+        self.assertEqual([('a',), ('b',), ('c',)], computed)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_samples_of_several_fields(self) -> None:
+        """
+        Samples differing in any field are stored separately
+        """
+        cache = PredictionCache(self._path, 'model')
+        cache.put_many([('premise', 'hypothesis')], ['0'])
+
+        self.assertEqual(['0', None, None], cache.get_many([
+            ('premise', 'hypothesis'), ('hypothesis', 'premise'), ('premisehypothesis',)
+        ]))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_many_keys(self) -> None:
+        """
+        Look up of more keys than fit into one query keeps the order of samples
+        """
+        samples = [(f'text {index}',) for index in range(1234)]
+        cache = PredictionCache(self._path, 'model')
+        cache.put_many(samples[::2], [str(index) for index in range(0, 1234, 2)])
+
+        predictions = cache.get_many(samples)
+
+        self.assertEqual([str(index) if index % 2 == 0 else None for index in range(1234)],
+                         predictions)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_settings_isolated(self) -> None:
+        """
+        Predictions are not shared when max length or generation config changes
+        """
+        generation_config = {'max_length': 20, 'num_beams': 1}
+        namespace = model_fingerprint('model', 120, json.dumps(generation_config))
+        PredictionCache(self._path, namespace).put_many([('text',)], ['summary'])
+
+        other_length = model_fingerprint('model', 64, json.dumps(generation_config))
+        other_config = model_fingerprint('model', 120,
+                                         json.dumps({**generation_config, 'num_beams': 4}))
+        same = model_fingerprint('model', 120, json.dumps(generation_config))
+
+        self.assertEqual(3, len({namespace, other_length, other_config}))
+        self.assertEqual([None], PredictionCache(self._path, other_length).get_many([('text',)]))
+        self.assertEqual([None], PredictionCache(self._path, other_config).get_many([('text',)]))
+        self.assertEqual(['summary'], PredictionCache(self._path, same).get_many([('text',)]))
+
+
+class ModelFingerprintTest(unittest.TestCase):
+    """
+    Tests identity of models
+    """
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_stable(self) -> None:
+        """
+        Identity of a hub model depends only on its name and settings
+        """
+        self.assertEqual(model_fingerprint('t5-small', 120), model_fingerprint('t5-small', 120))
+        self.assertNotEqual(model_fingerprint('t5-small', 120), model_fingerprint('t5-base', 120))
+        self.assertNotEqual(model_fingerprint('t5-small', 1, 20),
+                            model_fingerprint('t5-small', 12, 0))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_local_directory_modified(self) -> None:
+        """
+        Identity of a local model changes when any of its files is modified
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            weights = Path(directory) / 'model.safetensors'
+            weights.write_bytes(b'weights')
+            (Path(directory) / 'config.json').write_text('{}', encoding='utf-8')
+            before = model_fingerprint(directory, 120)
+            self.assertEqual(before, model_fingerprint(directory, 120))
+
+            stat = weights.stat()
+            os.utime(weights, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+            self.assertNotEqual(before, model_fingerprint(directory, 120))
@@ -0,0 +1,117 @@
+"""
+Checks int8 quantization of models
+"""
+# pylint: disable=duplicate-code
+import copy
+import unittest
+
+import pytest
+import torch
+from torch import nn
+
+from core_utils.llm.quantization import quantize_dynamic, quantize_static, StaticQuantLinear
+
+
+class TinyModel(nn.Module):
+    """
+    Model with a body, an output head and a nested classification head
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize an instance of TinyModel.
+        """
+        super().__init__()
+        self.body = nn.Sequential(nn.Linear(16, 32), nn.ReLU(), nn.Linear(32, 16))
+        self.lm_head = nn.Linear(16, 8)
+        self.head = nn.ModuleDict({'classifier': nn.Linear(16, 4)})
+
+    def forward(self, hidden_states: torch.Tensor) -> torch.Tensor:
+        """
+        Apply the model.
+
+        Args:
+            hidden_states (torch.Tensor): Input
+
+        Returns:
+            torch.Tensor: Concatenated outputs of both heads
+        """
+        hidden_states = self.body(hidden_states)
+        return torch.cat([self.lm_head(hidden_states),
+                          self.head['classifier'](hidden_states)], dim=-1)
+
+
+class QuantizationTest(unittest.TestCase):
+    """
+    Tests that heads are kept in float precision and the body is quantized
+    """
+
+    def setUp(self) -> None:
+        torch.manual_seed(0)
+        self._model = TinyModel().eval()
+        self._original = copy.deepcopy(self._model)
+        self._inputs = torch.randn(64, 16)
+
+    def _assert_heads_kept(self, model: TinyModel) -> None:
+        self.assertIs(nn.Linear, type(model.lm_head))
+        self.assertIs(nn.Linear, type(model.head['classifier']))
+        self.assertTrue(torch.equal(self._original.lm_head.weight, model.lm_head.weight))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_dynamic(self) -> None:
+        """
+        Dynamic quantization converts the body only
+        """
+        model = quantize_dynamic(self._model)
+
+        self._assert_heads_kept(model)
+        for index in (0, 2):
+            self.assertIsInstance(model.body[index], torch.ao.nn.quantized.dynamic.Linear)
+        with torch.no_grad():
+            self.assertTrue(torch.allclose(self._original(self._inputs), model(self._inputs),
+                                           atol=0.05))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_static(self) -> None:
+        """
+        Static quantization wraps and converts the body only
+        """
+        model = quantize_static(self._model, lambda: self._model(self._inputs))
+
+        self._assert_heads_kept(model)
+        for index in (0, 2):
+            self.assertIsInstance(model.body[index], StaticQuantLinear)
+            self.assertIsInstance(model.body[index].linear, torch.ao.nn.quantized.Linear)
+        with torch.no_grad():
+            self.assertTrue(torch.allclose(self._original(self._inputs), model(self._inputs),
+                                           atol=0.05))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_static_weight_dequantized(self) -> None:
+        """
+        Weight of a converted layer is the original float weight within quantization error
+        """
+        model = quantize_static(self._model, lambda: self._model(self._inputs))
+
+        for index in (0, 2):
+            original = self._original.body[index].weight
+            weight = model.body[index].weight
+            self.assertEqual(torch.float32, weight.dtype)
+            self.assertEqual(original.shape, weight.shape)
+            step = original.abs().max() / 127
+            self.assertLessEqual((original - weight).abs().max().item(), step.item())
+            self.assertIs(weight, model.body[index].weight)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_modules_to_not_convert(self) -> None:
+        """
+        Any module given by name is kept in float precision
+        """
+        model = quantize_dynamic(self._model, modules_to_not_convert=('body', ))
+
+        self.assertIs(nn.Linear, type(model.body[0]))
+        self.assertIsInstance(model.lm_head, torch.ao.nn.quantized.dynamic.Linear)
@@ -0,0 +1,51 @@
+"""
+Checks the in-memory cache of service responses
+"""
+# pylint: disable=duplicate-code
+import unittest
+
+import pytest
+
+from core_utils.llm.response_cache import ResponseCache
+
+
+class ResponseCacheTest(unittest.TestCase):
+    """
+    Tests in-memory cache of responses
+    """
+
+    def setUp(self) -> None:
+        self._now = 0.0
+        self._cache = ResponseCache(max_size=2, ttl=10, clock=lambda: self._now)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_lru_eviction(self) -> None:
+        """
+        The least recently used entry is evicted
+        """
+        self._cache.put(('a', ), 'A')
+        self._cache.put(('b', ), 'B')
+        self.assertEqual('A', self._cache.get(('a', )))
+        self._cache.put(('c', ), 'C')
+
+        self.assertIsNone(self._cache.get(('b', )))
+        self.assertEqual('A', self._cache.get(('a', )))
+        self.assertEqual('C', self._cache.get(('c', )))
+        self.assertEqual(1, self._cache.stats()['evictions'])
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_ttl_expiry(self) -> None:
+        """
+        An entry is not returned after its lifetime
+        """
+        self._cache.put(('a', ), 'A')
+        self._now = 9.0
+        self.assertEqual('A', self._cache.get(('a', )))
+        self._now = 10.0
+
+        self.assertIsNone(self._cache.get(('a', )))
+        stats = self._cache.stats()
+        self.assertEqual(1, stats['expirations'])
+        self.assertEqual(0, stats['size'])
@@ -0,0 +1,128 @@
+"""
+Checks rendering of service metrics in Prometheus text exposition format
+"""
+# pylint: disable=duplicate-code
+import unittest
+
+import pytest
+
+from core_utils.llm.service_metrics import (
+    MetricsRegistry,
+    observe_stages,
+    recorded_stages,
+    STAGE_SECONDS,
+    timed_stage,
+)
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    """
+    Tests text of rendered metrics
+    """
+
+    def setUp(self) -> None:
+        self._registry = MetricsRegistry()
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_counter(self) -> None:
+        """
+        Counters are rendered with help, type and samples sorted by labels
+        """
+        counter = self._registry.counter('requests_total', 'Handled requests.', ('status', ))
+        counter.inc(status='200')
+        counter.inc(2, status='200')
+        counter.inc(status='503')
+        self._registry.gauge('ready', 'Readiness.', function=lambda: {(): 1.0})
+
+        self.assertEqual(
+            '# HELP requests_total Handled requests.\n'
+            '# TYPE requests_total counter\n'
+            'requests_total{status="200"} 3\n'
+            'requests_total{status="503"} 1\n'
+            '# HELP ready Readiness.\n'
+            '# TYPE ready gauge\n'
+            'ready 1\n',
+            self._registry.render()
+        )
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_labelled_histogram(self) -> None:
+        """
+        Histograms are rendered with cumulative buckets, sum and count per labels
+        """
+        histogram = self._registry.histogram('latency_seconds', 'Latency.', (0.1, 1.0),
+                                             ('path', ))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(value, path='/infer')
+        histogram.observe(0.25, path='/')
+
+        self.assertEqual([
+            '# HELP latency_seconds Latency.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{path="/",le="0.1"} 0',
+            'latency_seconds_bucket{path="/",le="1"} 1',
+            'latency_seconds_bucket{path="/",le="+Inf"} 1',
+            'latency_seconds_sum{path="/"} 0.25',
+            'latency_seconds_count{path="/"} 1',
+            'latency_seconds_bucket{path="/infer",le="0.1"} 1',
+            'latency_seconds_bucket{path="/infer",le="1"} 3',
+            'latency_seconds_bucket{path="/infer",le="+Inf"} 4',
+            'latency_seconds_sum{path="/infer"} 4.05',
+            'latency_seconds_count{path="/infer"} 4',
+        ], self._registry.render().splitlines())
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_label_escaping(self) -> None:
+        """
+        Backslashes, quotes and line breaks in label values are escaped
+        """
+        counter = self._registry.counter('errors_total', 'Errors.', ('message', ))
+        counter.inc(message='a "quoted"\\path\nnext')
+
+        self.assertIn('errors_total{message="a \\"quoted\\"\\\\path\\nnext"} 1',
+                      self._registry.render().splitlines())
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_duplicate_name(self) -> None:
+        """
+        A name cannot be registered twice
+        """
+        self._registry.counter('requests_total', 'Handled requests.')
+
+        with self.assertRaises(ValueError):
+            self._registry.gauge('requests_total', 'Handled requests.')
+
+
+class StageTimingTest(unittest.TestCase):
+    """
+    Tests durations of inference stages
+    """
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_recorded_and_observed(self) -> None:
+        """
+        Stages measured while recording are collected and observed elsewhere once
+        """
+        def count() -> float:
+            line = f'{STAGE_SECONDS.name}_count{{stage="test stage"}} '
+            found = [sample for sample in STAGE_SECONDS.render() if sample.startswith(line)]
+            return float(found[0].split()[-1]) if found else 0.0
+
+        before = count()
+        with timed_stage('test stage'):
+            pass
+        with recorded_stages() as stages:
+            with timed_stage('test stage'):
+                pass
+        with timed_stage('test stage'):
+            pass
+
+        self.assertEqual(['test stage'], [stage for stage, _ in stages])
+        self.assertEqual(before + 3, count())
+        observe_stages(stages)
+        self.assertEqual(before + 4, count())
@@ -0,0 +1,62 @@
+"""
+Checks coalescing of identical concurrent requests
+"""
+# pylint: disable=duplicate-code
+import asyncio
+import unittest
+
+import pytest
+
+from core_utils.llm.single_flight import SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+    """
+    Tests coalescing of identical concurrent requests
+    """
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_coalescing(self) -> None:
+        """
+        Concurrent requests with the same key share one computation
+        """
+        in_flight = SingleFlight()
+        calls = []
+
+        async def compute() -> str:
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'result'
+
+        async def run() -> list:
+            return await asyncio.gather(*(in_flight.run('key', compute) for _ in range(3)))
+
+        self.assertEqual(['result'] * 3, asyncio.run(run()))
+        self.assertEqual(1, len(calls))
+        self.assertEqual({'in_flight': 0, 'started': 1, 'coalesced': 2}, in_flight.stats())
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_error_propagation(self) -> None:
+        """
+        Every waiting request gets the error and the next request starts over
+        """
+        in_flight = SingleFlight()
+
+        async def fail() -> str:
+            await asyncio.sleep(0.01)
+            raise ValueError('model failed')
+
+        async def succeed() -> str:
+            return 'result'
+
+        async def run() -> tuple[list, str]:
+            results = await asyncio.gather(*(in_flight.run('key', fail) for _ in range(2)),
+                                           return_exceptions=True)
+            return results, await in_flight.run('key', succeed)
+
+        errors, result = asyncio.run(run())
+        for error in errors:
+            self.assertIsInstance(error, ValueError)
+        self.assertEqual('result', result)
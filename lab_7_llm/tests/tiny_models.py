@@ -0,0 +1,83 @@
+"""
+Tiny randomly initialized seq2seq models for tests that do not download weights
+"""
+# pylint: disable=duplicate-code
+import random
+from pathlib import Path
+
+import torch
+from tokenizers import models, pre_tokenizers, processors, Tokenizer
+from transformers import T5Config, T5ForConditionalGeneration, T5TokenizerFast
+
+VOCABULARY = ['<pad>', '</s>', '<unk>'] + [f'w{index}' for index in range(200)]
+
+
+def build_tokenizer() -> T5TokenizerFast:
+    """
+    Create a word-level T5 tokenizer over the test vocabulary.
+
+    Returns:
+        T5TokenizerFast: Tokenizer appending the end of sequence token
+    """
+    tokenizer = Tokenizer(models.WordLevel({word: index for index, word in enumerate(VOCABULARY)},
+                                           unk_token='<unk>'))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.post_processor = processors.TemplateProcessing(single='$A </s>',
+                                                             special_tokens=[('</s>', 1)])
+    return T5TokenizerFast(tokenizer_object=tokenizer, eos_token='</s>', pad_token='<pad>',
+                           unk_token='<unk>', extra_ids=0)
+
+
+def build_t5(seed: int = 0, d_model: int = 32, num_layers: int = 2) -> T5ForConditionalGeneration:
+    """
+    Create a T5 model with random weights producing outputs of different lengths.
+
+    Args:
+        seed (int): Seed of the weights
+        d_model (int): Size of hidden states
+        num_layers (int): The number of encoder and decoder layers
+
+    Returns:
+        T5ForConditionalGeneration: Model in evaluation mode
+    """
+    torch.manual_seed(seed)
+    config = T5Config(vocab_size=len(VOCABULARY), d_model=d_model, d_ff=2 * d_model,
+                      num_layers=num_layers, num_decoder_layers=num_layers, num_heads=4, d_kv=8,
+                      decoder_start_token_id=0, pad_token_id=0, eos_token_id=1)
+    model = T5ForConditionalGeneration(config)
+    torch.nn.init.normal_(model.lm_head.weight, std=1.0)
+    model.lm_head.weight.data[1] -= 0.5
+    model.generation_config.max_length = 20
+    return model.eval()
+
+
+def save_t5(directory: Path, **kwargs: int) -> str:
+    """
+    Save a tiny T5 model with the tokenizer to a directory.
+
+    Args:
+        directory (pathlib.Path): Directory to save to
+        **kwargs (int): Arguments of build_t5
+
+    Returns:
+        str: Path to the saved model
+    """
+    build_t5(**kwargs).save_pretrained(directory)
+    build_tokenizer().save_pretrained(directory)
+    return str(directory)
+
+
+def random_texts(count: int, seed: int = 1) -> list[str]:
+    """
+    Create texts of random words and lengths from the test vocabulary.
+
+    Args:
+        count (int): The number of texts
+        seed (int): Seed of the texts
+
+    Returns:
+        list[str]: Texts
+    """
+    generator = random.Random(seed)
+    return [' '.join(f'w{generator.randint(0, 199)}' for _ in range(generator.randint(1, 40)))
+            for _ in range(count)]
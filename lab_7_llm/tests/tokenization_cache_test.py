@@ -0,0 +1,181 @@
+"""
+Checks persistent storage of tokenized texts
+"""
+# pylint: disable=duplicate-code
+import tempfile
+import unittest
+from pathlib import Path
+
+import pytest
+import torch
+
+from core_utils.llm.tokenization_cache import (
+    TokenizationCache,
+    TokenizedColumn,
+    tokenizer_fingerprint,
+)
+from lab_7_llm.tests.tiny_models import build_tokenizer, random_texts
+
+
+class TokenizedColumnTest(unittest.TestCase):
+    """
+    Tests batches collected from stored token ids
+    """
+
+    def setUp(self) -> None:
+        self._tokenizer = build_tokenizer()
+        self._texts = random_texts(10)
+        self._max_length = 16
+
+    def _expected(self, indices: list[int], **kwargs: str | bool) -> dict[str, torch.Tensor]:
+        return dict(self._tokenizer([self._texts[index] for index in indices],
+                                    truncation=True, max_length=self._max_length,
+                                    return_tensors='pt', **kwargs))
+
+    def _assert_equal(self, expected: dict[str, torch.Tensor],
+                      actual: dict[str, torch.Tensor]) -> None:
+        self.assertEqual(sorted(expected), sorted(actual))
+        for name, tensor in expected.items():
+            self.assertTrue(torch.equal(tensor, actual[name]), name)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_pad_like_longest(self) -> None:
+        """
+        A batch is the same as tokenized with padding to the longest text
+        """
+        column = TokenizedColumn.encode(self._tokenizer, self._texts, self._max_length)
+
+        for indices in ([0, 1, 2], [7, 3], [5]):
+            self._assert_equal(self._expected(indices, padding=True),
+                               column.pad_like(self._tokenizer, indices))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_pad_like_max_length(self) -> None:
+        """
+        A batch is the same as tokenized with padding to max_length
+        """
+        column = TokenizedColumn.encode(self._tokenizer, self._texts, self._max_length)
+
+        self._assert_equal(self._expected([4, 9], padding='max_length'),
+                           column.pad_like(self._tokenizer, [4, 9], self._max_length))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_left_padding(self) -> None:
+        """
+        Padding side of the tokenizer is respected
+        """
+        self._tokenizer.padding_side = 'left'
+        column = TokenizedColumn.encode(self._tokenizer, self._texts, self._max_length)
+
+        self._assert_equal(self._expected([0, 1, 2], padding=True),
+                           column.pad_like(self._tokenizer, [0, 1, 2]))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_from_padded(self) -> None:
+        """
+        Texts tokenized with padding are stored without it
+        """
+        padded = self._tokenizer(self._texts, padding='max_length', truncation=True,
+                                 max_length=self._max_length)
+        column = TokenizedColumn.from_padded(padded['input_ids'], padded['attention_mask'])
+        encoded = TokenizedColumn.encode(self._tokenizer, self._texts, self._max_length)
+
+        self.assertEqual(encoded.lengths, column.lengths)
+        for index in range(len(self._texts)):
+            self.assertTrue(torch.equal(encoded[index], column[index]))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_empty_column(self) -> None:
+        """
+        A column without texts has no lengths
+        """
+        column = TokenizedColumn.from_ids([])
+
+        self.assertEqual(0, len(column))
+        self.assertEqual([], column.lengths)
+
+
+class TokenizationCacheTest(unittest.TestCase):
+    """
+    Tests storage of tokenized columns on disk
+    """
+
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self._cache = TokenizationCache(Path(self._directory.name))
+        self._tokenizer = build_tokenizer()
+        self._texts = random_texts(10)
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def _encode(self, max_length: int, calls: list[int]) -> TokenizedColumn:
+        def tokenize() -> TokenizedColumn:
+            calls.append(max_length)
+            return TokenizedColumn.encode(self._tokenizer, self._texts, max_length)
+
+        return self._cache.encode(self._tokenizer, self._texts, max_length, tokenize)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_saved_and_loaded(self) -> None:
+        """
+        A loaded column gives the same batches as tokenization, texts are tokenized once
+        """
+        calls: list[int] = []
+        encoded = self._encode(16, calls)
+        loaded = TokenizationCache(Path(self._directory.name)).encode(
+            build_tokenizer(), self._texts, 16, lambda: self.fail('texts tokenized again')
+        )
+
+        self.assertEqual([16], calls)
+        expected = self._tokenizer(self._texts, padding=True, truncation=True, max_length=16,
+                                   return_tensors='pt')
+        for name, tensor in loaded.pad_like(self._tokenizer, range(len(self._texts))).items():
+            self.assertTrue(torch.equal(expected[name], tensor), name)
+        self.assertEqual(encoded.lengths, loaded.lengths)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_max_length_isolated(self) -> None:
+        """
+        Columns truncated to another max_length are stored separately
+        """
+        calls: list[int] = []
+        self._encode(16, calls)
+        self._encode(8, calls)
+        self._encode(16, calls)
+
+        self.assertEqual([16, 8], calls)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_corrupt_file_recovered(self) -> None:
+        """
+        A corrupt file is replaced with a newly tokenized column
+        """
+        calls: list[int] = []
+        self._encode(16, calls)
+        for path in Path(self._directory.name).iterdir():
+            path.write_bytes(b'corrupt')
+
+        column = self._encode(16, calls)
+
+        self.assertEqual([16, 16], calls)
+        self.assertEqual(len(self._texts), len(column))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_tokenizer_fingerprint_stable(self) -> None:
+        """
+        Calls of a tokenizer with truncation and padding keep its identity
+        """
+        before = tokenizer_fingerprint(self._tokenizer)
+        self._tokenizer(self._texts, padding='max_length', truncation=True, max_length=8)
+
+        self.assertEqual(before, tokenizer_fingerprint(self._tokenizer))
@@ -2,6 +2,7 @@
 Checks that the service is working properly
 """
 # pylint: disable=duplicate-code
+import asyncio
 import unittest
 from collections import namedtuple
 
@@ -13,7 +14,8 @@ except ImportError:
     print('Library "fastapi" not installed. Failed to import.')
     TestClient = namedtuple("TestClient", "post")
 
-from lab_7_llm.service import app
+from core_utils.llm.bounded_executor import QueueFullError
+from lab_7_llm.service import app, queue_full_handler
 
 
 class WebServiceTest(unittest.TestCase):
@@ -43,3 +45,18 @@ class WebServiceTest(unittest.TestCase):
         self.assertIn("infer", response.json())
         print(response.json().get("infer"))
         self.assertIsNotNone(response.json().get("infer"))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_queue_full(self) -> None:
+        """
+        Request rejected by a full inference queue gets 503 with Retry-After
+        """
+        from fastapi import Request  # pylint: disable=import-outside-toplevel
+
+        scope = {"type": "http", "method": "POST", "path": "/infer", "headers": [],
+                 "query_string": b"", "scheme": "http", "server": ("testserver", 80)}
+        response = asyncio.run(queue_full_handler(Request(scope), QueueFullError(1.5)))
+
+        self.assertEqual(503, response.status_code)
+        self.assertEqual("2", response.headers["Retry-After"])
@@ -0,0 +1,135 @@
+"""
+Checks the pool of inference processes
+"""
+# pylint: disable=duplicate-code
+import os
+import time
+import unittest
+from typing import Any
+
+import pytest
+
+from core_utils.llm.worker_pool import WorkerPool
+
+
+def square(items: list[int]) -> list[int]:
+    """
+    Square numbers, waiting longer for larger first numbers.
+
+    Args:
+        items (list[int]): Numbers
+
+    Returns:
+        list[int]: Squares of the numbers
+    """
+    time.sleep(0.01 * (items[0] % 5))
+    return [item * item for item in items]
+
+
+def fail(items: list[Any]) -> list[Any]:
+    """
+    Raise an error instead of inferring items.
+
+    Args:
+        items (list[Any]): Items
+
+    Raises:
+        ValueError: Always
+    """
+    raise ValueError(f'cannot infer {len(items)} items')
+
+
+def die(items: list[Any]) -> list[Any]:
+    """
+    Exit the worker process without a response.
+
+    Args:
+        items (list[Any]): Items
+    """
+    os._exit(len(items))  # pylint: disable=protected-access
+
+
+HANDLERS = {'square': square, 'fail': fail, 'die': die}
+
+
+class WorkerPoolTest(unittest.TestCase):
+    """
+    Tests routing of requests to worker processes and back
+    """
+
+    def setUp(self) -> None:
+        self._pool = WorkerPool(HANDLERS, num_workers=2, threads_per_worker=1)
+
+    def tearDown(self) -> None:
+        self._pool.close()
+
+    def _wait_dead(self, count: int) -> None:
+        deadline = time.monotonic() + 10
+        while sum(not worker['alive'] for worker in self._pool.stats()['workers']) < count:
+            self.assertLess(time.monotonic(), deadline, 'worker exit is not noticed')
+            time.sleep(0.01)
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_results_routed(self) -> None:
+        """
+        Every request gets results for its own items
+        """
+        futures = [self._pool.submit('square', [number, number + 1]) for number in range(20)]
+
+        self.assertEqual([[number ** 2, (number + 1) ** 2] for number in range(20)],
+                         [future.result(timeout=30) for future in futures])
+        self.assertEqual(square([3, 4]), self._pool.infer('square')([3, 4]))
+        stats = self._pool.stats()
+        self.assertEqual(0, stats['queue_depth'])
+        self.assertEqual(21, sum(worker['completed'] for worker in stats['workers']))
+        self.assertTrue(all(worker['completed'] for worker in stats['workers']))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_error_propagated(self) -> None:
+        """
+        An error of a handler fails its request only, the worker keeps serving
+        """
+        with self.assertRaisesRegex(RuntimeError, 'cannot infer 2 items'):
+            self._pool.submit('fail', [1, 2]).result(timeout=30)
+        with self.assertRaisesRegex(RuntimeError, 'KeyError'):
+            self._pool.submit('unknown', [1]).result(timeout=30)
+
+        self.assertEqual([[1], [4], [9]],
+                         [self._pool.submit('square', [number]).result(timeout=30)
+                          for number in range(1, 4)])
+        self.assertTrue(all(worker['alive'] for worker in self._pool.stats()['workers']))
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_worker_died(self) -> None:
+        """
+        Requests of a dead worker fail, new requests go to the live worker
+        """
+        with self.assertRaisesRegex(RuntimeError, 'exited'):
+            self._pool.submit('die', [1]).result(timeout=30)
+        self._wait_dead(1)
+
+        self.assertEqual([[4]] * 3, [self._pool.submit('square', [2]).result(timeout=30)
+                                     for _ in range(3)])
+
+        with self.assertRaisesRegex(RuntimeError, 'exited'):
+            self._pool.submit('die', [1]).result(timeout=30)
+        self._wait_dead(2)
+        with self.assertRaisesRegex(RuntimeError, 'All inference workers have exited'):
+            self._pool.submit('square', [2])
+
+    @pytest.mark.lab_7_llm
+    @pytest.mark.mark10
+    def test_close(self) -> None:
+        """
+        Worker processes exit when the pool is closed
+        """
+        self.assertEqual([1], self._pool.submit('square', [1]).result(timeout=30))
+
+        self._pool.close()
+
+        self._wait_dead(2)
+        self.assertFalse(any(worker.process.is_alive()
+                             for worker in self._pool._workers))  # pylint: disable=protected-access
@@ -3,33 +3,41 @@ Laboratory work.
 
 Fine-tuning Large Language Models for a downstream task.
 """
-# pylint: disable=too-few-public-methods, undefined-variable, duplicate-code, unused-argument, too-many-arguments
+# pylint: disable=too-few-public-methods, undefined-variable, duplicate-code, unused-argument, too-many-arguments, import-outside-toplevel
+from functools import partial
 from pathlib import Path
-from typing import Iterable, Sequence
+from typing import Callable, Iterable, Iterator, Sequence, TYPE_CHECKING
 
 import pandas as pd
 import torch
-from datasets import load_dataset
-from evaluate import load
 from pandas import DataFrame
-from peft import get_peft_model, LoraConfig
-from torch.utils.data import DataLoader, Dataset
-from torchinfo import summary
-from transformers import (
-    AutoModelForSequenceClassification,
-    AutoTokenizer,
-    Trainer,
-    TrainingArguments,
-)
+from torch.utils.data import Dataset
 
 from config.lab_settings import SFTParams
+from core_utils.llm.batching import collect_padding_stats, PaddingStats, plan_batches
 from core_utils.llm.llm_pipeline import AbstractLLMPipeline
+from core_utils.llm.lora_adapters import ADAPTER_DIR, LoraAdapters
 from core_utils.llm.metrics import Metrics
+from core_utils.llm.model_analysis import ModelAnalysisCache
+from core_utils.llm.onnx_backend import Backend, load_onnx_model, OnnxTask
+from core_utils.llm.parallel import (
+    default_threads_per_worker,
+    infer_in_processes,
+    split_into_shards,
+)
+from core_utils.llm.prediction_cache import fingerprint, model_fingerprint, PredictionCache
+from core_utils.llm.predictions_writer import PredictionsWriter
+from core_utils.llm.quantization import QuantizationMode, quantize_dynamic, quantize_static
 from core_utils.llm.raw_data_importer import AbstractRawDataImporter
 from core_utils.llm.raw_data_preprocessor import AbstractRawDataPreprocessor, ColumnNames
+from core_utils.llm.service_metrics import timed_stage
 from core_utils.llm.sft_pipeline import AbstractSFTPipeline
 from core_utils.llm.task_evaluator import AbstractTaskEvaluator
 from core_utils.llm.time_decorator import report_time
+from core_utils.llm.tokenization_cache import TokenizationCache, TokenizedColumn
+
+if TYPE_CHECKING:
+    from transformers import AutoTokenizer, TrainerCallback
 
 
 class RawDataImporter(AbstractRawDataImporter):
@@ -42,6 +50,8 @@ class RawDataImporter(AbstractRawDataImporter):
         """
         Import dataset.
         """
+        from datasets import load_dataset
+
         self._raw_data = load_dataset(self._hf_name, split='validation').to_pandas()
 
 
@@ -137,11 +147,14 @@ class TaskDataset(Dataset):
 
 
 def tokenize_sample(
-    sample: pd.Series, tokenizer: AutoTokenizer, max_length: int
+    sample: pd.Series, tokenizer: 'AutoTokenizer', max_length: int
 ) -> dict[str, torch.Tensor]:
     """
     Tokenize sample.
 
+    Texts and labels of several samples may be given as lists to tokenize them
+    in one call of the tokenizer.
+
     Args:
         sample (pandas.Series): sample from a dataset
         tokenizer (transformers.models.auto.tokenization_auto.AutoTokenizer): Tokenizer to tokenize
@@ -166,17 +179,38 @@ class TokenizedTaskDataset(Dataset):
     A class that converts pd.DataFrame to Dataset and works with it.
     """
 
-    def __init__(self, data: pd.DataFrame, tokenizer: AutoTokenizer, max_length: int) -> None:
+    def __init__(self, data: pd.DataFrame, tokenizer: 'AutoTokenizer', max_length: int,
+                 cache_dir: Path | None = None) -> None:
         """
         Initialize an instance of TaskDataset.
 
+        Texts are tokenized in one batched call and stored in the cache, so the same
+        data is not tokenized again by later runs.
+
         Args:
             data (pandas.DataFrame): Original data
             tokenizer (transformers.models.auto.tokenization_auto.AutoTokenizer): Tokenizer to
                 tokenize the dataset
             max_length (int): max length of a sequence
+            cache_dir (pathlib.Path | None): Directory of tokenized texts,
+                dist/tokenized of the lab if not given
         """
-        self._data = data.apply(lambda x: tokenize_sample(x, tokenizer, max_length), axis=1)
+        samples = pd.Series({
+            str(ColumnNames.SOURCE): data[str(ColumnNames.SOURCE)].tolist(),
+            str(ColumnNames.TARGET): data[str(ColumnNames.TARGET)].tolist(),
+        })
+
+        def tokenize() -> TokenizedColumn:
+            tokenized = tokenize_sample(samples, tokenizer, max_length)
+            return TokenizedColumn.from_padded(tokenized['input_ids'],
+                                               tokenized['attention_mask'])
+
+        cache = TokenizationCache(cache_dir or Path(__file__).parent / 'dist' / 'tokenized')
+        self._tokens = cache.encode(tokenizer, samples[str(ColumnNames.SOURCE)], max_length,
+                                    tokenize)
+        self._labels = samples[str(ColumnNames.TARGET)]
+        self._tokenizer = tokenizer
+        self._max_length = max_length
 
 
     def __len__(self) -> int:
@@ -186,7 +220,7 @@ class TokenizedTaskDataset(Dataset):
         Returns:
             int: The number of items in the dataset
         """
-        return len(self._data)
+        return len(self._labels)
 
     def __getitem__(self, index: int) -> dict[str, torch.Tensor]:
         """
@@ -198,7 +232,12 @@ class TokenizedTaskDataset(Dataset):
         Returns:
             dict[str, torch.Tensor]: An element from the dataset
         """
-        return dict(self._data.iloc[index])
+        padded = self._tokens.pad_like(self._tokenizer, [index], self._max_length)
+        return {
+            'input_ids': padded['input_ids'][0],
+            'attention_mask': padded['attention_mask'][0],
+            'labels': self._labels[index]
+        }
 
 
 class LLMPipeline(AbstractLLMPipeline):
@@ -207,7 +246,16 @@ class LLMPipeline(AbstractLLMPipeline):
     """
 
     def __init__(
-        self, model_name: str, dataset: TaskDataset, max_length: int, batch_size: int, device: str
+        self,
+        model_name: str,
+        dataset: TaskDataset,
+        max_length: int,
+        batch_size: int,
+        device: str,
+        max_batch_tokens: int | None = None,
+        cache_path: Path | None = None,
+        quantization: QuantizationMode | None = None,
+        backend: Backend = Backend.TORCH,
     ) -> None:
         """
         Initialize an instance of LLMPipeline.
@@ -216,29 +264,86 @@ class LLMPipeline(AbstractLLMPipeline):
             model_name (str): The name of the pre-trained model.
             dataset (TaskDataset): The dataset to be used for translation.
             max_length (int): The maximum length of generated sequence.
-            batch_size (int): The size of the batch inside DataLoader.
+            batch_size (int): The maximum number of samples in a batch planned by plan_batches.
             device (str): The device for inference.
+            max_batch_tokens (int | None): The maximum number of padded tokens in a batch.
+            cache_path (pathlib.Path | None): Path to a persistent store of predictions.
+            quantization (QuantizationMode | None): Int8 quantization mode for CPU inference.
+            backend (Backend): Runtime executing the model.
         """
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
 
-        super().__init__(model_name, dataset, max_length, batch_size, device)
+        super().__init__(model_name, dataset, max_length, batch_size, device, max_batch_tokens)
 
         self._tokenizer = AutoTokenizer.from_pretrained(self._model_name)
-        self._model = AutoModelForSequenceClassification.from_pretrained(
-            self._model_name).to(self._device).eval()
 
+        if (quantization is not None or backend is Backend.ONNX) and self._device != 'cpu':
+            raise ValueError('Quantized and ONNX inference are supported only on CPU')
+        if quantization is not None and backend is Backend.ONNX:
+            raise ValueError('Quantization is supported only by torch backend')
+
+        self._backend = backend
+        self._quantization = quantization
+        if backend is Backend.ONNX:
+            self._model = load_onnx_model(self._model_name, OnnxTask.CLASSIFICATION,
+                                          Path(__file__).parent / 'dist' / 'onnx')
+        else:
+            self._model = AutoModelForSequenceClassification.from_pretrained(
+                self._model_name).to(self._device).eval()
+        self._padding_stats: PaddingStats | None = None
+        self._adapters: LoraAdapters | None = None
+        self._tokenized: TokenizedColumn | None = None
+
+        if quantization is QuantizationMode.DYNAMIC:
+            self._model = quantize_dynamic(self._model)
+        elif quantization is QuantizationMode.STATIC:
+            self._model = quantize_static(self._model, self._calibrate)
+
+        self._identity = model_fingerprint(
+            self._model_name, self._max_length, self._model.config.to_json_string(),
+            self._quantization, self._backend
+        )
+        self._cache_path = cache_path
+        self._cache: PredictionCache | None = None
+        if cache_path is not None:
+            self._cache = PredictionCache(cache_path, self._identity)
 
     def analyze_model(self) -> dict:
         """
         Analyze model computing properties.
 
+        Properties are computed on a copy of the model on the meta device created
+        from the config of the loaded model, and cached on disk by the config.
+
         Returns:
             dict: Properties of a model
         """
-        emb_size = self._model.config.max_position_embeddings
-        input_data = torch.ones((1, emb_size), dtype=torch.long)
+        from transformers import AutoModelForSequenceClassification
 
-        test_model = AutoModelForSequenceClassification.from_pretrained(self._model_name)
-        model_summary = summary(test_model, input_data=input_data, verbose=0)
+        cache = ModelAnalysisCache(Path(__file__).parent / 'dist' / 'model_analysis.json')
+        return cache.analyze(AutoModelForSequenceClassification, self._model.config,
+                             self._summarize_model)
+
+    @staticmethod
+    def _summarize_model(test_model: torch.nn.Module) -> dict:
+        """
+        Summarize properties of a model on the meta device.
+
+        Args:
+            test_model (torch.nn.Module): Model on the meta device
+
+        Returns:
+            dict: Properties of a model
+        """
+        from torchinfo import summary
+
+        emb_size = test_model.config.max_position_embeddings
+        input_data = torch.ones((1, emb_size), dtype=torch.long, device='meta')
+
+        # the mask keeps the model from checking input values for padding
+        model_summary = summary(test_model, input_data=input_data,
+                                attention_mask=torch.ones_like(input_data), device='meta',
+                                verbose=0)
 
         return {
             'input_shape': model_summary.input_size,
@@ -251,6 +356,27 @@ class LLMPipeline(AbstractLLMPipeline):
         }
 
 
+    @property
+    def padding_stats(self) -> PaddingStats | None:
+        """
+        Property with padding statistics of the last length-aware inference.
+
+        Returns:
+            PaddingStats | None: Padding statistics if lengths were computed
+        """
+        return self._padding_stats
+
+    @property
+    def identity(self) -> str:
+        """
+        Property with identity of the model together with its inference settings.
+
+        Returns:
+            str: Hexadecimal digest of the model, max_length, config,
+                quantization and backend
+        """
+        return self._identity
+
     @report_time
     def infer_sample(self, sample: tuple[str, ...]) -> str | None:
         """
@@ -262,24 +388,100 @@ class LLMPipeline(AbstractLLMPipeline):
         Returns:
             str | None: A prediction
         """
-        return self._infer_batch([sample])[0]
+        return self.infer_samples([sample])[0]
+
+    def infer_samples(self, samples: Sequence[tuple[str, ...]]) -> list[str | None]:
+        """
+        Infer model on samples in a single batch, computing only those missing in the cache.
+
+        Args:
+            samples (Sequence[tuple[str, ...]]): Samples to infer
+
+        Returns:
+            list[str | None]: Predictions in the order of samples
+        """
+        predictions = self._lookup_cache(samples)
+        missing = [index for index, prediction in enumerate(predictions) if prediction is None]
+        if not missing:
+            return predictions
+
+        missing_samples = [samples[index] for index in missing]
+        output = self._infer_batch(list(zip(*missing_samples)))
+        if self._cache is not None:
+            self._cache.put_many(missing_samples, output)
+        for index, prediction in zip(missing, output):
+            predictions[index] = prediction
+        return predictions
+
+    def load_adapters(self, adapters: dict[str, Path]) -> LoraAdapters:
+        """
+        Attach LoRA adapters to the model to infer with any of them or without them.
+
+        Args:
+            adapters (dict[str, pathlib.Path]): Directories of saved adapters by names
+
+        Returns:
+            LoraAdapters: Adapters to activate around inference
+        """
+        if self._backend is not Backend.TORCH or self._quantization is not None:
+            raise ValueError('Adapters are supported only by non-quantized torch backend')
+        if self._cache is not None:
+            raise ValueError('Adapters cannot be used with the prediction cache')
+        self._adapters = LoraAdapters(self._model, adapters)
+        self._model = self._adapters.model
+        return self._adapters
+
+    def infer_adapter_samples(
+        self,
+        samples: Sequence[tuple[str, ...]],
+        adapters: Sequence[str | None],
+    ) -> list[str]:
+        """
+        Infer samples in a single batch, every sample with its own LoRA adapter.
+
+        Args:
+            samples (Sequence[tuple[str, ...]]): Samples to infer
+            adapters (Sequence[str | None]): Adapter names of samples, None for the base model
+
+        Returns:
+            list[str]: Predictions in the order of samples
+        """
+        if self._adapters is None:
+            raise ValueError('Adapters are not loaded')
+        if not samples:
+            return []
+        return self._infer_batch(list(zip(*samples)), adapters)
 
 
     @report_time
-    def infer_dataset(self) -> pd.DataFrame:
+    def infer_dataset(
+        self,
+        sort_by_length: bool = False,
+        max_batch_tokens: int | None = None,
+        num_workers: int = 1,
+    ) -> pd.DataFrame:
         """
         Infer model on a whole dataset.
 
+        With sort_by_length samples are grouped into batches by their tokenized length,
+        which reduces padding. With a token budget batches are limited by the number of
+        padded tokens instead of the number of rows. Predictions are returned in the
+        original order anyway.
+
+        Args:
+            sort_by_length (bool): Whether to group samples of similar length into batches
+            max_batch_tokens (int | None): The maximum number of padded tokens in a batch,
+                overrides the value given at construction
+            num_workers (int): The number of processes to split the dataset between,
+                each process loads its own copy of the model
+
         Returns:
             pd.DataFrame: Data with predictions
         """
-        predictions = []
+        if num_workers > 1 and len(self._dataset) > 1:
+            return self._infer_in_workers(num_workers, sort_by_length, max_batch_tokens)
 
-        dataloader = DataLoader(self._dataset, batch_size=self._batch_size)
-        for batch in dataloader:
-            output = self._infer_batch(batch)
-
-            predictions.extend(output)
+        predictions = self._infer_rows(range(len(self._dataset)), sort_by_length, max_batch_tokens)
 
         res = pd.DataFrame(
             {str(ColumnNames.TARGET): self._dataset.data[str(ColumnNames.TARGET)],
@@ -287,15 +489,251 @@ class LLMPipeline(AbstractLLMPipeline):
         )
         return res
 
+    def iter_infer_dataset(
+        self,
+        chunk_size: int,
+        start: int = 0,
+        sort_by_length: bool = False,
+        max_batch_tokens: int | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Infer model on a dataset chunk by chunk.
 
+        Chunks follow the dataset order, so concatenated chunks are equal to the
+        result of infer_dataset. Batching options are applied inside each chunk.
 
-    @torch.no_grad()
-    def _infer_batch(self, sample_batch: Sequence[tuple[str, ...]]) -> list[str]:
+        Args:
+            chunk_size (int): The number of samples in a chunk
+            start (int): Index of the first sample to infer
+            sort_by_length (bool): Whether to group samples of similar length into batches
+            max_batch_tokens (int | None): The maximum number of padded tokens in a batch
+
+        Yields:
+            pd.DataFrame: Data with predictions for the next chunk
+        """
+        targets = self._dataset.data[str(ColumnNames.TARGET)]
+        chunks_stats: list[PaddingStats] = []
+        for chunk_start in range(start, len(self._dataset), chunk_size):
+            rows = range(chunk_start, min(chunk_start + chunk_size, len(self._dataset)))
+            predictions = self._infer_rows(rows, sort_by_length, max_batch_tokens)
+            if self._padding_stats is not None:
+                chunks_stats.append(self._padding_stats)
+                self._padding_stats = sum(chunks_stats, PaddingStats(0, 0, 0))
+
+            yield pd.DataFrame(
+                {str(ColumnNames.TARGET): targets.iloc[rows.start:rows.stop],
+                 str(ColumnNames.PREDICTION): predictions}
+            )
+
+    @report_time
+    def infer_dataset_to_file(
+        self,
+        path: Path,
+        chunk_size: int,
+        sort_by_length: bool = False,
+        max_batch_tokens: int | None = None,
+    ) -> None:
+        """
+        Infer model on a whole dataset, appending predictions to a file chunk by chunk.
+
+        A checkpoint is recorded after each chunk, so a restarted run with the same
+        model, inference settings and dataset continues from the first chunk that was
+        not written. A retrained model or other settings start the file from scratch.
+
+        Args:
+            path (pathlib.Path): Path to CSV file with predictions
+            chunk_size (int): The number of samples in a chunk
+            sort_by_length (bool): Whether to group samples of similar length into batches
+            max_batch_tokens (int | None): The maximum number of padded tokens in a batch
+        """
+        run_id = fingerprint(self._identity, self._batch_size, chunk_size, sort_by_length,
+                             max_batch_tokens or self._max_batch_tokens,
+                             *self._dataset.data[str(ColumnNames.SOURCE)])
+        writer = PredictionsWriter(path, run_id)
+        for chunk in self.iter_infer_dataset(chunk_size, writer.offset,
+                                             sort_by_length, max_batch_tokens):
+            writer.append(chunk)
+
+    def _infer_in_workers(
+        self, num_workers: int, sort_by_length: bool, max_batch_tokens: int | None
+    ) -> pd.DataFrame:
+        """
+        Infer model on a whole dataset split into contiguous shards between processes.
+
+        Padding statistics of workers are merged into the statistics of the pipeline.
+
+        Args:
+            num_workers (int): The number of processes
+            sort_by_length (bool): Whether to group samples of similar length into batches
+            max_batch_tokens (int | None): The maximum number of padded tokens in a batch
+
+        Returns:
+            pd.DataFrame: Data with predictions in the original order
+        """
+        shards = [
+            TaskDataset(self._dataset.data.iloc[rows.start:rows.stop].reset_index(drop=True))
+            for rows in split_into_shards(len(self._dataset), num_workers)
+        ]
+        results = infer_in_processes(
+            self._pipeline_factory(), shards, default_threads_per_worker(len(shards)),
+            sort_by_length=sort_by_length, max_batch_tokens=max_batch_tokens
+        )
+        shards_stats = [stats for _, stats in results if stats is not None]
+        self._padding_stats = sum(shards_stats, PaddingStats(0, 0, 0)) if shards_stats else None
+        merged = pd.concat([predictions for predictions, _ in results])
+        merged.index = self._dataset.data.index
+        return merged
+
+    def _pipeline_factory(self) -> Callable[[TaskDataset], 'LLMPipeline']:
+        """
+        Create a picklable factory of pipelines with the same settings.
+
+        Returns:
+            Callable[[TaskDataset], LLMPipeline]: Function creating a pipeline for a dataset
+        """
+        return partial(
+            LLMPipeline, self._model_name,
+            max_length=self._max_length, batch_size=self._batch_size, device=self._device,
+            max_batch_tokens=self._max_batch_tokens, cache_path=self._cache_path,
+            quantization=self._quantization, backend=self._backend
+        )
+
+    def _infer_rows(
+        self, rows: Sequence[int], sort_by_length: bool, max_batch_tokens: int | None
+    ) -> list[str | None]:
+        """
+        Infer model on the given rows of the dataset.
+
+        The whole dataset is tokenized at once only if lengths of samples are needed
+        to plan batches, otherwise every batch is tokenized on its own.
+
+        Args:
+            rows (Sequence[int]): Indices of samples to infer
+            sort_by_length (bool): Whether to group samples of similar length into batches
+            max_batch_tokens (int | None): The maximum number of padded tokens in a batch
+
+        Returns:
+            list[str | None]: Predictions in the order of rows
+        """
+        texts = self._dataset.data[str(ColumnNames.SOURCE)]
+        samples = {index: (texts.iloc[index],) for index in rows}
+        predictions = dict(zip(rows, self._lookup_cache(list(samples.values()))))
+        missing = [index for index in rows if predictions[index] is None]
+
+        max_batch_tokens = max_batch_tokens or self._max_batch_tokens
+        lengths = self._get_sample_lengths() if sort_by_length or max_batch_tokens else None
+        batches = plan_batches(missing, self._batch_size, lengths, sort_by_length, max_batch_tokens)
+        self._padding_stats = collect_padding_stats(lengths, batches) if lengths else None
+
+        for indices in batches:
+            if lengths is None:
+                output = self._infer_batch([[texts.iloc[index] for index in indices]])
+            else:
+                with timed_stage('tokenize'):
+                    model_input = self._get_tokenized().pad_like(self._tokenizer, indices)
+                output = self._infer_tokens(model_input)
+            if self._cache is not None:
+                self._cache.put_many([samples[index] for index in indices], output)
+            predictions.update(zip(indices, output))
+
+        return [predictions[index] for index in rows]
+
+    def _lookup_cache(self, samples: Sequence[tuple[str, ...]]) -> list[str | None]:
+        """
+        Look up stored predictions of samples.
+
+        Args:
+            samples (Sequence[tuple[str, ...]]): Samples to look up
+
+        Returns:
+            list[str | None]: Stored predictions, None for samples to be inferred
+        """
+        if self._cache is None:
+            return [None] * len(samples)
+        return self._cache.get_many(samples)
+
+    def _calibrate(self) -> None:
+        """
+        Run model on the first samples of the dataset to calibrate static quantization.
+
+        Raises:
+            ValueError: In case of empty dataset
+        """
+        if self._dataset is None or not len(self._dataset):
+            raise ValueError('Static quantization requires a non-empty dataset for calibration')
+
+        num_samples = min(len(self._dataset), 16)
+        samples = [self._dataset[index] for index in range(num_samples)]
+        self._infer_batch(list(zip(*samples)))
+
+    def _get_sample_lengths(self) -> list[int]:
+        """
+        Compute tokenized lengths of all samples in the dataset.
+
+        Returns:
+            list[int]: Number of tokens in each sample after truncation
+        """
+        return self._get_tokenized().lengths
+
+    def _get_tokenized(self) -> TokenizedColumn:
+        """
+        Tokenize all samples of the dataset in one batched call.
+
+        Token ids are stored in dist/tokenized of the lab and reused by subsequent
+        calls and runs with the same tokenizer, max_length and texts.
+
+        Returns:
+            TokenizedColumn: Token ids of samples after truncation
+        """
+        if self._tokenized is None:
+            cache = TokenizationCache(Path(__file__).parent / 'dist' / 'tokenized')
+            self._tokenized = cache.encode(
+                self._tokenizer, self._dataset.data[str(ColumnNames.SOURCE)].tolist(),
+                self._max_length
+            )
+        return self._tokenized
+
+    def _infer_batch(
+        self,
+        sample_batch: Sequence[tuple[str, ...]],
+        adapters: Sequence[str | None] | None = None,
+    ) -> list[str]:
         """
         Infer single batch.
 
         Args:
             sample_batch (Sequence[tuple[str, ...]]): batch to infer the model
+            adapters (Sequence[str | None] | None): LoRA adapters of samples, None for the base
+                model, all samples are inferred with the base model if not given
+
+        Returns:
+            list[str]: model predictions as strings
+        """
+        if self._model is None:
+            return []
+
+        with timed_stage('tokenize'):
+            model_input = self._tokenizer(sample_batch[0],
+                                          return_tensors='pt',
+                                          max_length=self._max_length,
+                                          padding=True,
+                                          truncation=True)
+
+        return self._infer_tokens(model_input, adapters)
+
+    @torch.no_grad()
+    def _infer_tokens(
+        self,
+        model_input: dict[str, torch.Tensor],
+        adapters: Sequence[str | None] | None = None,
+    ) -> list[str]:
+        """
+        Infer single tokenized batch.
+
+        Args:
+            model_input (dict[str, torch.Tensor]): Padded input ids and attention mask
+            adapters (Sequence[str | None] | None): LoRA adapters of samples, None for the base
+                model, all samples are inferred with the base model if not given
 
         Returns:
             list[str]: model predictions as strings
@@ -303,14 +741,17 @@ class LLMPipeline(AbstractLLMPipeline):
         if self._model is None:
             return []
 
-        model_input = self._tokenizer(sample_batch[0],
-                                      return_tensors='pt',
-                                      max_length=self._max_length,
-                                      padding=True,
-                                      truncation=True).to(self._device)
+        model_input = {name: tensor.to(self._device) for name, tensor in model_input.items()}
+        with timed_stage('forward'):
+            if self._adapters is None:
+                logits = self._model(**model_input).logits
+            else:
+                routes = adapters or [None] * len(model_input['input_ids'])
+                with self._adapters.route(routes) as adapter_names:
+                    logits = self._model(**model_input, adapter_names=adapter_names).logits
 
-        logits = self._model(**model_input).logits
-        return [self._model.config.id2label[i] for i in torch.argmax(logits, dim=1).tolist()]
+        with timed_stage('decode'):
+            return [self._model.config.id2label[i] for i in torch.argmax(logits, dim=1).tolist()]
 
 
 class TaskEvaluator(AbstractTaskEvaluator):
@@ -326,6 +767,8 @@ class TaskEvaluator(AbstractTaskEvaluator):
             data_path (pathlib.Path): Path to predictions
             metrics (Iterable[Metrics]): List of metrics to check
         """
+        from evaluate import load
+
         super().__init__(metrics)
         self._loaded_metrics = [load(metric.value) for metric in self._metrics]
         self._data_path = data_path
@@ -353,7 +796,13 @@ class SFTPipeline(AbstractSFTPipeline):
     A class that initializes a model, fine-tuning.
     """
 
-    def __init__(self, model_name: str, dataset: Dataset, sft_params: SFTParams) -> None:
+    def __init__(
+        self,
+        model_name: str,
+        dataset: Dataset,
+        sft_params: SFTParams,
+        callbacks: list['TrainerCallback'] | None = None,
+    ) -> None:
         """
         Initialize an instance of ClassificationSFTPipeline.
 
@@ -361,7 +810,11 @@ class SFTPipeline(AbstractSFTPipeline):
             model_name (str): The name of the pre-trained model.
             dataset (torch.utils.data.dataset.Dataset): The dataset used.
             sft_params (SFTParams): Fine-Tuning parameters.
+            callbacks (list[transformers.TrainerCallback] | None): Callbacks of the trainer.
         """
+        from peft import get_peft_model, LoraConfig
+        from transformers import AutoModelForSequenceClassification
+
         super().__init__(model_name, dataset)
         self._model = AutoModelForSequenceClassification.from_pretrained(self._model_name)
         self._lora_config = LoraConfig(r=4, lora_alpha=8, lora_dropout=0.1)
@@ -373,6 +826,7 @@ class SFTPipeline(AbstractSFTPipeline):
         self._max_sft_steps = sft_params.max_fine_tuning_steps
         self._finetuned_model_path = sft_params.finetuned_model_path
         self._learning_rate = sft_params.learning_rate
+        self._callbacks = callbacks
 
     def run(self) -> None:
         """
@@ -383,6 +837,8 @@ class SFTPipeline(AbstractSFTPipeline):
                 self._max_sft_steps is None):
             return
 
+        from transformers import AutoTokenizer, Trainer, TrainingArguments
+
         training_args = TrainingArguments(
             output_dir=self._finetuned_model_path,
             per_device_train_batch_size=self._batch_size,
@@ -393,9 +849,11 @@ class SFTPipeline(AbstractSFTPipeline):
             load_best_model_at_end=False
         )
 
-        trainer = Trainer(model=self._peft_model, args=training_args, train_dataset=self._dataset)
+        trainer = Trainer(model=self._peft_model, args=training_args, train_dataset=self._dataset,
+                          callbacks=self._callbacks)
         trainer.train()
 
+        self._peft_model.save_pretrained(self._finetuned_model_path / ADAPTER_DIR)
         merged_model = self._peft_model.merge_and_unload()
         merged_model.save_pretrained(self._finetuned_model_path)
 
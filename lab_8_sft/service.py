@@ -1,20 +1,43 @@
 """
 Web service for model inference.
 """
-# pylint: disable=too-few-public-methods, undefined-variable, unused-import, assignment-from-no-return, duplicate-code
+# pylint: disable=too-few-public-methods, undefined-variable, unused-import, assignment-from-no-return, duplicate-code, import-outside-toplevel
+import json
 import logging
+import math
+import threading
+import time
 from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
 
 import pandas as pd
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 from config.constants import PROJECT_ROOT
 from config.lab_settings import LabSettings
+from core_utils.llm.bounded_executor import BoundedExecutor, QueueFullError
+from core_utils.llm.bulk_inference import stream_in_order
+from core_utils.llm.fine_tuning_job import FineTuningJob
+from core_utils.llm.lazy_loading import LazyLoader
+from core_utils.llm.lora_adapters import ADAPTER_DIR, LoraAdapters
+from core_utils.llm.micro_batching import MicroBatcher
+from core_utils.llm.prediction_cache import fingerprint, model_fingerprint, PredictionCache
+from core_utils.llm.response_cache import normalize_text, ResponseCache
+from core_utils.llm.service_metrics import (
+    LATENCY_BUCKETS,
+    MetricsRegistry,
+    register_serving_metrics,
+    REGISTRY,
+)
+from core_utils.llm.single_flight import SingleFlight
+from core_utils.llm.worker_pool import WorkerPool
 from lab_8_sft.main import LLMPipeline, TaskDataset
-from lab_8_sft.start import main
+from lab_8_sft.start import fine_tune, load_data
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -32,35 +55,264 @@ class Query:
     is_base_model: bool
 
 
-def init_application() -> tuple[FastAPI, LLMPipeline, LLMPipeline]:
+@dataclass
+class BatchQuery:
     """
-    Initialize core application.
+    Class representing a list of input texts to be classified by the model
+    and the model (base/finetuned) to be used
+    """
+    questions: list[str]
+    is_base_model: bool
 
-    Run: uvicorn lab_8_sft.service:app --reload
+
+Models = tuple[Callable, LoraAdapters | None, dict[str, str]]
+
+
+class ServedModels:
+    """
+    Models in service, replaced all at once when the fine-tuned model gets ready.
+
+    The initial models are loaded lazily, by the first request or in the background.
+    """
+
+    def __init__(self, initial: LazyLoader[Models]) -> None:
+        """
+        Initialize an instance of ServedModels.
+
+        Args:
+            initial (LazyLoader[Models]): Loader of the inference function of texts with
+                model names, adapters of the pre-trained model and identities of live models
+        """
+        self._initial = initial
+        self._lock = threading.Lock()
+        self._models: Models | None = None
+
+    @property
+    def adapters(self) -> LoraAdapters | None:
+        """
+        Adapters of the pre-trained model.
+
+        Returns:
+            LoraAdapters | None: Adapters, None if the fine-tuned model is not an adapter
+                or models are not loaded yet
+        """
+        return self._models[1] if self._models is not None else None
+
+    @property
+    def live(self) -> list[str]:
+        """
+        Names of models ready to infer.
+
+        Returns:
+            list[str]: Model names
+        """
+        return list(self._models[2]) if self._models is not None else []
+
+    def stats(self) -> dict:
+        """
+        Collect the state of loading of the initial models.
+
+        Returns:
+            dict: Whether the models are loaded, loading time, warm-up time and the last error
+        """
+        return self._initial.stats()
+
+    def load(self) -> Models:
+        """
+        Get the models in service, loading the initial ones on the first call.
+
+        Returns:
+            Models: Inference function, adapters and identities of the models
+        """
+        if self._models is None:
+            models = self._initial.get()
+            with self._lock:
+                if self._models is None:
+                    self._models = models
+        return self._models  # type: ignore
+
+    def preload(self) -> None:
+        """
+        Start loading the initial models in the background.
+        """
+        self._initial.preload()
+
+    async def aload(self) -> Models:
+        """
+        Get the models in service without blocking the event loop while they are loaded.
+
+        Returns:
+            Models: Inference function, adapters and identities of the models
+        """
+        if self._models is None:
+            await self._initial.aget()
+        return self.load()
+
+    def replace(self, infer: Callable, adapters: LoraAdapters | None,
+                identities: dict[str, str]) -> None:
+        """
+        Put other models in service; batches already running finish with the old ones.
+
+        Args:
+            infer (Callable): Inference function of texts with model names
+            adapters (LoraAdapters | None): Adapters of the pre-trained model
+            identities (dict[str, str]): Identities of live models by names
+        """
+        with self._lock:
+            self._models = (infer, adapters, identities)
+        logger.info('models in service: %s', ', '.join(identities))
+
+    async def identity(self, model: str) -> str | None:
+        """
+        Get identity of a model to key its responses with.
+
+        Args:
+            model (str): Name of the model
+
+        Returns:
+            str | None: Identity of the model, None if it is not live
+        """
+        return (await self.aload())[2].get(model)
+
+    def infer(self, items: list[tuple[str, str]]) -> list[str | None]:
+        """
+        Classify texts with the models in service.
+
+        Args:
+            items (list[tuple[str, str]]): Texts with names of models to classify them
+
+        Returns:
+            list[str | None]: Predicted labels in the order of items
+        """
+        return self.load()[0](items)
+
+
+def infer_per_model(
+    pipelines: dict[str, LLMPipeline], items: list[tuple[str, str]]
+) -> list[str | None]:
+    """
+    Classify texts with separately loaded models, one model call per model.
+
+    Args:
+        pipelines (dict[str, LLMPipeline]): Pipelines by model names
+        items (list[tuple[str, str]]): Texts with names of models to classify them
+
+    Returns:
+        list[str | None]: Predicted labels in the order of items
+    """
+    results: list[str | None] = [None] * len(items)
+    for name, pipeline in pipelines.items():
+        indices = [index for index, (_, model) in enumerate(items) if model == name]
+        samples = [(items[index][0], ) for index in indices]
+        for index, result in zip(indices, pipeline.infer_samples(samples)):
+            results[index] = result
+    return results
+
+
+def load_models(model_name: str, finetuned_model_path: Path | None) -> Models:
+    """
+    Load the pre-trained model and the fine-tuned one.
+
+    The fine-tuned model is served as a LoRA adapter over the pre-trained model,
+    so that weights of the pre-trained model are loaded once and requests to both
+    models are inferred in shared batches. The merged fine-tuned model is loaded
+    separately only if its adapter was not saved.
+
+    Args:
+        model_name (str): The name of the pre-trained model
+        finetuned_model_path (pathlib.Path | None): Path to the fine-tuned model,
+            None to load the pre-trained model only
 
     Returns:
-        tuple[fastapi.FastAPI, LLMPipeline, LLMPipeline]: instance of server and pipeline
+        Models: Inference function of texts with model names, adapters of the pre-trained
+            model and identities of the models
     """
     max_length = 120
     batch_size = 1
     device = 'cpu'
 
-    settings_path = PROJECT_ROOT / 'lab_8_sft' / 'settings.json'
-    parameters = LabSettings(settings_path).parameters
-
     pretrained_pipeline = LLMPipeline(
-        parameters.model, TaskDataset(pd.DataFrame()),
+        model_name, TaskDataset(pd.DataFrame()),
         max_length=max_length, batch_size=batch_size, device=device
     )
+    identities = {'base': pretrained_pipeline.identity}
+    if finetuned_model_path is None:
+        return partial(infer_per_model, {'base': pretrained_pipeline}), None, identities
 
-    finetuned_model_path = PROJECT_ROOT / 'lab_8_sft' / 'dist' / parameters.model
-    if not finetuned_model_path.exists():
-        main()
+    adapter_path = finetuned_model_path / ADAPTER_DIR
+    if adapter_path.exists():
+        adapters = pretrained_pipeline.load_adapters({'fine_tuned': adapter_path})
+        identities['fine_tuned'] = fingerprint(pretrained_pipeline.identity,
+                                              model_fingerprint(str(adapter_path)))
+
+        def infer_texts(items: list[tuple[str, str]]) -> list[str | None]:
+            return pretrained_pipeline.infer_adapter_samples(
+                [(text, ) for text, _ in items],
+                [None if model == 'base' else model for _, model in items],
+            )
 
+        return infer_texts, adapters, identities
+
+    logger.warning('adapter is not found in %s, loading the merged model', adapter_path)
     finetuned_pipeline = LLMPipeline(
         str(finetuned_model_path), TaskDataset(pd.DataFrame()),
         max_length=max_length, batch_size=batch_size, device=device
     )
+    identities['fine_tuned'] = finetuned_pipeline.identity
+    pipelines = {'base': pretrained_pipeline, 'fine_tuned': finetuned_pipeline}
+    return partial(infer_per_model, pipelines), None, identities
+
+
+def init_application(
+    warm_up: bool = True
+) -> tuple[FastAPI, ServedModels, FineTuningJob | None, LabSettings]:
+    """
+    Initialize core application.
+
+    If the fine-tuned model is not saved yet, the pre-trained model is served at once
+    and fine-tuning is prepared to run in the background, putting the fine-tuned model
+    in service when it finishes. Models are loaded lazily, so the service accepts
+    connections at once: loading starts in the background with a warm-up inference,
+    or on the first request.
+
+    Run: uvicorn lab_8_sft.service:app --reload
+
+    Args:
+        warm_up (bool): Whether to run a warm-up inference after the models are loaded
+
+    Returns:
+        tuple[fastapi.FastAPI, ServedModels, FineTuningJob | None, LabSettings]: instance
+            of server, models in service, fine-tuning to start and settings of the lab
+    """
+    settings = LabSettings(PROJECT_ROOT / 'lab_8_sft' / 'settings.json')
+    parameters = settings.parameters
+
+    finetuned_model_path = PROJECT_ROOT / 'lab_8_sft' / 'dist' / parameters.model
+    initial_path = finetuned_model_path if finetuned_model_path.exists() else None
+
+    def warm_up_models(models: Models) -> None:
+        models[0]([('Warm-up text.', name) for name in models[2]])
+
+    served = ServedModels(LazyLoader(partial(load_models, parameters.model, initial_path),
+                                     warm_up_models if warm_up else None, parameters.model))
+    job = None
+    if initial_path is None:
+        def fine_tune_model(callbacks: list[Any]) -> Path:
+            from transformers import set_seed
+
+            set_seed(42)
+            data = load_data(parameters.dataset)
+            if data is None:
+                raise ValueError(f'Dataset {parameters.dataset} is not obtained')
+            return fine_tune(parameters.model, data, callbacks)
+
+        # the pre-trained model is put in service before the job imports transformers,
+        # so that heavy libraries are never imported by two threads at once
+        job = FineTuningJob(
+            fine_tune_model,
+            lambda path: served.replace(*load_models(parameters.model, path)),
+            prepare=served.load,
+        )
 
     classfication_app = FastAPI()
 
@@ -68,11 +320,195 @@ def init_application() -> tuple[FastAPI, LLMPipeline, LLMPipeline]:
 
     logger.info('fastapi application started')
 
-    return classfication_app, pretrained_pipeline, finetuned_pipeline
+    return classfication_app, served, job, settings
+
+
+max_batch_size = 8
+max_wait = 0.01
+max_concurrency = 2
+max_queue_size = 64
+num_workers = 1
+warm_up = True
+fine_tuned_wait = 10.0
 
+# a warm-up inference in the parent process would precede forking of workers
+app, served_models, fine_tuning_job, lab_settings = init_application(warm_up and num_workers == 1)
 
-app, pre_trained_pipeline, fine_tuned_pipeline = init_application()
+if fine_tuning_job is not None:
+    if num_workers > 1:
+        # training in the parent process would precede forking of workers
+        raise ValueError('Background fine-tuning is not supported with several workers, '
+                         'fine-tune the model with lab_8_sft/start.py first')
+    fine_tuning_job.start()
 
+if num_workers > 1:
+    # workers must be forked after the models are loaded
+    served_models.load()
+elif warm_up:
+    served_models.preload()
+
+infer_function = served_models.infer
+if num_workers > 1:
+    worker_pool = WorkerPool({'classify': infer_function}, num_workers)
+    infer_function = worker_pool.infer('classify')
+
+executor = BoundedExecutor(max(max_concurrency, num_workers), max_queue_size)
+batcher = MicroBatcher(infer_function, max_batch_size, max_wait,
+                       executor=executor, max_queue_size=max_queue_size,
+                       max_concurrent_batches=max(max_concurrency, num_workers))
+
+bulk_window = 32
+
+response_cache = ResponseCache(
+    max_size=4096,
+    ttl=3600,
+    disk=PredictionCache(
+        PROJECT_ROOT / 'lab_8_sft' / 'dist' / 'service_cache.sqlite',
+        model_fingerprint(lab_settings.parameters.model),
+    ),
+)
+in_flight = SingleFlight()
+
+metrics_registry = MetricsRegistry()
+request_latency = register_serving_metrics(
+    metrics_registry, {'shared': batcher}, response_cache, in_flight,
+)
+metrics_registry.counter(
+    'llm_adapter_samples_total', 'Samples inferred with LoRA adapters.', ('adapter', ),
+    function=lambda: {
+        (name, ): values['samples']
+        for name, values in (served_models.adapters.stats()['throughput'].items()
+                             if served_models.adapters is not None else ())
+    },
+)
+metrics_registry.gauge(
+    'llm_model_live', 'Whether a model is ready to infer.', ('model', ),
+    function=lambda: {(name, ): float(name in served_models.live)
+                      for name in ('base', 'fine_tuned')},
+)
+metrics_registry.gauge(
+    'llm_fine_tuning_progress', 'Share of finished steps of background fine-tuning.',
+    function=lambda: {(): fine_tuning_job.stats()['progress']} if fine_tuning_job else {},
+)
+
+
+async def require_model(model: str) -> str:
+    """
+    Get identity of a model, waiting for background fine-tuning to put it in service.
+
+    Args:
+        model (str): Name of the model
+
+    Returns:
+        str: Identity of the model
+
+    Raises:
+        HTTPException: 503 with Retry-After if fine-tuning does not finish in time,
+            503 if the model is not available at all
+    """
+    identity = await served_models.identity(model)
+    if identity is None and fine_tuning_job is not None:
+        if not await fine_tuning_job.finished(fine_tuned_wait):
+            retry_after = fine_tuning_job.eta() or fine_tuned_wait
+            raise HTTPException(status_code=503, detail=f'Model {model} is being fine-tuned',
+                                headers={'Retry-After': str(math.ceil(retry_after))})
+        identity = await served_models.identity(model)
+    if identity is None:
+        raise HTTPException(status_code=503, detail=f'Model {model} is not available')
+    return identity
+
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, error: QueueFullError) -> JSONResponse:
+    """
+    Reject a request that does not fit into the inference queue.
+
+    Args:
+        request (Request): The incoming HTTP request object, provided by FastAPI
+        error (QueueFullError): Raised error with suggested retry delay
+
+    Returns:
+        JSONResponse: Response with status 503 and Retry-After header
+    """
+    logger.warning('rejected request to %s: %s', request.url.path, error)
+    return JSONResponse(status_code=503, content={'detail': str(error)},
+                        headers={'Retry-After': str(math.ceil(error.retry_after))})
+
+
+@app.middleware('http')
+async def measure_latency(request: Request, call_next: Callable) -> Response:
+    """
+    Observe latency of an HTTP request.
+
+    Args:
+        request (Request): The incoming HTTP request object, provided by FastAPI
+        call_next (Callable): Handler of the request
+
+    Returns:
+        Response: Response of the handler
+    """
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get('route')
+    path = getattr(route, 'path', None) or 'unmatched'
+    request_latency.observe(time.perf_counter() - start, method=request.method, path=path,
+                            status=str(response.status_code))
+    return response
+
+
+async def classify(text: str, model: str) -> str | None:
+    """
+    Classify a text as a part of a batch of concurrent requests.
+
+    Labels of repeated texts are taken from the response cache, concurrent
+    requests with the same text and model share one inference.
+
+    Args:
+        text (str): Text to classify
+        model (str): Name of the model, base or fine_tuned
+
+    Returns:
+        str | None: Predicted label
+    """
+    text = normalize_text(text)
+    key = (await require_model(model), text)
+    result = response_cache.get(key)
+    if result is not None:
+        return result
+    return await in_flight.run(key, lambda: infer_label(text, model, key))
+
+
+async def infer_label(text: str, model: str, key: tuple[str, str]) -> str | None:
+    """
+    Classify a normalized text with the model and put the label to the response cache.
+
+    Args:
+        text (str): Normalized text to classify
+        model (str): Name of the model, base or fine_tuned
+        key (tuple[str, str]): Key of the response in the cache
+
+    Returns:
+        str | None: Predicted label
+    """
+    result = await batcher.submit((text, model))
+    if result is not None:
+        response_cache.put(key, result)
+    return result
+
+
+def describe_emotion(result: str | None) -> str:
+    """
+    Make a message with the name of a predicted emotion.
+
+    Args:
+        result (str | None): Predicted label
+
+    Returns:
+        str: Message for a user
+    """
+    id2label = {0: 'sadness', 1: 'joy', 2: 'love',
+                3: 'anger', 4: 'fear', 5: 'surprise'}
+    return f'your emotion is {id2label[int(str(result))]}, right?'
 
 
 @app.get('/', response_class=HTMLResponse)
@@ -101,14 +537,141 @@ async def infer(request: Query) -> dict[str, str]:
     Returns:
         dict[str, str]: A dictionary containing the inference results
     """
-    id2label = {0: 'sadness', 1: 'joy', 2: 'love',
-                3: 'anger', 4: 'fear', 5: 'surprise'}
-
     logger.info('received request: %s', request.question)
-    if request.is_base_model:
-        result = pre_trained_pipeline.infer_sample((request.question, ))
-    else:
-        result = fine_tuned_pipeline.infer_sample((request.question, ))
+    result = await classify(request.question, 'base' if request.is_base_model else 'fine_tuned')
     logger.info('model inference complete: %s', result)
 
-    return {'infer': f'your emotion is {id2label[int(result)]}, right?'}
+    return {'infer': describe_emotion(result)}
+
+
+@app.post('/infer/batch')
+async def infer_batch(request: BatchQuery) -> StreamingResponse:
+    """
+    Create an endpoint classifying many texts in batches.
+
+    Texts are classified as concurrent requests sharing batches, the response cache
+    and coalescing with other requests. Results are streamed as NDJSON lines
+    in the order of texts, a failure ends the stream with an error line.
+
+    Args:
+        request (BatchQuery): The incoming HTTP request object containing the input texts
+
+    Returns:
+        StreamingResponse: Stream of lines with index of a text and its emotion
+    """
+    logger.info('received batch request of %s texts', len(request.questions))
+    model = 'base' if request.is_base_model else 'fine_tuned'
+    await require_model(model)
+    results = stream_in_order(partial(classify, model=model), request.questions, bulk_window)
+    # an overloaded service rejects the whole request before the stream starts
+    received = [await anext(results)] if request.questions else []
+
+    async def lines() -> AsyncIterator[str]:
+        index = 0
+        try:
+            for result in received:
+                yield json.dumps({'index': index, 'infer': describe_emotion(result)}) + '\n'
+                index += 1
+            async for result in results:
+                yield json.dumps({'index': index, 'infer': describe_emotion(result)}) + '\n'
+                index += 1
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            logger.error('batch inference failed: %s', error)
+            yield json.dumps({'index': index, 'error': str(error)}) + '\n'
+        finally:
+            await results.aclose()
+
+    return StreamingResponse(lines(), media_type='application/x-ndjson')
+
+
+@app.get('/metrics')
+async def metrics() -> PlainTextResponse:
+    """
+    Create an endpoint with metrics of the service in Prometheus text format.
+
+    Returns:
+        PlainTextResponse: Metrics text
+    """
+    return PlainTextResponse(REGISTRY.render() + metrics_registry.render(),
+                             media_type='text/plain; version=0.0.4')
+
+
+@app.get('/health')
+async def health() -> dict[str, str]:
+    """
+    Create an endpoint reporting that the service is alive.
+
+    Returns:
+        dict[str, str]: Status of the service
+    """
+    return {'status': 'ok'}
+
+
+@app.get('/ready')
+async def ready() -> dict:
+    """
+    Create an endpoint reporting which models are ready to infer.
+
+    The service is ready as soon as the pre-trained model can serve requests,
+    the fine-tuned model may still be training.
+
+    Returns:
+        dict: Readiness of the service and of every model, progress of background
+            fine-tuning
+    """
+    live = served_models.live
+    models = {name: name in live for name in ('base', 'fine_tuned')}
+    return {
+        'ready': models['base'],
+        'models': models,
+        'loading': served_models.stats(),
+        'fine_tuning': fine_tuning_job.stats() if fine_tuning_job is not None else None,
+    }
+
+
+@app.get('/cache')
+async def cache_stats() -> dict:
+    """
+    Create an endpoint with statistics of the response cache.
+
+    Returns:
+        dict: Hit and miss counters of the cache
+    """
+    return response_cache.stats()
+
+
+@app.get('/coalescing')
+async def coalescing_stats() -> dict:
+    """
+    Create an endpoint with statistics of coalescing of identical requests.
+
+    Returns:
+        dict: Counters of started and coalesced inferences
+    """
+    return in_flight.stats()
+
+
+@app.get('/batching')
+async def batching_stats() -> dict:
+    """
+    Create an endpoint with the state of request batching.
+
+    Returns:
+        dict: Queue depth and counters of the batcher shared by both models
+    """
+    return batcher.stats()
+
+
+@app.get('/adapters')
+async def adapters_stats() -> dict:
+    """
+    Create an endpoint with the state of LoRA adapters of the pre-trained model.
+
+    Returns:
+        dict: Loaded adapters, the number of switches and throughput of every adapter
+    """
+    adapters = served_models.adapters
+    if adapters is None:
+        return {'adapters': [], 'active': None, 'switches': 0, 'mixed_batches': 0,
+                'throughput': {}}
+    return adapters.stats()
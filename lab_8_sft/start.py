@@ -1,10 +1,12 @@
 """
 Fine-tuning starter.
 """
-# pylint: disable=too-many-locals, undefined-variable, unused-import, too-many-branches, too-many-statements
+# pylint: disable=too-many-locals, undefined-variable, unused-import, too-many-branches, too-many-statements, import-outside-toplevel
+import shutil
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from transformers import AutoTokenizer, set_seed
+import pandas as pd
 
 from config.constants import PROJECT_ROOT
 from config.lab_settings import LabSettings, SFTParams
@@ -19,33 +21,111 @@ from lab_8_sft.main import (
     TokenizedTaskDataset,
 )
 
+if TYPE_CHECKING:
+    from transformers import TrainerCallback
+
+
+def load_data(dataset_name: str) -> pd.DataFrame | None:
+    """
+    Import and preprocess the dataset.
+
+    Args:
+        dataset_name (str): The name of the dataset
+
+    Returns:
+        pandas.DataFrame | None: Preprocessed data, None if the dataset is not obtained
+    """
+    importer = RawDataImporter(dataset_name)
+    importer.obtain()
+    if importer.raw_data is None:
+        return None
+
+    preprocessor = RawDataPreprocessor(importer.raw_data)
+    # print(preprocessor.analyze())
+    preprocessor.transform()
+    return preprocessor.data
+
+
+@report_time
+def fine_tune(
+    model_name: str,
+    data: pd.DataFrame,
+    callbacks: list['TrainerCallback'] | None = None,
+) -> Path:
+    """
+    Fine-tune the model and save it to the dist directory of the lab.
+
+    The model is saved to a temporary directory moved in place at the end,
+    so an interrupted fine-tuning does not leave an incomplete model behind.
+
+    Args:
+        model_name (str): The name of the pre-trained model
+        data (pandas.DataFrame): Preprocessed data
+        callbacks (list[transformers.TrainerCallback] | None): Callbacks of the trainer
+
+    Returns:
+        pathlib.Path: Path to the fine-tuned model
+    """
+    from transformers import AutoTokenizer
+
+    finetuned_model_path = PROJECT_ROOT / 'lab_8_sft' / 'dist' / model_name
+    partial_model_path = finetuned_model_path.with_name(f'{finetuned_model_path.name}.partial')
+    shutil.rmtree(partial_model_path, ignore_errors=True)
+    partial_model_path.mkdir(parents=True)
+
+    sft_parameters = SFTParams(
+        batch_size=3,
+        max_length=120,
+        max_fine_tuning_steps=50,
+        learning_rate=1e-3,
+        device='cpu',
+        finetuned_model_path=partial_model_path
+    )
+
+    fine_tune_samples = sft_parameters.batch_size * sft_parameters.max_fine_tuning_steps
+
+    num_samples = 10
+    tokenized_dataset = TokenizedTaskDataset(
+        data=data.loc[num_samples: num_samples + fine_tune_samples],
+        tokenizer=AutoTokenizer.from_pretrained(model_name),
+        max_length=sft_parameters.max_length
+    )
+
+    sft_pipeline = SFTPipeline(model_name=model_name, dataset=tokenized_dataset,
+                               sft_params=sft_parameters, callbacks=callbacks)
+    sft_pipeline.run()
+
+    shutil.rmtree(finetuned_model_path, ignore_errors=True)
+    partial_model_path.rename(finetuned_model_path)
+    return finetuned_model_path
+
 
 @report_time
 def main() -> None:
     """
     Run the translation pipeline.
     """
+    from transformers import set_seed
+
     set_seed(42)
     settings_path = PROJECT_ROOT / 'lab_8_sft' / 'settings.json'
     parameters = LabSettings(settings_path).parameters
 
-    importer = RawDataImporter(parameters.dataset)
-    importer.obtain()
-    if importer.raw_data is None:
+    data = load_data(parameters.dataset)
+    if data is None:
         return
 
-    preprocessor = RawDataPreprocessor(importer.raw_data)
-    # print(preprocessor.analyze())
-    preprocessor.transform()
-
-    dataset = TaskDataset(preprocessor.data.head(100))
+    dataset = TaskDataset(data.head(100))
 
     max_length = 120
     batch_size = 64
+    max_batch_tokens = 4096
     device = 'cpu'
+    cache_path = PROJECT_ROOT / 'lab_8_sft' / 'dist' / 'predictions_cache.sqlite'
 
     pipeline = LLMPipeline(parameters.model, dataset,
-                           max_length=max_length, batch_size=batch_size, device=device)
+                           max_length=max_length, batch_size=batch_size, device=device,
+                           max_batch_tokens=max_batch_tokens, cache_path=cache_path)
 
     print('base model analysis:', pipeline.analyze_model())
     sample = dataset[22]
@@ -57,41 +137,20 @@ def main() -> None:
     predictions_path = PROJECT_ROOT / 'lab_8_sft' / 'dist' / 'predictions.csv'
     predictions_path.parent.mkdir(parents=True, exist_ok=True)
 
-    predictions = pipeline.infer_dataset()
-    predictions.to_csv(predictions_path)
+    pipeline.infer_dataset_to_file(predictions_path, chunk_size=batch_size, sort_by_length=True)
+    print('padding of base model inference:', pipeline.padding_stats)
 
     evaluator = TaskEvaluator(predictions_path, parameters.metrics)
     metrics_result = evaluator.run()
     print('results of base model:', metrics_result)
 
-    finetuned_model_path = PROJECT_ROOT / 'lab_8_sft' / 'dist' / parameters.model
-    finetuned_model_path.mkdir(parents=True, exist_ok=True)
-
-    sft_parameters = SFTParams(
-        batch_size=3,
-        max_length=120,
-        max_fine_tuning_steps=50,
-        learning_rate=1e-3,
-        device='cpu',
-        finetuned_model_path=finetuned_model_path
-    )
-
-    fine_tune_samples = sft_parameters.batch_size * sft_parameters.max_fine_tuning_steps
+    finetuned_model_path = fine_tune(parameters.model, data)
 
     num_samples = 10
-    tokenized_dataset = TokenizedTaskDataset(
-        data=preprocessor.data.loc[num_samples: num_samples + fine_tune_samples],
-        tokenizer=AutoTokenizer.from_pretrained(parameters.model),
-        max_length=sft_parameters.max_length
-    )
-
-    sft_pipeline = SFTPipeline(model_name=parameters.model, dataset=tokenized_dataset,
-                               sft_params=sft_parameters)
-    sft_pipeline.run()
-
     finetuned_pipeline = LLMPipeline(str(finetuned_model_path),
-                                     TaskDataset(preprocessor.data.sample(num_samples)),
-                                     max_length=max_length, batch_size=batch_size, device=device)
+                                     TaskDataset(data.sample(num_samples)),
+                                     max_length=max_length, batch_size=batch_size, device=device,
+                                     max_batch_tokens=max_batch_tokens, cache_path=cache_path)
 
     print('finetuned model analysis:', finetuned_pipeline.analyze_model())
 
@@ -100,8 +159,8 @@ def main() -> None:
           f'text: {sample[0]}\n'
           f'label: {finetuned_pipeline.infer_sample(sample)}')
 
-    finetuned_predictions = finetuned_pipeline.infer_dataset()
-    finetuned_predictions.to_csv(predictions_path)
+    finetuned_pipeline.infer_dataset_to_file(predictions_path, chunk_size=batch_size,
+                                             sort_by_length=True)
 
     evaluator = TaskEvaluator(predictions_path, parameters.metrics)
     finetuned_metrics_result = evaluator.run()
@@ -0,0 +1,117 @@
+"""
+Checks fine-tuning running in the background of a service
+"""
+# pylint: disable=duplicate-code
+import asyncio
+import threading
+import unittest
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from core_utils.llm.fine_tuning_job import FineTuningJob, JobState
+
+
+class FineTuningJobTest(unittest.TestCase):
+    """
+    Tests states and progress of a fine-tuning job without a model
+    """
+
+    def setUp(self) -> None:
+        self._release = threading.Event()
+        self._started = threading.Event()
+        self._events: list[str] = []
+        self._results: list[Any] = []
+
+    def _fine_tune(self, callbacks: list[Any]) -> str:
+        self._events.append('fine_tune')
+        callback = callbacks[0]
+        callback.on_train_begin(None, SimpleNamespace(global_step=0, max_steps=4), None)
+        callback.on_step_end(None, SimpleNamespace(global_step=1, max_steps=4), None)
+        callback.on_log(None, None, None, logs={'loss': 0.5})
+        self._started.set()
+        self._release.wait(timeout=30)
+        return 'fine-tuned model'
+
+    def _fail(self, callbacks: list[Any]) -> str:
+        raise ValueError(f'no data for {len(callbacks)} callbacks')
+
+    @pytest.mark.lab_8_sft
+    @pytest.mark.mark10
+    def test_succeeded(self) -> None:
+        """
+        A job goes from pending through running to succeeded, reporting progress
+        """
+        job = FineTuningJob(self._fine_tune, self._results.append,
+                            prepare=lambda: self._events.append('prepare'))
+        self.assertEqual(JobState.PENDING, job.state)
+        self.assertFalse(job.wait(0))
+
+        job.start()
+        self.assertTrue(self._started.wait(timeout=30))
+
+        self.assertEqual(JobState.RUNNING, job.state)
+        stats = job.stats()
+        self.assertEqual((1, 4, 0.25, 0.5), (stats['step'], stats['max_steps'],
+                                             stats['progress'], stats['loss']))
+        self.assertIsNotNone(job.eta())
+        self.assertFalse(job.wait(0.01))
+        self.assertEqual([], self._results)
+
+        self._release.set()
+
+        self.assertTrue(job.wait(timeout=30))
+        self.assertEqual(JobState.SUCCEEDED, job.state)
+        self.assertEqual(['prepare', 'fine_tune'], self._events)
+        self.assertEqual(['fine-tuned model'], self._results)
+        self.assertIsNone(job.eta())
+        self.assertIsNone(job.stats()['error'])
+
+    @pytest.mark.lab_8_sft
+    @pytest.mark.mark10
+    def test_finished_timeout(self) -> None:
+        """
+        Waiting in the event loop gives up after the timeout without cancelling the job
+        """
+        job = FineTuningJob(self._fine_tune, self._results.append)
+        job.start()
+        self.assertTrue(self._started.wait(timeout=30))
+
+        self.assertFalse(asyncio.run(job.finished(0.01)))
+        self._release.set()
+
+        self.assertTrue(asyncio.run(job.finished(30)))
+        self.assertEqual(JobState.SUCCEEDED, job.state)
+
+    @pytest.mark.lab_8_sft
+    @pytest.mark.mark10
+    def test_fine_tuning_failed(self) -> None:
+        """
+        An error of fine-tuning finishes the job as failed and is recorded
+        """
+        job = FineTuningJob(self._fail, self._results.append)
+        job.start()
+
+        self.assertTrue(job.wait(timeout=30))
+        self.assertTrue(asyncio.run(job.finished(0)))
+        self.assertEqual(JobState.FAILED, job.state)
+        self.assertEqual("ValueError('no data for 1 callbacks')", job.stats()['error'])
+        self.assertEqual([], self._results)
+
+    @pytest.mark.lab_8_sft
+    @pytest.mark.mark10
+    def test_finishing_failed(self) -> None:
+        """
+        A job fails when the fine-tuned model cannot be put in use
+        """
+        def on_finish(result: Any) -> None:
+            raise RuntimeError(f'cannot load {result}')
+
+        self._release.set()
+        job = FineTuningJob(self._fine_tune, on_finish)
+        job.start()
+
+        self.assertTrue(job.wait(timeout=30))
+        self.assertEqual(JobState.FAILED, job.state)
+        self.assertIn('cannot load fine-tuned model', job.stats()['error'])
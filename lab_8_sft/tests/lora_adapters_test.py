@@ -0,0 +1,129 @@
+"""
+Checks routing of rows of a batch through their LoRA adapters
+"""
+# pylint: disable=duplicate-code
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import torch
+from peft import get_peft_model, LoraConfig
+
+from core_utils.llm.lora_adapters import LoraAdapters
+from lab_8_sft.main import LLMPipeline, TaskDataset
+from lab_8_sft.tests.tiny_models import build_bert, build_tokenizer, save_bert
+
+
+def save_adapter(directory: Path, seed: int) -> Path:
+    """
+    Save a LoRA adapter with random non-zero weights for the tiny classifier.
+
+    Args:
+        directory (pathlib.Path): Directory to save to
+        seed (int): Seed of the adapter weights
+
+    Returns:
+        pathlib.Path: Path to the saved adapter
+    """
+    model = build_bert()
+    torch.manual_seed(seed)
+    model = get_peft_model(model, LoraConfig(r=4, lora_alpha=8, init_lora_weights=False))
+    model.save_pretrained(str(directory))
+    return directory
+
+
+class LoraAdaptersTest(unittest.TestCase):
+    """
+    Tests that mixed batches are inferred as each adapter alone
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        root = Path(cls._directory.name)
+        cls._model_path = save_bert(root / 'base')
+        cls._adapter_paths = {'first': save_adapter(root / 'first', 1),
+                              'second': save_adapter(root / 'second', 2)}
+        tokenizer = build_tokenizer()
+        cls._texts = ['w1 w2 w3', 'w4 w5', 'w6 w7 w8 w9 w10', 'w11', 'w12 w13 w14', 'w15 w16']
+        cls._model_input = tokenizer(cls._texts, padding=True, return_tensors='pt')
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._directory.cleanup()
+
+    def setUp(self) -> None:
+        self._adapters = LoraAdapters(build_bert(), self._adapter_paths)
+
+    def _logits(self, routes: list[str | None]) -> torch.Tensor:
+        with torch.no_grad(), self._adapters.route(routes) as adapter_names:
+            return self._adapters.model(**self._model_input, adapter_names=adapter_names).logits
+
+    @pytest.mark.lab_8_sft
+    @pytest.mark.mark10
+    def test_mixed_batch_as_each_adapter_alone(self) -> None:
+        """
+        Every row of a mixed batch gets the logits of its adapter inferred alone
+        """
+        routes = ['first', None, 'second', 'second', None, 'first']
+        alone = {adapter: self._logits([adapter] * len(self._texts))
+                 for adapter in ('first', 'second', None)}
+        with torch.no_grad():
+            base = build_bert()(**self._model_input).logits
+
+        mixed = self._logits(routes)
+
+        self.assertTrue(torch.allclose(base, alone[None], atol=1e-5))
+        self.assertFalse(torch.allclose(alone['first'], alone['second'], atol=1e-3))
+        self.assertFalse(torch.allclose(alone['first'], alone[None], atol=1e-3))
+        for row, adapter in enumerate(routes):
+            self.assertTrue(torch.allclose(alone[adapter][row], mixed[row], atol=1e-5), row)
+        stats = self._adapters.stats()
+        self.assertEqual(1, stats['mixed_batches'])
+        self.assertEqual(8, stats['throughput']['first']['samples'])
+        self.assertEqual(8, stats['throughput']['__base__']['samples'])
+
+    @pytest.mark.lab_8_sft
+    @pytest.mark.mark10
+    def test_single_adapter_activated(self) -> None:
+        """
+        A batch of one adapter is inferred with the adapter activated
+        """
+        with self._adapters.route(['second', 'second']) as adapter_names:
+            self.assertIsNone(adapter_names)
+            self.assertEqual('second', self._adapters.stats()['active'])
+        with self._adapters.route([None]) as adapter_names:
+            self.assertIsNone(adapter_names)
+
+        self.assertEqual(['first', 'second'], self._adapters.names)
+        self.assertEqual(2, self._adapters.stats()['switches'])
+
+    @pytest.mark.lab_8_sft
+    @pytest.mark.mark10
+    def test_unknown_adapter(self) -> None:
+        """
+        Rows of an unknown adapter are refused
+        """
+        with self.assertRaises(ValueError):
+            with self._adapters.route(['first', 'third']):
+                pass
+
+    @pytest.mark.lab_8_sft
+    @pytest.mark.mark10
+    def test_pipeline_mixed_batch(self) -> None:
+        """
+        Predictions of a mixed batch of the pipeline are the same as of each adapter alone
+        """
+        pipeline = LLMPipeline(self._model_path, TaskDataset(pd.DataFrame()), max_length=32,
+                               batch_size=8, device='cpu')
+        pipeline.load_adapters(self._adapter_paths)
+        samples = [(text, ) for text in self._texts]
+        routes = [None, 'first', 'second', None, 'second', 'first']
+        alone = {adapter: pipeline.infer_adapter_samples(samples, [adapter] * len(samples))
+                 for adapter in ('first', 'second', None)}
+
+        mixed = pipeline.infer_adapter_samples(samples, routes)
+
+        self.assertEqual([alone[adapter][row] for row, adapter in enumerate(routes)], mixed)
@@ -0,0 +1,67 @@
+"""
+Tiny randomly initialized classification models for tests that do not download weights
+"""
+# pylint: disable=duplicate-code
+from pathlib import Path
+
+import torch
+from tokenizers import models, pre_tokenizers, processors, Tokenizer
+from transformers import BertConfig, BertForSequenceClassification, PreTrainedTokenizerFast
+
+VOCABULARY = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]'] + [f'w{index}' for index in range(200)]
+
+
+def build_tokenizer() -> PreTrainedTokenizerFast:
+    """
+    Create a word-level BERT-like tokenizer over the test vocabulary.
+
+    Returns:
+        PreTrainedTokenizerFast: Tokenizer wrapping texts into classification and
+            separator tokens
+    """
+    tokenizer = Tokenizer(models.WordLevel({word: index for index, word in enumerate(VOCABULARY)},
+                                           unk_token='[UNK]'))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single='[CLS] $A [SEP]', special_tokens=[('[CLS]', 2), ('[SEP]', 3)]
+    )
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer, pad_token='[PAD]',
+                                   unk_token='[UNK]', cls_token='[CLS]', sep_token='[SEP]',
+                                   mask_token='[MASK]')
+
+
+def build_bert(seed: int = 0, num_labels: int = 6) -> BertForSequenceClassification:
+    """
+    Create a BERT classifier with random weights.
+
+    Args:
+        seed (int): Seed of the weights
+        num_labels (int): The number of classes
+
+    Returns:
+        BertForSequenceClassification: Model in evaluation mode
+    """
+    torch.manual_seed(seed)
+    config = BertConfig(vocab_size=len(VOCABULARY), hidden_size=32, num_hidden_layers=2,
+                        num_attention_heads=4, intermediate_size=64, max_position_embeddings=128,
+                        num_labels=num_labels,
+                        id2label={label: str(label) for label in range(num_labels)})
+    model = BertForSequenceClassification(config)
+    torch.nn.init.normal_(model.classifier.weight, std=2.0)
+    return model.eval()
+
+
+def save_bert(directory: Path, **kwargs: int) -> str:
+    """
+    Save a tiny BERT classifier with the tokenizer to a directory.
+
+    Args:
+        directory (pathlib.Path): Directory to save to
+        **kwargs (int): Arguments of build_bert
+
+    Returns:
+        str: Path to the saved model
+    """
+    build_bert(**kwargs).save_pretrained(directory)
+    build_tokenizer().save_pretrained(directory)
+    return str(directory)
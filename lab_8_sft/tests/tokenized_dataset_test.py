@@ -0,0 +1,71 @@
+"""
+Checks that the tokenized dataset reuses stored token ids
+"""
+# pylint: disable=duplicate-code
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import torch
+
+from core_utils.llm.raw_data_preprocessor import ColumnNames
+from lab_8_sft.main import tokenize_sample, TokenizedTaskDataset
+from lab_8_sft.tests.tiny_models import build_tokenizer
+
+
+class TokenizedTaskDatasetTest(unittest.TestCase):
+    """
+    Tests items of the tokenized dataset
+    """
+
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self._tokenizer = build_tokenizer()
+        self._data = pd.DataFrame({
+            str(ColumnNames.SOURCE): [
+                'w1 w2 w3', 'w4', ' '.join(f'w{index}' for index in range(30)), 'w5 w6 unknown w7'
+            ],
+            str(ColumnNames.TARGET): [0, 3, 5, 1],
+        })
+        self._max_length = 12
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def _assert_items(self, dataset: TokenizedTaskDataset) -> None:
+        self.assertEqual(len(self._data), len(dataset))
+        for index, (_, sample) in enumerate(self._data.iterrows()):
+            expected = tokenize_sample(sample, self._tokenizer, self._max_length)
+            item = dataset[index]
+            self.assertTrue(torch.equal(torch.tensor(expected['input_ids']), item['input_ids']))
+            self.assertTrue(torch.equal(torch.tensor(expected['attention_mask']),
+                                        item['attention_mask']))
+            self.assertEqual(expected['labels'], item['labels'])
+
+    @pytest.mark.lab_8_sft
+    @pytest.mark.mark10
+    def test_items_padded_to_max_length(self) -> None:
+        """
+        Items are the same as samples tokenized with padding to max_length
+        """
+        dataset = TokenizedTaskDataset(self._data, self._tokenizer, self._max_length,
+                                       Path(self._directory.name))
+
+        self._assert_items(dataset)
+
+    @pytest.mark.lab_8_sft
+    @pytest.mark.mark10
+    def test_items_loaded_from_cache(self) -> None:
+        """
+        Items of a dataset loaded from the cache are the same as of a tokenized one
+        """
+        TokenizedTaskDataset(self._data, self._tokenizer, self._max_length,
+                             Path(self._directory.name))
+
+        dataset = TokenizedTaskDataset(self._data, build_tokenizer(), self._max_length,
+                                       Path(self._directory.name))
+
+        self.assertEqual(1, len(list(Path(self._directory.name).iterdir())))
+        self._assert_items(dataset)